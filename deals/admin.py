@@ -1,5 +1,142 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import Paginator
+from django.db import models, transaction
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
 
+from . import images, search, stats
+from .forms import UploadedImageField
 from .models import Task
 
-admin.site.register(Task)
+
+class TaskPaginator(Paginator):
+    """Paginator без COUNT(*) по всей таблице.
+
+    Без фильтров число задач берётся из счётчика (см. stats.py),
+    с фильтрами подсчёт останавливается на max_count строк.
+    """
+    max_count = 10000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return stats.get_stats(days=0)['total']
+        return self.object_list.values('pk')[:self.max_count].count()
+
+
+class TaskChangeList(ChangeList):
+    def get_queryset(self, request):
+        # Список не выводит текст задачи, а он самое тяжёлое поле
+        return super().get_queryset(request).only(
+            'id', 'title', 'slug', 'modified')
+
+
+def iter_id_chunks(queryset, size):
+    """Выдаёт id задач пачками, двигаясь по первичному ключу."""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = ids if last is None else ids.filter(pk__gt=last)
+        chunk = list(chunk[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug', 'modified')
+    # Сортировка только по проиндексированным полям
+    ordering = ('-id',)
+    sortable_by = ('slug', 'modified')
+    # Поиск идёт по полнотекстовому индексу, см. get_search_results()
+    search_fields = ('title', 'text')
+    show_full_result_count = False
+    paginator = TaskPaginator
+    list_max_show_all = 500
+    actions = ['delete_in_chunks', 'rebuild_image_variants']
+    # Сколько задач действие обрабатывает за один запрос к БД
+    action_chunk_size = 500
+    # Картинки проверяются так же, как в форме на главной странице
+    formfield_overrides = {
+        models.ImageField: {'form_class': UploadedImageField},
+    }
+
+    def get_changelist(self, request, **kwargs):
+        return TaskChangeList
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Встроенное удаление загружает в память все выбранные задачи
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        # Все совпадения подзапросом к индексу: список упорядочен по id,
+        # а не по релевантности, поэтому ранжировать их не нужно
+        ids = search.matching_ids(search_term)
+        if ids is None:
+            return queryset.filter(slug=search_term), False
+        return queryset.filter(Q(pk__in=ids) | Q(slug=search_term)), False
+
+    def delete_in_chunks(self, request, queryset):
+        """Удаляет выбранные задачи пачками после подтверждения."""
+        if request.POST.get('post') != 'yes':
+            # При выборе всех задач точный COUNT(*) читал бы всю выборку,
+            # поэтому число считается так же, как в списке
+            count = TaskPaginator(queryset, 1).count
+            return TemplateResponse(
+                request, 'admin/deals/task/delete_in_chunks.html', {
+                    **self.admin_site.each_context(request),
+                    'opts': self.model._meta,
+                    'count': count,
+                    'count_capped': count >= TaskPaginator.max_count,
+                    'selected': request.POST.getlist(
+                        admin.helpers.ACTION_CHECKBOX_NAME),
+                    'select_across': request.POST.get('select_across', '0'),
+                    'title': 'Удаление задач',
+                })
+        deleted = 0
+        for chunk in iter_id_chunks(queryset, self.action_chunk_size):
+            tasks = Task.objects.filter(pk__in=chunk)
+            with transaction.atomic():
+                self.log_deletions(request, tasks.only('id', 'title'))
+                # Сигналы удаления срабатывают, но в памяти одна пачка
+                deleted += tasks.delete()[1].get(Task._meta.label, 0)
+        self.message_user(request, f'Удалено задач: {deleted}',
+                          messages.SUCCESS)
+    delete_in_chunks.short_description = 'Удалить выбранные задачи'
+
+    def log_deletions(self, request, tasks):
+        """Записывает удаление задач в историю админки одним запросом,
+        как log_deletion() для каждой задачи."""
+        content_type = ContentType.objects.get_for_model(Task)
+        LogEntry.objects.bulk_create(
+            LogEntry(user_id=request.user.pk, content_type=content_type,
+                     object_id=str(task.pk), object_repr=str(task)[:200],
+                     action_flag=DELETION)
+            for task in tasks
+        )
+    delete_in_chunks.allowed_permissions = ('delete',)
+
+    def rebuild_image_variants(self, request, queryset):
+        """Ставит в очередь построение копий картинок выбранных задач."""
+        scheduled = 0
+        with_image = queryset.exclude(image='').exclude(image__isnull=True)
+        for chunk in iter_id_chunks(with_image, self.action_chunk_size):
+            for task_id in chunk:
+                images.schedule(task_id)
+            scheduled += len(chunk)
+        self.message_user(
+            request, f'Поставлено в очередь задач: {scheduled}',
+            messages.SUCCESS)
+    rebuild_image_variants.short_description = 'Перестроить копии картинок'
+    rebuild_image_variants.allowed_permissions = ('change',)
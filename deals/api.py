@@ -0,0 +1,141 @@
+"""Только читающий JSON API задач с условными GET-запросами.
+
+ETag и Last-Modified считаются одним лёгким запросом (агрегат по таблице
+для списка, одна индексная строка для задачи), поэтому клиент, опрашивающий
+неизменившиеся данные, получает 304 без выборки и сериализации задач.
+"""
+import hashlib
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Count, F, Max, Subquery
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.generic import View
+
+from todo.routers import ReplicaReadMixin
+
+from . import stats
+from .models import Task, TaskStats
+from .paginators import KeysetPaginator
+
+
+def _list_state(request):
+    if not hasattr(request, '_task_list_state'):
+        # Число задач берётся из счётчика, а не COUNT(*) по таблице,
+        # последнее изменение — по индексу modified
+        latest = Task.objects.order_by('-modified').values('modified')[:1]
+        request._task_list_state = TaskStats.objects.filter(pk=1).values(
+            count=F('total'), modified=Subquery(latest)).first()
+        if request._task_list_state is None:
+            request._task_list_state = Task.objects.aggregate(
+                modified=Max('modified'), count=Count('id'))
+    return request._task_list_state
+
+
+def _detail_state(request, slug):
+    if not hasattr(request, '_task_detail_state'):
+        request._task_detail_state = (
+            Task.objects.filter(slug=slug)
+            .values_list('id', 'modified').first()
+        )
+    return request._task_detail_state
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def task_list_etag(request, *args, **kwargs):
+    # Удаление задачи не меняет максимум modified, но меняет число задач
+    state = _list_state(request)
+    return _etag(state['modified'], state['count'], request.GET.urlencode())
+
+
+def task_list_last_modified(request, *args, **kwargs):
+    return _list_state(request)['modified']
+
+
+def task_detail_etag(request, slug, *args, **kwargs):
+    state = _detail_state(request, slug)
+    return _etag(*state) if state else None
+
+
+def task_detail_last_modified(request, slug, *args, **kwargs):
+    state = _detail_state(request, slug)
+    return state[1] if state else None
+
+
+def serialize_task(request, task, full=False):
+    data = {
+        'id': task.id,
+        'title': task.title,
+        'slug': task.slug,
+        'url': request.build_absolute_uri(
+            reverse('deals:api_task_detail', kwargs={'slug': task.slug})),
+        'modified': task.modified.isoformat(),
+    }
+    if full:
+        data['text'] = task.text
+        data['image'] = (request.build_absolute_uri(task.image.url)
+                         if task.image else None)
+    return data
+
+
+@method_decorator(
+    condition(task_list_etag, task_list_last_modified), name='get')
+class TaskListApi(ReplicaReadMixin, LoginRequiredMixin, View):
+    """Список заданий в JSON постранично: ?after=<id>, ?before=<id>."""
+    login_url = '/admin/login/'
+    paginate_by = 100
+
+    def get(self, request, *args, **kwargs):
+        cursors = {}
+        for name in ('after', 'before'):
+            if name in request.GET:
+                try:
+                    cursors[name] = int(request.GET[name])
+                except ValueError:
+                    raise Http404('Некорректный курсор')
+        queryset = Task.objects.only('id', 'title', 'slug', 'modified')
+        page = KeysetPaginator(queryset, self.paginate_by).page(**cursors)
+        url = reverse('deals:api_task_list')
+        return JsonResponse({
+            'results': [
+                serialize_task(request, task) for task in page.object_list
+            ],
+            'next': (request.build_absolute_uri(
+                f'{url}?after={page.next_cursor}')
+                if page.has_next() else None),
+            'previous': (request.build_absolute_uri(
+                f'{url}?before={page.previous_cursor}')
+                if page.has_previous() else None),
+        })
+
+
+@method_decorator(
+    condition(task_detail_etag, task_detail_last_modified), name='get')
+class TaskDetailApi(ReplicaReadMixin, LoginRequiredMixin, View):
+    """Задание в JSON."""
+    login_url = '/admin/login/'
+
+    def get(self, request, slug, *args, **kwargs):
+        task = get_object_or_404(Task, slug=slug)
+        return JsonResponse(serialize_task(request, task, full=True))
+
+
+class TaskStatsApi(ReplicaReadMixin, LoginRequiredMixin, View):
+    """Статистика заданий в JSON: ?days=<число дней>."""
+    login_url = '/admin/login/'
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days = min(int(request.GET.get('days', 30)), 366)
+        except ValueError:
+            raise Http404('Некорректное число дней')
+        data = stats.get_stats(max(days, 0))
+        for row in data['per_day']:
+            row['day'] = row['day'].isoformat()
+        return JsonResponse(data)
@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class DealsConfig(AppConfig):
     name = 'deals'
+
+    def ready(self):
+        if settings.TASK_INGEST_DIR and settings.SQLITE_PRODUCTION:
+            raise ImproperlyConfigured(
+                'Отложенная запись (TODO_INGEST_DIR) не поддерживается '
+                'вместе с TODO_SQLITE_PRODUCTION: в режиме WAL она не '
+                'быстрее прямой записи')
+        # Подключаем обработчики сигналов модели Task
+        from . import signals  # noqa: F401
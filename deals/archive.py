@@ -0,0 +1,58 @@
+"""Перенос давно не менявшихся задач из deals_task в архив.
+
+Горячая таблица остаётся маленькой, и поиск по адресу, список задач и
+счётчики админки не замедляются с ростом истории. Задачи переносятся
+пачками, каждая пачка — отдельная транзакция из INSERT ... SELECT в архив
+и DELETE из deals_task, поэтому прерванный перенос можно просто
+запустить снова.
+
+DELETE выполняется в обход ORM: сигналы post_delete удалили бы файлы
+картинок, а архивная задача продолжает на них ссылаться. Триггеры
+поиска и счётчиков срабатывают: архивные задачи не ищутся и не входят
+в статистику.
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import ArchivedTask, Task
+
+COLUMNS = ('id', 'title', 'text', 'slug', 'image', 'image_thumbnail',
+           'image_medium', 'image_webp', 'modified', 'created')
+
+
+def cold_ids(cutoff, limit, using=None):
+    """id задач, не менявшихся с cutoff, по возрастанию."""
+    return list(
+        Task.objects.using(using).filter(modified__lt=cutoff)
+        .order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+def archive(ids, cutoff=None, using=None):
+    """Переносит в архив одной транзакцией задачи с указанными id,
+    не менявшиеся с cutoff (по умолчанию — с текущего момента).
+
+    Условие проверяется в самих INSERT и DELETE: задача, изменённая
+    после выборки cold_ids(), остаётся в deals_task. Возвращает число
+    перенесённых задач.
+    """
+    using = using or router.db_for_write(Task)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(map(quote, COLUMNS))
+    now = timezone.now()
+    archived = connection.ops.adapt_datetimefield_value(now)
+    cutoff = connection.ops.adapt_datetimefield_value(cutoff or now)
+    where = (f'WHERE {quote("id")} IN ({", ".join(["%s"] * len(ids))}) '
+             f'AND {quote("modified")} < %s')
+    with transaction.atomic(using), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ArchivedTask._meta.db_table)} '
+            f'({columns}, {quote("archived")}) '
+            f'SELECT {columns}, %s FROM {quote(Task._meta.db_table)} '
+            f'{where}',
+            [archived, *ids, cutoff])
+        cursor.execute(
+            f'DELETE FROM {quote(Task._meta.db_table)} {where}',
+            [*ids, cutoff])
+        return cursor.rowcount
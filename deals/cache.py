@@ -0,0 +1,97 @@
+"""Кеш отрендеренных страниц задач.
+
+Ключ страницы строится из slug и версии задачи. Версия хранится в том же
+кеше и меняется при каждом сохранении или удалении задачи (см. signals.py),
+поэтому старые записи просто перестают читаться и вытесняются со временем.
+Новую версию видят только процессы с тем же кешем: с кешем в памяти
+процесса страница устаревает в других воркерах до истечения
+TASK_DETAIL_CACHE_TIMEOUT.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+HITS_KEY = 'deals:task_detail:hits'
+MISSES_KEY = 'deals:task_detail:misses'
+
+
+def get_cache():
+    return caches[settings.TASK_DETAIL_CACHE_ALIAS]
+
+
+def is_shared():
+    """Видят ли invalidate() другие процессы: кеш в памяти процесса
+    сбрасывается только в нём самом."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def _version_key(slug):
+    return f'deals:task_detail:version:{slug}'
+
+
+def get_version(slug):
+    """Возвращает текущую версию задачи, заводя новую при отсутствии."""
+    cache = get_cache()
+    key = _version_key(slug)
+    version = cache.get(key)
+    if version is None:
+        # Если версия вытеснена из кеша, новая версия не должна совпасть
+        # ни с одной из старых, иначе можно прочитать устаревшую страницу
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(slug):
+    """Делает недействительной закешированную страницу задачи."""
+    get_cache().set(_version_key(slug), uuid.uuid4().hex, None)
+
+
+def _detail_key(slug, version):
+    return f'deals:task_detail:{slug}:{version}'
+
+
+def _incr(key):
+    cache = get_cache()
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Счётчик вытеснен между add() и incr()
+            cache.add(key, 1, None)
+
+
+def get_detail(slug, version):
+    """Возвращает отрендеренную страницу задачи или None."""
+    content = get_cache().get(_detail_key(slug, version))
+    _incr(MISSES_KEY if content is None else HITS_KEY)
+    return content
+
+
+def set_detail(slug, version, content, timeout=None):
+    # Версию берём до чтения задачи из БД: если задачу изменят во время
+    # рендеринга, страница сохранится под уже устаревшей версией
+    get_cache().set(
+        _detail_key(slug, version),
+        content,
+        timeout or settings.TASK_DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def stats():
+    """Счётчики попаданий и промахов кеша страниц задач."""
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,53 @@
+"""Потоковая выгрузка задач в NDJSON и CSV."""
+import csv
+import json
+
+from .models import Task
+
+FIELDS = ('id', 'title', 'text', 'slug', 'image')
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+def iter_rows(after=0, chunk_size=2000, using=None):
+    """Перебирает задачи по возрастанию id пачками по chunk_size.
+
+    Каждая пачка — отдельный короткий запрос по первичному ключу, а не
+    один курсор на всю выгрузку: так SQLite не держит блокировку чтения,
+    пока клиент медленно скачивает файл.
+    """
+    last_id = after
+    while True:
+        rows = list(
+            Task.objects.using(using).filter(id__gt=last_id).order_by('id')
+            .values_list(*FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def ndjson_stream(after=0, using=None):
+    for rows in iter_rows(after, using=using):
+        yield ''.join(
+            json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def csv_stream(after=0, using=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for rows in iter_rows(after, using=using):
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson; charset=utf-8'),
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+}
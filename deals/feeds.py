@@ -0,0 +1,82 @@
+"""Atom-лента последних задач.
+
+Лента хранится в кеше под версиями частей карты сайта (см. sitemaps.py),
+в которые попадают её задачи: изменение старой задачи ленту не сбрасывает.
+
+В ленте заголовки и тексты задач, поэтому, как и страницы задач, она
+по умолчанию доступна только после входа. Читалкам лент она открыта,
+только если включён SITEMAP_PUBLIC.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.contrib.syndication.views import Feed
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from todo.routers import replica_reads
+
+from .models import SITEMAP_CHUNK_SIZE, SitemapChunk, Task
+from .sitemaps import get_cache, site_url
+
+# Сколько знаков текста задачи попадает в ленту
+DESCRIPTION_LENGTH = 500
+
+
+def _feed_key(base):
+    size = settings.TASK_FEED_SIZE
+    oldest = list(Task.objects.order_by('-id')
+                  .values_list('id', flat=True)[size - 1:size])
+    start = oldest[0] if oldest else 0
+    versions = SitemapChunk.objects.filter(
+        number__gte=start // SITEMAP_CHUNK_SIZE,
+    ).order_by('number').values_list('number', 'version', 'changed')
+    digest = hashlib.md5(repr(list(versions)).encode()).hexdigest()
+    return f'deals:feed:{base}:{digest}'
+
+
+class TaskFeed(Feed):
+    feed_type = Atom1Feed
+    title = 'Новые задачи'
+    subtitle = 'Последние добавленные задачи'
+    login_url = '/admin/login/'
+
+    def __call__(self, request, *args, **kwargs):
+        if not (settings.SITEMAP_PUBLIC or request.user.is_authenticated):
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        with replica_reads():
+            # Ключ считаем до чтения задач, как и для частей карты сайта
+            key = _feed_key(site_url(request))
+            cache = get_cache()
+            response = cache.get(key)
+            if response is None:
+                response = super().__call__(request, *args, **kwargs)
+                cache.set(key, response, settings.SITEMAP_CACHE_TIMEOUT)
+        return response
+
+    def link(self):
+        return reverse('deals:home')
+
+    def items(self):
+        return (
+            Task.objects.order_by('-id')
+            .only('title', 'text', 'slug', 'created', 'modified')
+            [:settings.TASK_FEED_SIZE].iterator()
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return Truncator(item.text).chars(DESCRIPTION_LENGTH)
+
+    def item_link(self, item):
+        return reverse('deals:task_detail', kwargs={'slug': item.slug})
+
+    def item_pubdate(self, item):
+        return item.created
+
+    def item_updateddate(self, item):
+        return item.modified
@@ -1,8 +1,44 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from pytils.translit import slugify
+from django.db.models import Q
+from PIL import Image
 
-from .models import Task
+from .models import Task, taken_slugs
+from .uploads import check_image
+
+
+class UploadedImageField(forms.ImageField):
+    """Картинка, уже проверенная по заголовку в ImageUploadHandler.
+
+    Для такого файла остаётся только verify(): он проверяет структуру
+    файла, не декодируя пиксели, и отклоняет битое тело за правильным
+    заголовком. Файлы, пришедшие не через обработчик загрузки,
+    проверяются как обычно и по тем же пределам.
+    """
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise ValidationError(error, code='invalid_image')
+        image_format = getattr(data, 'image_format', None)
+        if image_format is None:
+            f = super().to_python(data)
+            if f is not None:
+                error = check_image(f.image.format, f.image.size)
+                if error:
+                    raise ValidationError(error, code='invalid_image')
+            return f
+        f = forms.FileField.to_python(self, data)
+        try:
+            with Image.open(f, formats=[image_format]) as image:
+                image.verify()
+        except Exception:
+            # Pillow бросает при битом файле исключения разных типов
+            raise ValidationError(self.error_messages['invalid_image'],
+                                  code='invalid_image')
+        finally:
+            f.seek(0)
+        f.content_type = Image.MIME.get(image_format)
+        return f
 
 
 class TaskCreateForm(forms.ModelForm):
@@ -12,16 +48,31 @@ class TaskCreateForm(forms.ModelForm):
         # Магия Джанго: через '__all__' создаётся форма из всех полей модели
         # labels и help_texts берутся из verbose_name и help_text
         fields = '__all__'
+        field_classes = {'image': UploadedImageField}
+
+    @staticmethod
+    def slug_taken_error(slug):
+        return ValidationError(f'Адрес "{slug}" уже существует, '
+                               'придумайте уникальное значение')
 
     # Валидация поля slug
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data['slug']
-        if not slug:
-            title = cleaned_data['title']
-            slug = slugify(title)[:100]
-        if Task.objects.filter(slug=slug).exists():
-            raise ValidationError(f'Адрес "{slug}" уже существует, '
-                                  'придумайте уникальное значение')
+        """Обрабатывает случай, если указанный slug не уникален.
+
+        Пустой slug не проверяем: Task.save() сам подберёт свободный адрес.
+        """
+        slug = self.cleaned_data['slug']
+        if slug and taken_slugs(Q(slug=slug)):
+            raise self.slug_taken_error(slug)
         return slug
+
+    def validate_unique(self):
+        # Уникальность slug уже проверена в clean_slug(), а при
+        # одновременной отправке её гарантирует уникальный индекс в БД;
+        # повторный запрос из Model.validate_unique() не нужен
+        exclude = self._get_validation_exclusions()
+        exclude.append('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
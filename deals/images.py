@@ -0,0 +1,120 @@
+"""Уменьшенные копии картинок задач.
+
+Копии строятся в фоновом пуле потоков после сохранения задачи, поэтому
+запрос с загрузкой картинки не ждёт, пока Pillow пережмёт файл.
+Для уже загруженных картинок есть команда generate_task_images.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Поле модели: ширина копии в пикселях и формат файла
+VARIANTS = {
+    'image_thumbnail': (320, 'JPEG'),
+    'image_medium': (1024, 'JPEG'),
+    'image_webp': (1024, 'WEBP'),
+}
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TASK_IMAGE_WORKERS,
+                thread_name_prefix='task-images',
+            )
+    return _executor
+
+
+def schedule(task_id):
+    """Ставит построение копий картинки задачи в фоновую очередь."""
+    get_executor().submit(_run_in_background, task_id)
+
+
+def _run_in_background(task_id):
+    try:
+        make_variants(task_id)
+    except Exception:
+        logger.exception('Не удалось построить копии картинки задачи %s',
+                         task_id)
+    finally:
+        # Поток пула живёт долго: соединение с БД закрываем сами
+        close_old_connections()
+
+
+def resize(image, width, image_format):
+    """Возвращает байты копии картинки шириной не больше width."""
+    copy = image.copy()
+    copy.thumbnail((width, copy.height), Image.LANCZOS)
+    if image_format == 'JPEG' and copy.mode != 'RGB':
+        copy = copy.convert('RGB')
+    buffer = BytesIO()
+    copy.save(buffer, image_format, quality=82, optimize=True)
+    return buffer.getvalue()
+
+
+def make_variants(task_id, force=False):
+    """Строит копии картинки задачи и записывает их в модель.
+
+    Возвращает False, если у задачи нет картинки или копии уже есть.
+    """
+    task = Task.objects.filter(pk=task_id).first()
+    if task is None or not task.image:
+        return False
+    if not force and all(getattr(task, name) for name in VARIANTS):
+        return False
+    source_name = task.image.name
+    with task.image.open('rb') as source:
+        image = Image.open(source)
+        # Для JPEG декодируем сразу в уменьшенном масштабе
+        image.draft('RGB', (max(w for w, _ in VARIANTS.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    # Прежние копии (при force) после записи новых не нужны
+    previous = [getattr(task, name).name for name in VARIANTS
+                if getattr(task, name)]
+    names = {}
+    for name, (width, image_format) in VARIANTS.items():
+        field_file = getattr(task, name)
+        field_file.save(
+            f'{stem}-{width}.{EXTENSIONS[image_format]}',
+            ContentFile(resize(image, width, image_format)),
+            save=False,
+        )
+        names[name] = field_file.name
+    # update() не вызывает сигналов и не трогает auto_now, поэтому кеш
+    # страницы сбрасываем, а дату изменения ставим сами.
+    # Условие на image защищает от записи копий уже заменённой картинки
+    updated = Task.objects.filter(pk=task_id, image=source_name).update(
+        modified=timezone.now(), **names)
+    if not updated:
+        for name in names:
+            getattr(task, name).delete(save=False)
+        return False
+    for name in previous:
+        if name not in names.values():
+            task.image.storage.delete(name)
+    cache.invalidate(task.slug)
+    return True
@@ -0,0 +1,282 @@
+"""Отложенная пакетная запись задач из формы на главной странице.
+
+Включается настройкой TASK_INGEST_DIR. Проверенная форма записывается
+файлом в очередь на диске, а фоновый поток сохраняет накопившиеся задачи
+одной транзакцией bulk_create: по TASK_INGEST_BATCH_SIZE штук или раз
+в TASK_INGEST_INTERVAL секунд. SQLite пропускает одного писателя за раз,
+и в журнале отката каждая фиксация делает fsync, поэтому одна большая
+транзакция вместо сотни маленьких заметно поднимает число принятых
+задач в секунду. В режиме WAL (TODO_SQLITE_PRODUCTION) фиксация дешевле
+файла очереди и выигрыша нет, поэтому вместе они не включаются.
+
+Очередь переживает перезапуск воркера: файл удаляется только после
+фиксации транзакции, а файлы, взятые в работу упавшим процессом,
+возвращаются в очередь. Чтобы очередь пережила и отключение питания,
+включите TASK_INGEST_FSYNC. Имя файла служит ключом записи: ключи
+сохранённых задач пишутся в IngestedEntry той же транзакцией, поэтому
+если процесс упадёт между фиксацией и удалением файлов, повторная
+запись пачки пропустит уже сохранённые задачи.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import Q
+
+from . import images
+from .models import IngestedEntry, Task, lock_for_write, taken_slugs
+from .slugs import (
+    PREFIX_QUERY_SIZE, SlugAllocator, slug_from_title, taken_slugs_q,
+)
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('title', 'text', 'slug', 'image')
+
+_flusher = None
+_flusher_lock = threading.Lock()
+_created_dirs = set()
+
+
+def enabled():
+    return bool(settings.TASK_INGEST_DIR)
+
+
+def _path(*parts):
+    return os.path.join(settings.TASK_INGEST_DIR, *parts)
+
+
+def _claimed_dir(pid=None):
+    return _path(f'claimed-{pid or os.getpid()}')
+
+
+def _makedirs():
+    # Каталоги создаются один раз на процесс: os.makedirs() на каждом
+    # запросе обходится почти в миллисекунду
+    key = (settings.TASK_INGEST_DIR, os.getpid())
+    if key in _created_dirs:
+        return
+    for name in ('tmp', 'queue', _claimed_dir()):
+        os.makedirs(_path(name), exist_ok=True)
+    _created_dirs.add(key)
+
+
+def enqueue(data):
+    """Надёжно ставит задачу в очередь и будит фоновую запись."""
+    _makedirs()
+    # Имя начинается со времени: очередь разбирается по порядку поступления,
+    # а старые ключи удаляются по диапазону первичного ключа
+    name = f'{_key(time.time_ns())}-{uuid.uuid4().hex}.json'
+    tmp = _path('tmp', name)
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({field: data.get(field) for field in FIELDS}, f,
+                  ensure_ascii=False)
+        if settings.TASK_INGEST_FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+    # rename атомарен: в очереди не бывает недописанных файлов
+    os.replace(tmp, _path('queue', name))
+    start().notify()
+
+
+def _key(timestamp_ns):
+    return f'{timestamp_ns:020d}'
+
+
+def _entry_key(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def pending():
+    """Число задач, ждущих записи."""
+    try:
+        return len(os.listdir(_path('queue')))
+    except FileNotFoundError:
+        return 0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recover():
+    """Возвращает в очередь файлы, взятые в работу умершими процессами."""
+    _makedirs()
+    recovered = 0
+    for entry in os.scandir(settings.TASK_INGEST_DIR):
+        if not entry.name.startswith('claimed-'):
+            continue
+        pid = int(entry.name.split('-', 1)[1])
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        for name in os.listdir(entry.path):
+            os.replace(os.path.join(entry.path, name), _path('queue', name))
+            recovered += 1
+        os.rmdir(entry.path)
+    return recovered
+
+
+def _claim(limit):
+    """Забирает из очереди до limit файлов в каталог своего процесса.
+
+    Переименование атомарно, поэтому один файл не достанется двум
+    процессам сразу.
+    """
+    claimed = []
+    for name in sorted(os.listdir(_path('queue')))[:limit * 2]:
+        path = os.path.join(_claimed_dir(), name)
+        try:
+            os.replace(_path('queue', name), path)
+        except FileNotFoundError:
+            # Файл забрал другой процесс
+            continue
+        claimed.append(path)
+        if len(claimed) == limit:
+            break
+    return claimed
+
+
+def build_tasks(entries, using):
+    """Создаёт объекты задач, подбирая свободные адреса запросом
+    на каждые PREFIX_QUERY_SIZE разных адресов.
+
+    Задача с указанным вручную адресом, который заняли, пока она ждала
+    в очереди, не записывается: форма уже проверила адрес, и другой
+    адрес пользователь не выбирал.
+    """
+    tasks = [Task(**entry) for entry in entries]
+    bases = [task.slug or slug_from_title(task.title) for task in tasks]
+    unique = list(dict.fromkeys(bases))
+    taken = []
+    for start in range(0, len(unique), PREFIX_QUERY_SIZE):
+        group = unique[start:start + PREFIX_QUERY_SIZE]
+        condition = Q(*map(taken_slugs_q, group), _connector=Q.OR)
+        taken += taken_slugs(condition, using)
+    allocator = SlugAllocator(taken)
+    accepted = []
+    for task, base in zip(tasks, bases):
+        if task.slug and task.slug in allocator:
+            logger.warning('Задача «%s» из очереди не записана: адрес %s '
+                           'уже занят', task.title, task.slug)
+            continue
+        task.slug = allocator.allocate(base)
+        accepted.append(task)
+    return accepted
+
+
+def flush(limit=None):
+    """Записывает задачи из очереди пачками, возвращает число записанных."""
+    _makedirs()
+    limit = limit or settings.TASK_INGEST_BATCH_SIZE
+    written = 0
+    while True:
+        paths = _claim(limit)
+        if not paths:
+            return written
+        entries = {}
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                entries[_entry_key(path)] = json.load(f)
+        using = router.db_for_write(Task)
+        keys = IngestedEntry.objects.using(using)
+        try:
+            with transaction.atomic(using):
+                # Пачка читает занятые адреса, а потом пишет
+                lock_for_write(using)
+                # Ключи старше TASK_INGEST_KEY_TTL уже не понадобятся
+                ttl = settings.TASK_INGEST_KEY_TTL * 10 ** 9
+                keys.filter(key__lt=_key(time.time_ns() - ttl)).delete()
+                # Пачка уже записывалась процессом, упавшим до удаления
+                # файлов: сохранённые задачи повторно не создаём
+                for key in keys.filter(pk__in=list(entries)).values_list(
+                        'pk', flat=True):
+                    del entries[key]
+                tasks = build_tasks(entries.values(), using)
+                Task.objects.using(using).bulk_create(tasks)
+                keys.bulk_create(IngestedEntry(key=key) for key in entries)
+        except Exception:
+            # Возвращаем пачку в очередь, чтобы повторить её позже
+            for path in paths:
+                os.replace(path, _path('queue', os.path.basename(path)))
+            raise
+        for path in paths:
+            os.remove(path)
+        written += len(tasks)
+        # bulk_create не шлёт post_save: копии картинок ставим сами
+        with_image = [task.slug for task in tasks if task.image]
+        if with_image:
+            for task_id in Task.objects.using(using).filter(
+                    slug__in=with_image).values_list('id', flat=True):
+                images.schedule(task_id)
+
+
+class Flusher(threading.Thread):
+    """Фоновый поток: пишет очередь по размеру пачки или по таймеру."""
+    def __init__(self):
+        super().__init__(name='task-ingest', daemon=True)
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.queued = 0
+        self.lock = threading.Lock()
+
+    def notify(self):
+        with self.lock:
+            self.queued += 1
+            if self.queued >= settings.TASK_INGEST_BATCH_SIZE:
+                self.wake.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        self.join()
+
+    def run(self):
+        recover()
+        while not self.stopping.is_set():
+            self.wake.wait(settings.TASK_INGEST_INTERVAL)
+            self.wake.clear()
+            with self.lock:
+                self.queued = 0
+            try:
+                flush()
+            except Exception:
+                logger.exception('Не удалось записать задачи из очереди')
+                time.sleep(settings.TASK_INGEST_INTERVAL)
+            finally:
+                close_old_connections()
+
+
+def start():
+    """Запускает фоновую запись в этом процессе, если она не запущена."""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = Flusher()
+            _flusher.start()
+            atexit.register(stop)
+    return _flusher
+
+
+def stop():
+    """Дописывает очередь и останавливает фоновую запись.
+
+    Вызывается при выходе из процесса; процессы, завершаемые через
+    os._exit() (например, дочерние multiprocessing), вызывают её сами.
+    """
+    global _flusher
+    with _flusher_lock:
+        flusher, _flusher = _flusher, None
+    if flusher is not None and flusher.is_alive():
+        flusher.stop()
@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, router
+from django.utils import timezone
+
+from deals import archive
+from deals.models import Task
+
+
+class Command(BaseCommand):
+    help = ('Переносит в архив задачи, которые давно не менялись. '
+            'Работает пачками, прерванный перенос продолжается '
+            'повторным запуском')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Переносить задачи, не менявшиеся столько дней',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько задач переносить одной транзакцией',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза между пачками в секундах, чтобы пропускать '
+                 'запись из запросов',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Перенести не больше стольких задач',
+        )
+
+    def handle(self, *args, **options):
+        # Граница фиксируется при запуске: задачи, которые станут старыми
+        # во время переноса, подождут следующего запуска
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        using = router.db_for_write(Task)
+        limit = options['limit']
+        moved = 0
+        while limit is None or moved < limit:
+            size = options['batch_size']
+            if limit is not None:
+                size = min(size, limit - moved)
+            ids = archive.cold_ids(cutoff, size, using)
+            if not ids:
+                break
+            try:
+                moved += archive.archive(ids, cutoff, using)
+            except IntegrityError as e:
+                raise CommandError(
+                    f'Не удалось перенести задачи {ids[0]}..{ids[-1]}: {e}. '
+                    f'Перенесено задач: {moved}')
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Перенесено задач: {moved}')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Перенесено в архив задач: {moved}')
@@ -0,0 +1,171 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from deals.models import Task
+from deals.synthetic import TaskGenerator
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержки основных страниц на временной базе '
+            'с синтетическими задачами и сравнивает с сохранённым '
+            'эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tasks', type=int, default=10000,
+            help='Сколько задач сгенерировать',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов отправить к каждой странице',
+        )
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON-файл',
+        )
+        parser.add_argument(
+            '--baseline', help='JSON-файл с эталонными результатами',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно эталона (0.2 = 20%%)',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            # statistics.quantiles() нужно хотя бы два замера
+            raise CommandError('--requests должен быть не меньше 2')
+        # Как в рабочем режиме: без DEBUG и журнала всех SQL-запросов
+        setup_test_environment(debug=False)
+        # Замеры идут на отдельной тестовой базе, рабочая не меняется
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(
+                baseline, results, options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Найдены регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write('Регрессий относительно эталона нет')
+
+    def scenarios(self, slugs):
+        """Страница, метод, параметры запроса и нужна ли авторизация."""
+        counter = iter(range(10 ** 9))
+        return {
+            'home_get': lambda client: client.get(reverse('deals:home')),
+            'home_post': lambda client: client.post(
+                reverse('deals:home'),
+                {'title': f'Замер {next(counter)}', 'text': 'Текст'},
+            ),
+            'task_list': lambda client: client.get(
+                reverse('deals:task_list')),
+            'task_detail': lambda client: client.get(reverse(
+                'deals:task_detail', kwargs={'slug': next(slugs)})),
+            'about': lambda client: client.get(
+                reverse('static_pages:about')),
+        }
+
+    def run(self, options):
+        started = time.monotonic()
+        TaskGenerator().seed(options['tasks'])
+        self.stdout.write(
+            f'Сгенерировано задач: {options["tasks"]} за '
+            f'{time.monotonic() - started:.1f} с')
+        user = get_user_model().objects.create_user(username='benchmark')
+        client = Client()
+        client.force_login(user)
+        all_slugs = list(Task.objects.values_list('slug', flat=True)[:1000])
+        slugs = (all_slugs[i % len(all_slugs)] for i in range(10 ** 9))
+
+        views = {}
+        for name, request in self.scenarios(slugs).items():
+            # Первый запрос прогревает шаблоны и кеши и в замер не входит
+            request(client)
+            timings = []
+            for _ in range(options['requests']):
+                began = time.perf_counter()
+                request(client)
+                timings.append((time.perf_counter() - began) * 1000)
+            with CaptureQueriesContext(connection) as queries:
+                response = request(client)
+            # Журнал запросов очищается в начале следующего запроса
+            query_count = len(queries)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name}: ответ {response.status_code}')
+            # tracemalloc замедляет выполнение, поэтому пик памяти
+            # меряем отдельным запросом
+            tracemalloc.start()
+            request(client)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            percentiles = statistics.quantiles(timings, n=100)
+            views[name] = {
+                'p50_ms': round(percentiles[49], 3),
+                'p95_ms': round(percentiles[94], 3),
+                'p99_ms': round(percentiles[98], 3),
+                'queries': query_count,
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+        return {
+            'meta': {
+                'tasks': options['tasks'],
+                'requests': options['requests'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'views': views,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"страница":<14}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}'
+            f'{"запросы":>10}{"память, КиБ":>14}')
+        for name, view in results['views'].items():
+            self.stdout.write(
+                f'{name:<14}{view["p50_ms"]:>10.2f}{view["p95_ms"]:>10.2f}'
+                f'{view["p99_ms"]:>10.2f}{view["queries"]:>10}'
+                f'{view["peak_memory_kb"]:>14.1f}')
+
+    @staticmethod
+    def compare(baseline, results, threshold):
+        """Возвращает описания регрессий относительно эталона."""
+        regressions = []
+        for name, view in results['views'].items():
+            expected = baseline['views'].get(name)
+            if expected is None:
+                continue
+            limit = expected['p95_ms'] * (1 + threshold)
+            if view['p95_ms'] > limit:
+                regressions.append(
+                    f'{name}: p95 {view["p95_ms"]:.2f} мс > '
+                    f'{limit:.2f} мс')
+            if view['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {view["queries"]} > '
+                    f'{expected["queries"]}')
+        return regressions
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from deals import ingest
+from deals.models import Task
+
+
+def _worker(number, requests, queue):
+    """Отправляет форму requests раз и возвращает время ответов."""
+    answered = None
+    try:
+        client = Client()
+        url = reverse('deals:home')
+        started = time.monotonic()
+        for i in range(requests):
+            response = client.post(url, {
+                'title': f'Задача {number}-{i}',
+                'text': 'Текст задачи',
+            })
+            if response.status_code != 302:
+                return
+        answered = time.monotonic() - started
+        if ingest.enabled():
+            # Дописываем свою часть очереди до выхода процесса
+            ingest.stop()
+            ingest.flush()
+    finally:
+        queue.put(answered)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет, сколько задач в секунду принимает форма на главной '
+            'странице при записи каждой задачи сразу и через очередь '
+            '(TODO_INGEST_DIR). Очередь работает только с журналом отката, '
+            'без TODO_SQLITE_PRODUCTION')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Сколько задач отправляет каждый процесс')
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Прогнать оба режима на временных базах и вывести '
+                 'оба результата',
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(options)
+            return
+        before = Task.objects.count()
+        # Дочерние процессы не должны унаследовать открытое соединение
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [
+            context.Process(target=_worker,
+                            args=(number, options['requests'], queue))
+            for number in range(options['processes'])
+        ]
+        started = time.monotonic()
+        for process in processes:
+            process.start()
+        answered = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.monotonic() - started
+        if None in answered:
+            raise CommandError('Форма вернула ошибку, см. журнал выше')
+
+        total = options['processes'] * options['requests']
+        written = Task.objects.count() - before
+        mode = 'queue' if ingest.enabled() else 'direct'
+        self.stdout.write(
+            f'{mode:<7} ответы: {total / max(answered):>7.0f} задач/с  '
+            f'записано {written} из {total}: '
+            f'{written / elapsed:>7.0f} задач/с'
+        )
+
+    def compare(self, options):
+        """Запускает замер в двух режимах на отдельных временных базах."""
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        arguments = [
+            f'--processes={options["processes"]}',
+            f'--requests={options["requests"]}',
+        ]
+        for mode in ('direct', 'queue'):
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(
+                    os.environ,
+                    TODO_DB_PATH=os.path.join(directory, 'bench.sqlite3'),
+                    TODO_SQLITE_PRODUCTION='',
+                    TODO_INGEST_DIR=(os.path.join(directory, 'ingest')
+                                     if mode == 'queue' else ''),
+                )
+                subprocess.run(
+                    manage + ['migrate', '-v0'], env=env, check=True)
+                output = subprocess.run(
+                    manage + ['benchmark_ingest'] + arguments,
+                    env=env, check=True, stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                ).stdout
+                self.stdout.write(output, ending='')
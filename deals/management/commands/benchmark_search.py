@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from deals.models import Task
+from deals.search import search_tasks
+from deals.synthetic import TaskGenerator
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексу FTS5 с поиском через icontains. '
+            'По умолчанию сгенерированные задачи удаляются после замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Сколько синтетических задач добавить перед замерами',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторить каждый запрос',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Размер страницы результатов',
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять сгенерированные задачи',
+        )
+        parser.add_argument(
+            'queries', nargs='*',
+            help='Поисковые запросы; по умолчанию частое, среднее '
+                 'и редкое слово из словаря',
+        )
+
+    def handle(self, *args, **options):
+        generator = TaskGenerator()
+        if not options['queries']:
+            options['queries'] = [generator.words[i] for i in (0, 100, 5000)]
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    started = time.monotonic()
+                    generator.seed(options['seed'])
+                    self.stdout.write(
+                        f'Добавлено задач: {options["seed"]} за '
+                        f'{time.monotonic() - started:.1f} с')
+                self.run(options)
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        limit = options['limit']
+        self.stdout.write(f'{"запрос":<24}{"fts5, мс":>12}{"icontains, мс":>16}')
+        for query in options['queries']:
+            fts = self.measure(
+                lambda: search_tasks(query, limit), options['repeat'])
+            condition = Q()
+            for word in query.split():
+                condition &= Q(title__icontains=word) | Q(text__icontains=word)
+            baseline = self.measure(
+                lambda: list(Task.objects.filter(condition)
+                             .only('id', 'title', 'slug')[:limit]),
+                options['repeat'],
+            )
+            self.stdout.write(f'{query:<24}{fts:>12.2f}{baseline:>16.2f}')
+
+    @staticmethod
+    def measure(func, repeat):
+        """Медиана времени выполнения в миллисекундах."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return timings[len(timings) // 2]
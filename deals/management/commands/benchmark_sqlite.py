@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+
+from deals.models import Task
+
+
+def _worker(role, seconds, queue):
+    """Пишет или читает задачи до истечения времени, считая ошибки."""
+    rng = random.Random(os.getpid())
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if role == 'writer':
+                Task.objects.create(
+                    title=f'Нагрузка {rng.random()}', text='Текст')
+            else:
+                Task.objects.filter(
+                    pk=rng.randint(1, 1000)).values('title').first()
+            done += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            errors += 1
+        # Имитируем конец запроса: с CONN_MAX_AGE соединение остаётся
+        # открытым, без него — закрывается, как в обычном воркере
+        close_old_connections()
+    queue.put((role, done, errors))
+
+
+class Command(BaseCommand):
+    help = ('Нагружает SQLite параллельными процессами-писателями '
+            'и читателями и выводит пропускную способность и число '
+            'ошибок "database is locked"')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Прогнать замер в обычном и производственном режимах '
+                 'на временной базе и вывести оба результата',
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(options)
+            return
+        if settings.DATABASES['default']['ENGINE'] != (
+                'django.db.backends.sqlite3'):
+            raise CommandError('Замер рассчитан только на SQLite')
+        # Дочерние процессы не должны унаследовать открытое соединение
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        roles = (['writer'] * options['writers']
+                 + ['reader'] * options['readers'])
+        processes = [
+            context.Process(
+                target=_worker, args=(role, options['seconds'], queue))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        mode = 'production' if settings.SQLITE_PRODUCTION else 'default'
+        for role in ('writer', 'reader'):
+            done = sum(r[1] for r in results if r[0] == role)
+            errors = sum(r[2] for r in results if r[0] == role)
+            self.stdout.write(
+                f'{mode:<11} {role:<7} '
+                f'{done / options["seconds"]:>9.0f} оп/с  '
+                f'ошибок блокировки: {errors}'
+            )
+
+    def compare(self, options):
+        """Запускает замер в двух режимах на отдельных временных базах."""
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        arguments = [
+            f'--writers={options["writers"]}',
+            f'--readers={options["readers"]}',
+            f'--seconds={options["seconds"]}',
+        ]
+        for production in ('0', '1'):
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(
+                    os.environ,
+                    TODO_DB_PATH=os.path.join(directory, 'bench.sqlite3'),
+                    TODO_SQLITE_PRODUCTION=production,
+                )
+                subprocess.run(
+                    manage + ['migrate', '-v0'], env=env, check=True)
+                output = subprocess.run(
+                    manage + ['benchmark_sqlite'] + arguments,
+                    env=env, check=True, stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                ).stdout
+                self.stdout.write(output, ending='')
@@ -0,0 +1,230 @@
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.client import HTTPConnection
+from io import BytesIO
+from unittest import mock
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from PIL import Image
+
+# Обработчики загрузки Django по умолчанию
+DJANGO_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+TOKEN_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def peak_rss():
+    """Пиковый размер процесса в МиБ.
+
+    ru_maxrss не подходит: после fork() и exec() он наследует пик
+    родителя, а родитель держит в памяти загружаемые картинки.
+    """
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise CommandError('Замер памяти работает только в Linux')
+
+
+def make_photo(megapixels):
+    """JPEG из шума: такой файл почти не сжимается."""
+    side = int((megapixels * 1000 * 1000) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return 'photo.jpg', buffer.getvalue()
+
+
+def make_bomb():
+    """PNG 10000×10000 одного цвета: сотни КиБ на диске и 300 МиБ
+    после декодирования. Pillow только предупреждает о такой картинке."""
+    buffer = BytesIO()
+    Image.new('RGB', (10000, 10000), 'white').save(buffer, 'PNG')
+    return 'bomb.png', buffer.getvalue()
+
+
+def multipart(fields, file_name, content):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; '
+            f'name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image"; '
+        f'filename="{file_name}"\r\nContent-Type: application/octet-stream'
+        f'\r\n\r\n'.encode())
+    parts.append(content)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return boundary, b''.join(parts)
+
+
+def upload(port, number, file_name, content, results):
+    """Загружает картинку через форму на главной странице."""
+    connection = HTTPConnection('127.0.0.1', port, timeout=600)
+    connection.request('GET', '/')
+    response = connection.getresponse()
+    page = response.read()
+    cookie = response.getheader('Set-Cookie').split(';')[0]
+    token = TOKEN_RE.search(page).group(1).decode()
+    boundary, body = multipart({
+        'csrfmiddlewaretoken': token,
+        'title': f'Загрузка {number}',
+        'text': 'Текст',
+    }, file_name, content)
+    connection.request('POST', '/', body=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}',
+        'Cookie': cookie,
+    })
+    response = connection.getresponse()
+    response.read()
+    results.append(response.status)
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пиковую память воркера, когда несколько клиентов '
+            'одновременно загружают картинки на главную страницу: с '
+            'обработчиками загрузки Django и с потоковым ImageUploadHandler')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--megapixels', type=float, default=2.0,
+                            help='Размер загружаемой фотографии')
+        parser.add_argument(
+            '--bomb', action='store_true',
+            help='Загружать картинку-бомбу 10000×10000 вместо фотографии; '
+                 'включает --variants')
+        parser.add_argument(
+            '--variants', action='store_true',
+            help='Строить копии картинок, как в работе сайта. Без этого '
+                 'замеряется только приём загрузок')
+        parser.add_argument('--timeout', type=float, default=120,
+                            help='Сколько ждать построения копий картинок')
+        # Внутренние параметры: запуск сервера для замера
+        parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+        parser.add_argument('--handlers', choices=['django', 'streaming'],
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--media-root', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            self.serve(options)
+            return
+        if options['bomb']:
+            options['variants'] = True
+            file_name, content = make_bomb()
+        else:
+            file_name, content = make_photo(options['megapixels'])
+        self.stdout.write(
+            f'Загрузок: {options["concurrency"]}, файл {file_name}, '
+            f'{len(content) / 1024 / 1024:.1f} МиБ')
+        for handlers in ('django', 'streaming'):
+            self.measure(handlers, file_name, content, options)
+
+    def measure(self, handlers, file_name, content, options):
+        """Запускает сервер в отдельном процессе и загружает картинки."""
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        port = 18000 + os.getpid() % 1000
+        with tempfile.TemporaryDirectory() as directory:
+            media_root = os.path.join(directory, 'media')
+            env = dict(os.environ,
+                       TODO_DB_PATH=os.path.join(directory, 'bench.sqlite3'))
+            subprocess.run(manage + ['migrate', '-v0'], env=env, check=True)
+            server = subprocess.Popen(
+                manage + ['benchmark_uploads', f'--serve={port}',
+                          f'--handlers={handlers}',
+                          f'--media-root={media_root}']
+                + (['--variants'] if options['variants'] else []),
+                env=env, stdout=subprocess.PIPE, universal_newlines=True)
+            baseline = float(server.stdout.readline())
+            results = []
+            threads = [
+                threading.Thread(target=upload,
+                                 args=(port, n, file_name, content, results))
+                for n in range(options['concurrency'])
+            ]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+            accepted = results.count(302)
+            # Копии картинок строятся в фоне: ждём, пока появятся все
+            deadline = time.monotonic() + options['timeout']
+            while (options['variants']
+                   and self.variants(media_root) < accepted
+                   and time.monotonic() < deadline):
+                time.sleep(0.2)
+            server.terminate()
+            peak = float(server.stdout.readline())
+            server.wait()
+        if len(results) != options['concurrency']:
+            raise CommandError('Часть загрузок завершилась ошибкой')
+        self.stdout.write(
+            f'{handlers:<9} принято {accepted} из {len(results)} '
+            f'за {elapsed:.1f} с, память: {baseline:.0f} МиБ до загрузок, '
+            f'пик {peak:.0f} МиБ (+{max(peak - baseline, 0):.0f})')
+
+    @staticmethod
+    def variants(media_root):
+        return sum(name.endswith('-320.jpg')
+                   for _, _, names in os.walk(media_root) for name in names)
+
+    def serve(self, options):
+        # Одинаковые загрузки не должны сливаться в один файл: замеряется
+        # приём и обработка каждой картинки
+        overrides = {
+            'MEDIA_ROOT': options['media_root'],
+            'DEFAULT_FILE_STORAGE':
+                'django.core.files.storage.FileSystemStorage',
+        }
+        if options['handlers'] == 'django':
+            # Как было до ImageUploadHandler: маленькие файлы в памяти,
+            # размер картинки ограничивает только сам Pillow
+            overrides.update(
+                FILE_UPLOAD_HANDLERS=DJANGO_UPLOAD_HANDLERS,
+                TASK_IMAGE_MAX_SIZE=sys.maxsize,
+                TASK_IMAGE_MAX_PIXELS=2 * Image.MAX_IMAGE_PIXELS,
+            )
+        override_settings(**overrides).enable()
+        if not options['variants']:
+            mock.patch('deals.images.schedule').start()
+        server = make_server('127.0.0.1', options['serve'],
+                             get_wsgi_application(),
+                             server_class=ThreadingServer,
+                             handler_class=QuietHandler)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.stdout.write(f'{peak_rss():.1f}')
+        self.stdout.flush()
+        server.serve_forever()
+
+    def stop(self, signum, frame):
+        self.stdout.write(f'{peak_rss():.1f}')
+        self.stdout.flush()
+        os._exit(0)
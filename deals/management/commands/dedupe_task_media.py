@@ -0,0 +1,99 @@
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from deals import cache
+from deals.media import iter_media_files, referenced_names, relink
+from deals.models import Task
+from deals.storage import (
+    ContentAddressedStorage, blob_name, content_hash, is_content_addressed,
+)
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки задач из MEDIA_ROOT/tasks в хранилище по '
+            'содержимому: одинаковые файлы остаются одним файлом, ссылки '
+            'задач переписываются. Каталог обходится потоком, прерванный '
+            'перенос продолжается повторным запуском')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать дубликаты и место, которое освободится',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов переносить одной транзакцией',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: их задачи '
+                 'могут быть ещё не сохранены',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        storage = Task._meta.get_field('image').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('Картинки задач хранятся не в '
+                               'ContentAddressedStorage, проверьте '
+                               'DEFAULT_FILE_STORAGE')
+        if not options['dry_run'] and not cache.is_shared():
+            # Воркеры продолжали бы отдавать из своего кеша страницы
+            # задач со ссылками на уже удалённые старые файлы
+            raise CommandError('Кеш страниц задач хранится в памяти '
+                               'процесса: задайте общий кеш через '
+                               'TODO_CACHE_DIR')
+        root = os.path.join(settings.MEDIA_ROOT, 'tasks')
+        if not os.path.isdir(root):
+            self.stdout.write('Каталог картинок задач не найден')
+            return
+        # Имена в БД хранятся относительно MEDIA_ROOT. Файлы без ссылок
+        # не переносим, их удаляет gc_task_media
+        names = (name for name in (
+            'tasks/' + name
+            for name in iter_media_files(root, options['min_age'])
+        ) if not is_content_addressed(name) and not name.endswith('.tmp'))
+        # Для --dry-run: файлы, которые уже были бы перенесены
+        planned = set()
+        scanned = moved = duplicates = freed = 0
+        while True:
+            batch = list(islice(names, options['batch_size']))
+            if not batch:
+                break
+            scanned += len(batch)
+            mapping = {}
+            for name in sorted(referenced_names(batch)):
+                with storage.open(name) as f:
+                    content = File(f, name)
+                    # С готовым хешем хранилище не читает файл повторно
+                    content.content_hash = content_hash(content)
+                    target = blob_name(name, content.content_hash)
+                    duplicate = target in planned or storage.exists(target)
+                    if not options['dry_run']:
+                        storage.save(name, content)
+                if duplicate:
+                    duplicates += 1
+                    freed += os.path.getsize(storage.path(name))
+                if options['dry_run']:
+                    planned.add(target)
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{name} -> {target}')
+                mapping[name] = target
+            moved += len(mapping)
+            if options['dry_run'] or not mapping:
+                continue
+            relink(mapping)
+            # Ссылок на старые имена больше нет, хранилище удалит файлы
+            for name in mapping:
+                storage.delete(name)
+        action = 'можно перенести' if options['dry_run'] else 'перенесено'
+        self.stdout.write(
+            f'Проверено файлов: {scanned}, {action} {moved}, из них '
+            f'дубликатов {duplicates} ({freed / 1024 / 1024:.1f} МБ) '
+            f'за {time.monotonic() - started:.1f} с'
+        )
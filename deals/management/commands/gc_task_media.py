@@ -0,0 +1,83 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from deals.media import iter_media_files, referenced_names
+from deals.models import MediaBlob
+
+
+def _remove(path):
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT/tasks файлы, на которые не ссылается '
+            'ни одна задача. Каталог обходится потоком, имена сверяются '
+            'с БД пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько имён файлов сверять с БД одним запросом',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Сколько файлов удалять параллельно',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: их задачи '
+                 'могут быть ещё не сохранены',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        root = os.path.join(settings.MEDIA_ROOT, 'tasks')
+        if not os.path.isdir(root):
+            self.stdout.write('Каталог картинок задач не найден')
+            return
+        # Имена в БД хранятся относительно MEDIA_ROOT
+        names = ('tasks/' + name
+                 for name in iter_media_files(root, options['min_age']))
+        scanned = orphans = freed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(islice(names, options['batch_size']))
+                if not batch:
+                    break
+                scanned += len(batch)
+                referenced = referenced_names(batch)
+                orphaned = [name for name in batch if name not in referenced]
+                orphans += len(orphaned)
+                if options['dry_run'] or options['verbosity'] > 1:
+                    for name in orphaned:
+                        self.stdout.write(name)
+                paths = [os.path.join(settings.MEDIA_ROOT, name)
+                         for name in orphaned]
+                if options['dry_run']:
+                    freed += sum(map(os.path.getsize, paths))
+                else:
+                    freed += sum(pool.map(_remove, paths))
+                    MediaBlob.objects.filter(
+                        name__in=orphaned, refs__lte=0).delete()
+        if options['dry_run']:
+            result = f'можно удалить {orphans} ({freed / 1024 / 1024:.1f} МБ)'
+        else:
+            result = f'удалено {orphans} ({freed / 1024 / 1024:.1f} МБ)'
+        self.stdout.write(
+            f'Проверено файлов: {scanned}, {result} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.models import Q
+
+from deals.images import VARIANTS, make_variants
+from deals.models import Task
+
+
+def _make_variants(task_id, force):
+    try:
+        return make_variants(task_id, force=force)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = ('Строит уменьшенные копии картинок задач '
+            'в нескольких процессах')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов; по умолчанию по числу ядер',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько задач раздавать процессам за раз',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить копии, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            missing = Q()
+            for name in VARIANTS:
+                missing |= Q(**{name: ''})
+            tasks = tasks.filter(missing)
+        tasks = tasks.order_by('pk').values_list('pk', flat=True)
+        started = time.monotonic()
+        done = total = 0
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(
+                    tasks.filter(pk__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+                last_id = batch[-1]
+                # Процессы создаются через fork и не должны унаследовать
+                # открытое соединение с БД
+                connections.close_all()
+                results = pool.map(
+                    _make_variants, batch, [options['force']] * len(batch))
+                done += sum(results)
+                total += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Обработано задач: {total}')
+        self.stdout.write(
+            f'Построены копии для {done} из {total} картинок '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,156 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from deals.models import Task, taken_slugs
+from deals.slugs import (
+    PREFIX_QUERY_SIZE, SlugAllocator, slug_from_title, taken_slugs_q,
+)
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Строка {number}: некорректный JSON: {error}')
+        if not isinstance(row, dict):
+            raise CommandError(f'Строка {number}: ожидается объект JSON')
+        yield row
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает задачи из CSV или JSONL. '
+            'Ожидаются поля title, text и необязательное slug')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к файлу; "-" — читать из стандартного ввода',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Формат файла; по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк записывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = path.rsplit('.', 1)[-1].lower()
+            file_format = 'jsonl' if extension == 'ndjson' else extension
+        if file_format not in READERS:
+            raise CommandError('Укажите формат файла через --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        if path == '-':
+            stream = sys.stdin
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+        created = skipped = 0
+        started = time.monotonic()
+        with stream:
+            rows = READERS[file_format](stream)
+            for chunk in chunked(rows, options['batch_size']):
+                tasks, rejected = self.build_tasks(chunk)
+                with transaction.atomic():
+                    Task.objects.bulk_create(tasks)
+                created += len(tasks)
+                skipped += rejected
+                if options['verbosity'] > 1:
+                    self.report(created, skipped, started)
+        self.report(created, skipped, started)
+
+    def report(self, created, skipped, started):
+        elapsed = time.monotonic() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Загружено задач: {created}, пропущено: {skipped}, '
+            f'{elapsed:.1f} с ({rate:.0f} строк/с)'
+        )
+
+    def build_tasks(self, rows):
+        """Готовит задачи пачки и подбирает им свободные адреса.
+
+        Обычно хватает одного запроса на пачку; если адреса совпали
+        с уже существующими или между собой, дополнительно выбираются
+        их варианты с числовыми суффиксами.
+        """
+        slug_field = Task._meta.get_field('slug')
+        candidates = []
+        skipped = 0
+        for row in rows:
+            title = (row.get('title') or '').strip()
+            text = row.get('text') or ''
+            if not title or not text:
+                skipped += 1
+                continue
+            explicit = (row.get('slug') or '').strip()
+            if explicit:
+                # Те же проверки, что в форме: допустимые символы и длина
+                try:
+                    slug_field.run_validators(explicit)
+                except ValidationError:
+                    skipped += 1
+                    continue
+            slug = explicit or slug_from_title(title)
+            if not slug:
+                skipped += 1
+                continue
+            candidates.append((Task(title=title, text=text), slug, explicit))
+
+        slugs = [slug for _, slug, _ in candidates]
+        taken = set(taken_slugs(Q(slug__in=set(slugs))))
+        seen = set()
+        clashing = set()
+        for slug in slugs:
+            if slug in taken or slug in seen:
+                clashing.add(slug)
+            seen.add(slug)
+        for group in chunked(clashing, PREFIX_QUERY_SIZE):
+            query = Q(*map(taken_slugs_q, group), _connector=Q.OR)
+            taken.update(taken_slugs(query))
+
+        allocator = SlugAllocator(taken)
+        tasks = []
+        for task, slug, explicit in candidates:
+            # Явно указанный адрес не меняем, как и форма создания
+            if explicit and slug in allocator:
+                skipped += 1
+                continue
+            task.slug = allocator.allocate(slug)
+            tasks.append(task)
+        return tasks, skipped
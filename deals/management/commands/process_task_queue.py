@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from deals import ingest
+
+
+class Command(BaseCommand):
+    help = ('Записывает в БД задачи из очереди отложенной записи, '
+            'включая брошенные остановленными воркерами')
+
+    def handle(self, *args, **options):
+        if not ingest.enabled():
+            raise CommandError('Отложенная запись выключена: '
+                               'задайте TODO_INGEST_DIR')
+        recovered = ingest.recover()
+        written = ingest.flush()
+        self.stdout.write(
+            f'Возвращено в очередь: {recovered}, записано задач: {written}')
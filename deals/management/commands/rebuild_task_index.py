@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from deals import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='После перестроения слить сегменты индекса',
+        )
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        if options['optimize']:
+            search.optimize_index()
+        self.stdout.write('Индекс задач перестроен')
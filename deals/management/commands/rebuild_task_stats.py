@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from deals import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики статистики задач по таблице задач'
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        totals = stats.get_stats(days=0)
+        self.stdout.write(
+            f"Статистика пересчитана: задач {totals['total']}, "
+            f"с картинкой {totals['with_image']}"
+        )
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from todo import slowlog
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных запросов (SLOW_QUERY_LOG): отпечатки '
+            'запросов по убыванию суммарного времени, оценённого по выборке')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            help='Файл журнала, по умолчанию SLOW_QUERY_LOG',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать представление, место в коде и план запроса',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SLOW_QUERY_LOG
+        if not path:
+            raise CommandError('Журнал не задан: укажите файл или '
+                               'TODO_SLOW_QUERY_LOG')
+        try:
+            items = slowlog.report(slowlog.read(path))
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+        self.stdout.write(
+            f'{"всего, мс":>12} {"запросов":>9} {"среднее":>8} '
+            f'{"медл.":>5} {"макс, мс":>9}  отпечаток')
+        for item in items[:options['limit']]:
+            average = item['total_ms'] / item['calls'] if item['calls'] else 0
+            self.stdout.write(
+                f'{item["total_ms"]:>12.1f} {item["calls"]:>9.0f} '
+                f'{average:>8.2f} {item["slow"]:>5} {item["max_ms"]:>9.1f}  '
+                f'{item["fingerprint"]} {item["sql"][:120]}')
+            if options['plans'] and item['slow']:
+                self.stdout.write(f'    представление: {item["view"]}')
+                self.stdout.write(f'    место в коде: {item["location"]}')
+                for line in item['plan'] or []:
+                    self.stdout.write(f'    {line}')
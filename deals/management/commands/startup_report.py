@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Выполняется в отдельном процессе: холодный старт можно замерить
+# только в интерпретаторе, который ещё ничего не импортировал
+PROBE = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from todo.wsgi import application
+loaded = time.perf_counter()
+
+
+def request(path):
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    begin = time.perf_counter()
+    body = application(
+        environ, lambda status, headers, *args: statuses.append(status))
+    try:
+        b''.join(body)
+    finally:
+        body.close()
+    return time.perf_counter() - begin, statuses[0]
+
+
+first, status = request(sys.argv[1])
+second, _ = request(sys.argv[1])
+print(json.dumps({
+    'load': loaded - started,
+    'first': first,
+    'second': second,
+    'status': status,
+}))
+'''
+
+
+def parse_importtime(output):
+    """Разбирает вывод python -X importtime.
+
+    Возвращает список (модуль, собственное время, накопленное время)
+    в микросекундах.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            # Строка заголовка
+            continue
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Показывает время импорта модулей и время до первого ответа '
+            'WSGI-приложения в новом процессе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/page/about/',
+                            help='Адрес первого запроса')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Сколько самых долгих импортов показать')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Замерить старт без прогрева (todo/warmup.py)')
+
+    def probe(self, options, *flags):
+        env = dict(os.environ,
+                   TODO_WSGI_WARMUP='0' if options['no_warmup'] else '1')
+        return subprocess.run(
+            [sys.executable, *flags, '-c', PROBE, options['path']],
+            cwd=settings.BASE_DIR, env=env, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def handle(self, *args, **options):
+        # Импорты замеряем отдельным запуском: -X importtime
+        # сам замедляет загрузку и исказил бы время до первого ответа
+        output = self.probe(options, '-X', 'importtime').stderr
+        modules = parse_importtime(output)
+        modules.sort(key=lambda module: module[2], reverse=True)
+        self.stdout.write('накоплено, мс  своё, мс  модуль')
+        for name, own, cumulative in modules[:options['limit']]:
+            self.stdout.write(
+                f'{cumulative / 1000:>13.1f} {own / 1000:>9.1f}  {name}')
+
+        result = json.loads(self.probe(options).stdout)
+        self.stdout.write(
+            f"\nзагрузка приложения: {result['load'] * 1000:.1f} мс\n"
+            f"первый ответ ({result['status']}): "
+            f"{result['first'] * 1000:.1f} мс\n"
+            f"второй ответ: {result['second'] * 1000:.1f} мс\n"
+            f"время до первого ответа: "
+            f"{(result['load'] + result['first']) * 1000:.1f} мс"
+        )
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'TODO_REPLICA_DB_PATHS. Нужна для проверки чтения с реплик '
+            'без настоящей репликации')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы реплик; по умолчанию все из DATABASE_REPLICAS',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(settings.DATABASE_REPLICAS.values())
+        if not paths:
+            raise CommandError('Реплики не настроены: укажите файлы '
+                               'или TODO_REPLICA_DB_PATHS')
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Копирование реализовано только для SQLite')
+        connection.ensure_connection()
+        for path in paths:
+            started = time.monotonic()
+            target = sqlite3.connect(path)
+            try:
+                # Онлайн-копия: основная база остаётся доступной
+                connection.connection.backup(target)
+                # Файл реплики открывается только для чтения, а в режиме
+                # WAL для этого нужны файлы -wal и -shm
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+            self.stdout.write(
+                f'{path}: скопировано за {time.monotonic() - started:.1f} с')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from deals import cache
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кеш страниц задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        stats = cache.stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"ratio={stats['ratio']:.2%}"
+        )
+        if options['reset']:
+            cache.reset_stats()
@@ -0,0 +1,93 @@
+"""Удаление файлов картинок, на которые больше не ссылаются задачи."""
+import logging
+import os
+import time
+
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+
+from . import cache
+from .images import VARIANTS
+from .models import ArchivedTask, MediaBlob, Task
+
+logger = logging.getLogger(__name__)
+
+# Поля задачи, в которых хранятся имена файлов
+FILE_FIELDS = ('image', *VARIANTS)
+
+
+def task_file_names(task):
+    """Имена файлов картинки задачи и всех её копий."""
+    return [getattr(task, name).name for name in FILE_FIELDS
+            if getattr(task, name)]
+
+
+def delete_files(names):
+    """Удаляет файлы из хранилища, ошибки только записывает в журнал."""
+    storage = Task._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.exception('Не удалось удалить файл %s', name)
+
+
+def iter_media_files(root, min_age=0):
+    """Обходит каталог и выдаёт пути файлов относительно root.
+
+    Каталоги читаются через os.scandir по одному, поэтому полный список
+    файлов в памяти не собирается. Файлы моложе min_age секунд
+    пропускаются: задача с такой картинкой могла ещё не сохраниться.
+    """
+    deadline = time.time() - min_age
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif (entry.is_file(follow_symlinks=False)
+                        and entry.stat().st_mtime <= deadline):
+                    yield os.path.relpath(entry.path, root).replace(
+                        os.sep, '/')
+
+
+def referenced_names(names):
+    """Возвращает те из names, на которые ссылается хотя бы одна задача
+    или архивная задача.
+
+    Ссылки считают триггеры в MediaBlob (миграция 0009), поэтому это
+    поиск по первичному ключу, а не чтение таблиц задач: поля с
+    файлами не проиндексированы.
+    """
+    return set(MediaBlob.objects.filter(
+        name__in=list(names), refs__gt=0).values_list('name', flat=True))
+
+
+def relink(mapping, using=None):
+    """Заменяет в задачах и архивных задачах имена файлов по словарю
+    {старое имя: новое} одной транзакцией.
+
+    update() не шлёт сигналов, поэтому кеш страниц изменённых задач
+    сбрасывается здесь. Возвращает число изменённых задач.
+    """
+    old_names = list(mapping)
+    condition = Q()
+    for field in FILE_FIELDS:
+        condition |= Q(**{f'{field}__in': old_names})
+    slugs = []
+    with transaction.atomic(using):
+        for model in (Task, ArchivedTask):
+            tasks = model._default_manager.using(using)
+            slugs += tasks.filter(condition).values_list('slug', flat=True)
+            for field in FILE_FIELDS:
+                new_name = Case(
+                    *(When(**{field: old}, then=Value(new))
+                      for old, new in mapping.items()),
+                    output_field=models.CharField(),
+                )
+                tasks.filter(**{f'{field}__in': old_names}).update(
+                    **{field: new_name})
+    for slug in slugs:
+        cache.invalidate(slug)
+    return len(slugs)
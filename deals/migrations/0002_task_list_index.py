@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='title',
+            field=models.CharField(default='Значение по-умолчанию', help_text='Дайте короткое название задаче', max_length=100, verbose_name='Заголовок'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-id', 'title', 'slug'], name='deals_task_list_idx'),
+        ),
+    ]
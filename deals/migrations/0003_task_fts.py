@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Полнотекстовый индекс по title и text. Таблица индекса хранит только
+# токены (content='deals_task'), сами строки читаются из deals_task.
+# Триггеры срабатывают и для bulk_create, поэтому индекс не отстаёт
+# от таблицы при импорте.
+CREATE_TABLE_SQL = [
+    """
+    CREATE VIRTUAL TABLE deals_task_fts USING fts5(
+        title, text, content='deals_task', content_rowid='id'
+    )
+    """,
+]
+
+# SQLite удаляет триггеры вместе с таблицей, а Django пересоздаёт
+# deals_task почти при любом изменении её полей. Поэтому миграции,
+# меняющие Task, должны заново создавать триггеры (см. 0004)
+CREATE_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER deals_task_fts_insert AFTER INSERT ON deals_task BEGIN
+        INSERT INTO deals_task_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER deals_task_fts_delete AFTER DELETE ON deals_task BEGIN
+        INSERT INTO deals_task_fts(deals_task_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER deals_task_fts_update AFTER UPDATE OF title, text
+    ON deals_task BEGIN
+        INSERT INTO deals_task_fts(deals_task_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO deals_task_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS deals_task_fts_update',
+    'DROP TRIGGER IF EXISTS deals_task_fts_delete',
+    'DROP TRIGGER IF EXISTS deals_task_fts_insert',
+]
+
+REBUILD_SQL = [
+    "INSERT INTO deals_task_fts(deals_task_fts) VALUES ('rebuild')",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0002_task_list_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_TABLE_SQL + CREATE_TRIGGERS_SQL + REBUILD_SQL,
+            DROP_TRIGGERS_SQL + ['DROP TABLE IF EXISTS deals_task_fts'],
+        ),
+    ]
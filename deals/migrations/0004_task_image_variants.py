@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:53
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('deals.migrations.0003_task_fts')
+RESTORE_TRIGGERS_SQL = fts.DROP_TRIGGERS_SQL + fts.CREATE_TRIGGERS_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0003_task_fts'),
+    ]
+
+    operations = [
+        # При откате поля удаляются пересозданием таблицы
+        migrations.RunSQL(migrations.RunSQL.noop, RESTORE_TRIGGERS_SQL),
+        migrations.AddField(
+            model_name='task',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to='tasks/variants/', verbose_name='Средняя копия'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='tasks/variants/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='tasks/variants/', verbose_name='Средняя копия в WebP'),
+        ),
+        migrations.RunSQL(RESTORE_TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
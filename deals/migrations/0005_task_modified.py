@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:56
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('deals.migrations.0003_task_fts')
+RESTORE_TRIGGERS_SQL = fts.DROP_TRIGGERS_SQL + fts.CREATE_TRIGGERS_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0004_task_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, RESTORE_TRIGGERS_SQL),
+        migrations.AddField(
+            model_name='task',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunSQL(RESTORE_TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
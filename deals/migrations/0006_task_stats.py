@@ -0,0 +1,132 @@
+from importlib import import_module
+
+import django.utils.timezone
+from django.db import migrations, models
+
+fts = import_module('deals.migrations.0003_task_fts')
+RESTORE_TRIGGERS_SQL = fts.DROP_TRIGGERS_SQL + fts.CREATE_TRIGGERS_SQL
+
+# Счётчики задач ведут триггеры: они срабатывают и для bulk_create,
+# и для QuerySet.delete(), которые не шлют сигналов. Как и триггеры
+# полнотекстового индекса, их нужно пересоздавать в миграциях,
+# пересоздающих deals_task.
+HAS_IMAGE = "(COALESCE({row}.image, '') != '')"
+
+CREATE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER deals_task_stats_insert AFTER INSERT ON deals_task BEGIN
+        UPDATE deals_taskstats
+        SET total = total + 1,
+            with_image = with_image + {HAS_IMAGE.format(row='new')}
+        WHERE id = 1;
+        INSERT OR IGNORE INTO deals_taskdailystats (day, created)
+        VALUES (date(new.created), 0);
+        UPDATE deals_taskdailystats SET created = created + 1
+        WHERE day = date(new.created);
+    END
+    """,
+    f"""
+    CREATE TRIGGER deals_task_stats_delete AFTER DELETE ON deals_task BEGIN
+        UPDATE deals_taskstats
+        SET total = total - 1,
+            with_image = with_image - {HAS_IMAGE.format(row='old')}
+        WHERE id = 1;
+        UPDATE deals_taskdailystats SET created = created - 1
+        WHERE day = date(old.created);
+        DELETE FROM deals_taskdailystats
+        WHERE day = date(old.created) AND created <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER deals_task_stats_image AFTER UPDATE OF image
+    ON deals_task BEGIN
+        UPDATE deals_taskstats
+        SET with_image = with_image + {HAS_IMAGE.format(row='new')}
+            - {HAS_IMAGE.format(row='old')}
+        WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER deals_task_stats_created AFTER UPDATE OF created
+    ON deals_task WHEN date(old.created) != date(new.created) BEGIN
+        UPDATE deals_taskdailystats SET created = created - 1
+        WHERE day = date(old.created);
+        DELETE FROM deals_taskdailystats
+        WHERE day = date(old.created) AND created <= 0;
+        INSERT OR IGNORE INTO deals_taskdailystats (day, created)
+        VALUES (date(new.created), 0);
+        UPDATE deals_taskdailystats SET created = created + 1
+        WHERE day = date(new.created);
+    END
+    """,
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS deals_task_stats_created',
+    'DROP TRIGGER IF EXISTS deals_task_stats_image',
+    'DROP TRIGGER IF EXISTS deals_task_stats_delete',
+    'DROP TRIGGER IF EXISTS deals_task_stats_insert',
+]
+
+REBUILD_SQL = [
+    'DELETE FROM deals_taskstats',
+    f"""
+    INSERT INTO deals_taskstats (id, total, with_image)
+    SELECT 1, COUNT(*), COALESCE(SUM({HAS_IMAGE.format(row='deals_task')}), 0)
+    FROM deals_task
+    """,
+    'DELETE FROM deals_taskdailystats',
+    """
+    INSERT INTO deals_taskdailystats (day, created)
+    SELECT date(created), COUNT(*) FROM deals_task GROUP BY date(created)
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0005_task_modified'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, RESTORE_TRIGGERS_SQL),
+        migrations.AddField(
+            model_name='task',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата создания'),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(RESTORE_TRIGGERS_SQL, migrations.RunSQL.noop),
+        # Точной даты создания у старых задач нет, ближе всего к ней
+        # дата последнего изменения
+        migrations.RunSQL(
+            'UPDATE deals_task SET created = modified',
+            migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='TaskDailyStats',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='День')),
+                ('created', models.IntegerField(default=0, verbose_name='Создано задач')),
+            ],
+            options={
+                'verbose_name': 'Статистика задач за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0, verbose_name='Всего задач')),
+                ('with_image', models.IntegerField(default=0, verbose_name='Задач с картинкой')),
+            ],
+            options={
+                'verbose_name': 'Статистика задач',
+            },
+        ),
+        migrations.RunSQL(
+            CREATE_TRIGGERS_SQL + REBUILD_SQL,
+            DROP_TRIGGERS_SQL,
+        ),
+    ]
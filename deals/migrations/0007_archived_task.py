@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+# Адрес архивной задачи не должен достаться новой задаче, иначе старая
+# ссылка откроет чужую страницу. Ошибка из триггера приходит в Django как
+# IntegrityError, как и нарушение уникального индекса, поэтому
+# Task.save() подбирает другой адрес. Триггеры нужно пересоздавать
+# в миграциях, пересоздающих deals_task.
+ARCHIVED_SLUG = """
+    WHEN EXISTS (SELECT 1 FROM deals_archivedtask WHERE slug = new.slug)
+    BEGIN
+        SELECT RAISE(ABORT, 'UNIQUE constraint failed: deals_task.slug');
+    END
+"""
+
+CREATE_TRIGGERS_SQL = [
+    'CREATE TRIGGER deals_task_archived_slug_insert BEFORE INSERT '
+    'ON deals_task' + ARCHIVED_SLUG,
+    'CREATE TRIGGER deals_task_archived_slug_update BEFORE UPDATE OF slug '
+    'ON deals_task' + ARCHIVED_SLUG,
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS deals_task_archived_slug_update',
+    'DROP TRIGGER IF EXISTS deals_task_archived_slug_insert',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0006_task_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Адрес для страницы с задачей')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='tasks/', verbose_name='Картинка')),
+                ('image_thumbnail', models.ImageField(blank=True, upload_to='tasks/variants/', verbose_name='Миниатюра')),
+                ('image_medium', models.ImageField(blank=True, upload_to='tasks/variants/', verbose_name='Средняя копия')),
+                ('image_webp', models.ImageField(blank=True, upload_to='tasks/variants/', verbose_name='Средняя копия в WebP')),
+                ('modified', models.DateTimeField(verbose_name='Дата изменения')),
+                ('created', models.DateTimeField(verbose_name='Дата создания')),
+                ('archived', models.DateTimeField(db_index=True, verbose_name='Дата переноса в архив')),
+            ],
+            options={
+                'verbose_name': 'Архивная задача',
+                'verbose_name_plural': 'Архивные задачи',
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
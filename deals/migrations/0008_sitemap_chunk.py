@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+# Номер части карты сайта — id задачи, делённый нацело на
+# SITEMAP_CHUNK_SIZE (deals/models.py). Триггеры меняют версию части при
+# любом изменении её задач, в том числе через bulk_create и
+# QuerySet.update(), которые не шлют сигналов. Как и остальные триггеры
+# deals_task, их нужно пересоздавать в миграциях, пересоздающих deals_task.
+CHUNK = '({row}.id / 50000)'
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+BUMP = f"""
+    INSERT OR IGNORE INTO deals_sitemapchunk (number, version, changed)
+    VALUES ({CHUNK}, 0, {NOW});
+    UPDATE deals_sitemapchunk SET version = version + 1, changed = {NOW}
+    WHERE number = {CHUNK};
+"""
+
+CREATE_TRIGGERS_SQL = [
+    'CREATE TRIGGER deals_task_sitemap_insert AFTER INSERT ON deals_task '
+    'BEGIN' + BUMP.format(row='new') + 'END',
+    'CREATE TRIGGER deals_task_sitemap_update '
+    'AFTER UPDATE OF slug, title, text, modified ON deals_task '
+    'BEGIN' + BUMP.format(row='new') + 'END',
+    'CREATE TRIGGER deals_task_sitemap_delete AFTER DELETE ON deals_task '
+    'BEGIN' + BUMP.format(row='old') + 'END',
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS deals_task_sitemap_delete',
+    'DROP TRIGGER IF EXISTS deals_task_sitemap_update',
+    'DROP TRIGGER IF EXISTS deals_task_sitemap_insert',
+]
+
+# Части для уже существующих задач, в том числе архивных
+REBUILD_SQL = [
+    'DELETE FROM deals_sitemapchunk',
+    f"""
+    INSERT INTO deals_sitemapchunk (number, version, changed)
+    SELECT {CHUNK.format(row='tasks')}, 0, MAX(modified)
+    FROM (SELECT id, modified FROM deals_task
+          UNION ALL
+          SELECT id, modified FROM deals_archivedtask) AS tasks
+    GROUP BY {CHUNK.format(row='tasks')}
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0007_archived_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapChunk',
+            fields=[
+                ('number', models.IntegerField(primary_key=True, serialize=False, verbose_name='Номер части')),
+                ('version', models.IntegerField(default=0, verbose_name='Версия')),
+                ('changed', models.DateTimeField(verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Часть карты сайта',
+            },
+        ),
+        migrations.RunSQL(
+            CREATE_TRIGGERS_SQL + REBUILD_SQL,
+            DROP_TRIGGERS_SQL,
+        ),
+    ]
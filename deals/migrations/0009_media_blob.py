@@ -0,0 +1,88 @@
+from django.db import migrations, models
+
+# Число ссылок на файл ведут триггеры по всем полям с файлами задач и
+# архивных задач: они срабатывают и для bulk_create, QuerySet.update() и
+# переноса в архив, которые не шлют сигналов. Строка с нулём ссылок не
+# удаляется: её удаляет ContentAddressedStorage.delete() вместе с файлом.
+# Как и остальные триггеры, их нужно пересоздавать в миграциях,
+# пересоздающих deals_task или deals_archivedtask.
+TABLES = ('deals_task', 'deals_archivedtask')
+FIELDS = ('image', 'image_thumbnail', 'image_medium', 'image_webp')
+
+INCREMENT = """
+    INSERT OR IGNORE INTO deals_mediablob (name, refs)
+    SELECT new.{field}, 0 WHERE COALESCE(new.{field}, '') != '';
+    UPDATE deals_mediablob SET refs = refs + 1 WHERE name = new.{field};
+"""
+DECREMENT = """
+    UPDATE deals_mediablob SET refs = refs - 1 WHERE name = old.{field};
+"""
+
+
+def create_triggers_sql(table):
+    return [
+        f'CREATE TRIGGER {table}_blob_insert AFTER INSERT ON {table} BEGIN'
+        + ''.join(INCREMENT.format(field=field) for field in FIELDS)
+        + 'END',
+        f'CREATE TRIGGER {table}_blob_delete AFTER DELETE ON {table} BEGIN'
+        + ''.join(DECREMENT.format(field=field) for field in FIELDS)
+        + 'END',
+    ] + [
+        f'CREATE TRIGGER {table}_blob_{field} AFTER UPDATE OF {field} '
+        f'ON {table} WHEN old.{field} IS NOT new.{field} BEGIN'
+        + DECREMENT.format(field=field) + INCREMENT.format(field=field)
+        + 'END'
+        for field in FIELDS
+    ]
+
+
+def drop_triggers_sql(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_blob_{suffix}'
+        for suffix in ('insert', 'delete', *FIELDS)
+    ]
+
+
+CREATE_TRIGGERS_SQL = [sql for table in TABLES
+                       for sql in create_triggers_sql(table)]
+DROP_TRIGGERS_SQL = [sql for table in TABLES
+                     for sql in drop_triggers_sql(table)]
+
+REBUILD_SQL = [
+    'DELETE FROM deals_mediablob',
+    """
+    INSERT INTO deals_mediablob (name, refs)
+    SELECT name, COUNT(*) FROM ({}) AS names
+    WHERE COALESCE(name, '') != ''
+    GROUP BY name
+    """.format(' UNION ALL '.join(
+        f'SELECT {field} AS name FROM {table}'
+        for table in TABLES for field in FIELDS
+    )),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0008_sitemap_chunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('refs', models.IntegerField(default=0, verbose_name='Число ссылок')),
+                ('reused', models.DateTimeField(blank=True, null=True, verbose_name='Дата повторной загрузки')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.RunSQL(
+            CREATE_TRIGGERS_SQL + REBUILD_SQL,
+            DROP_TRIGGERS_SQL,
+        ),
+    ]
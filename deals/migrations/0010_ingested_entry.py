@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0009_media_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ключ записи')),
+            ],
+            options={
+                'verbose_name': 'Записанная задача из очереди',
+                'verbose_name_plural': 'Записанные задачи из очереди',
+            },
+        ),
+    ]
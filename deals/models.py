@@ -1,6 +1,38 @@
-from django.db import models
-# pip3 install pytils не забыть установить!
-from pytils.translit import slugify
+from contextlib import nullcontext
+
+from django.db import IntegrityError, models, router, transaction
+
+from .slugs import SlugAllocator, slug_from_title, taken_slugs_q
+
+# Сколько раз подбирать новый адрес, если его успели занять
+SLUG_RETRIES = 5
+
+
+def conflict_savepoint(using):
+    """Точка сохранения вокруг вставки, которая может нарушить уникальность.
+
+    Внутри транзакции IntegrityError без точки сохранения ломает всю
+    транзакцию. Вне транзакции одиночный INSERT выполняется в autocommit:
+    так SQLite ждёт блокировку записи по busy_timeout, а запись после
+    явного BEGIN в режиме WAL может сразу упасть с "database is locked".
+    """
+    if transaction.get_connection(using).in_atomic_block:
+        return transaction.atomic(using=using)
+    return nullcontext()
+
+
+def lock_for_write(using):
+    """Сразу берёт блокировку записи SQLite в начатой транзакции.
+
+    Обход только для SQLite, вызывается первым внутри atomic(). Django 2.2
+    начинает транзакцию обычным BEGIN, а не BEGIN IMMEDIATE, и в режиме
+    WAL транзакция, которая сначала читала, а потом пишет, получает
+    "database is locked" без ожидания busy_timeout, если другой процесс
+    успел записать после её чтения. UPDATE без подходящих строк делает
+    транзакцию пишущей до первого чтения.
+    """
+    if transaction.get_connection(using).vendor == 'sqlite':
+        TaskStats.objects.using(using).filter(pk=0).update(total=0)
 
 
 class Task(models.Model):
@@ -29,14 +61,200 @@ class Task(models.Model):
         null=True,
         help_text='Загрузите картинку'
     )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+    created = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+    )
+    # Уменьшенные копии картинки строятся в фоне (см. images.py)
+    image_thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='tasks/variants/',
+        blank=True,
+        editable=False,
+    )
+    image_medium = models.ImageField(
+        'Средняя копия',
+        upload_to='tasks/variants/',
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        'Средняя копия в WebP',
+        upload_to='tasks/variants/',
+        blank=True,
+        editable=False,
+    )
+
+    class Meta:
+        indexes = [
+            # Покрывающий индекс для постраничного списка задач:
+            # курсор по id и поля, которые выводит шаблон
+            models.Index(fields=['-id', 'title', 'slug'],
+                         name='deals_task_list_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем slug из БД, чтобы при его смене сбросить кеш
+        # страницы по старому адресу
+        if 'slug' in field_names:
+            instance._loaded_slug = values[field_names.index('slug')]
+        # Картинку запоминаем, чтобы при замене перестроить её копии
+        if 'image' in field_names:
+            instance._loaded_image = values[field_names.index('image')]
+        return instance
+
     # Расширение встроенного метода save(): если поле slug не заполнено -
     # транслитерировать в латиницу содержимое поля title и
-    # обрезать до ста знаков
+    # обрезать до ста знаков. Если такой адрес уже занят, добавить
+    # к нему суффикс -2, -3 ...
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)[:100]
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        base = slug_from_title(self.title)
+        self.slug = base
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        for _ in range(SLUG_RETRIES):
+            # Без предварительной проверки: обычно адрес свободен и
+            # хватает одного INSERT, а занятость ловит уникальный индекс
+            try:
+                with conflict_savepoint(using):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                allocator = SlugAllocator(
+                    taken_slugs(taken_slugs_q(base), using))
+                if self.slug not in allocator:
+                    # Ошибка вызвана не адресом
+                    raise
+                self.slug = allocator.allocate(base)
         super().save(*args, **kwargs)
+
+
+class ArchivedTask(models.Model):
+    """Задача, перенесённая из deals_task командой archive_tasks.
+
+    id и даты сохраняются как были. Адрес архивной задачи остаётся
+    занятым: новой задаче его не даст триггер из миграции 0007, а
+    TaskDetail показывает архивную задачу, если в Task её нет.
+    """
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField('Заголовок', max_length=100)
+    text = models.TextField('Текст')
+    slug = models.SlugField(
+        'Адрес для страницы с задачей', max_length=100, unique=True)
+    image = models.ImageField(
+        'Картинка', upload_to='tasks/', blank=True, null=True)
+    image_thumbnail = models.ImageField(
+        'Миниатюра', upload_to='tasks/variants/', blank=True)
+    image_medium = models.ImageField(
+        'Средняя копия', upload_to='tasks/variants/', blank=True)
+    image_webp = models.ImageField(
+        'Средняя копия в WebP', upload_to='tasks/variants/', blank=True)
+    modified = models.DateTimeField('Дата изменения')
+    created = models.DateTimeField('Дата создания')
+    archived = models.DateTimeField('Дата переноса в архив', db_index=True)
+
+    class Meta:
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архивные задачи'
+
+    def __str__(self):
+        return self.title
+
+
+def taken_slugs(condition, using=None):
+    """Адреса задач и архивных задач, подходящие под condition.
+
+    condition — обычно taken_slugs_q(): архивные адреса заняты так же,
+    как адреса задач в Task. Обе таблицы читаются одним запросом.
+    """
+    hot, archived = (
+        model._default_manager.using(using).filter(condition)
+        .values_list('slug', flat=True)
+        for model in (Task, ArchivedTask)
+    )
+    return list(hot.union(archived, all=True))
+
+
+# Счётчики задач ведут триггеры SQLite (миграция 0006): они срабатывают
+# и для bulk_create, и для QuerySet.delete(), которые не шлют сигналов.
+# Расхождения исправляет команда rebuild_task_stats
+class TaskStats(models.Model):
+    """Общие счётчики задач, единственная строка с id=1."""
+    total = models.IntegerField('Всего задач', default=0)
+    with_image = models.IntegerField('Задач с картинкой', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика задач'
+
+
+class TaskDailyStats(models.Model):
+    """Число существующих задач, созданных за день (по UTC)."""
+    day = models.DateField('День', primary_key=True)
+    created = models.IntegerField('Создано задач', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика задач за день'
+
+
+# Число адресов в одной части карты сайта: больше не разрешает протокол
+# sitemaps.org. То же число записано в триггерах миграции 0008
+SITEMAP_CHUNK_SIZE = 50000
+
+
+# Версии частей ведут триггеры SQLite (миграция 0008), как и счётчики
+# задач: кеш части сбрасывается и после bulk_create и QuerySet.update()
+class SitemapChunk(models.Model):
+    """Часть карты сайта: задачи с id от number * SITEMAP_CHUNK_SIZE
+    до (number + 1) * SITEMAP_CHUNK_SIZE, включая архивные."""
+    number = models.IntegerField('Номер части', primary_key=True)
+    version = models.IntegerField('Версия', default=0)
+    changed = models.DateTimeField('Дата изменения')
+
+    class Meta:
+        verbose_name = 'Часть карты сайта'
+
+    @property
+    def id_range(self):
+        start = self.number * SITEMAP_CHUNK_SIZE
+        return start, start + SITEMAP_CHUNK_SIZE
+
+
+# Ссылки на файлы картинок считают триггеры SQLite (миграция 0009) по
+# всем полям с файлами Task и ArchivedTask, как и счётчики задач
+class MediaBlob(models.Model):
+    """Файл в хранилище картинок (см. storage.py) и число ссылок на него."""
+    name = models.CharField('Имя файла', max_length=100, primary_key=True)
+    refs = models.IntegerField('Число ссылок', default=0)
+    reused = models.DateTimeField(
+        'Дата повторной загрузки', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+
+class IngestedEntry(models.Model):
+    """Запись очереди формы (см. ingest.py), задача которой сохранена.
+
+    Ключ — имя файла записи без расширения. Строка добавляется в той же
+    транзакции, что и задача, поэтому повторная запись пачки после
+    падения процесса пропускает уже сохранённые задачи.
+    """
+    key = models.CharField('Ключ записи', max_length=64, primary_key=True)
+
+    class Meta:
+        verbose_name = 'Записанная задача из очереди'
+        verbose_name_plural = 'Записанные задачи из очереди'
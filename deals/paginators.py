@@ -0,0 +1,61 @@
+from django.core.paginator import InvalidPage
+
+
+class KeysetPage:
+    """Страница выборки, полученная по курсору."""
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Постраничный вывод по курсору (keyset pagination).
+
+    Записи упорядочены по убыванию id. Вместо номера страницы передаётся
+    id крайней записи соседней страницы, поэтому любая страница выбирается
+    через индекс так же быстро, как первая, без сканирования OFFSET.
+    """
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+
+    def page(self, after=None, before=None):
+        """Возвращает страницу записей с id меньше after или больше before."""
+        if after is not None and before is not None:
+            raise InvalidPage('Нельзя указывать after и before одновременно')
+        # Сначала выбираем только id: запрос читает один индекс
+        # и не трогает строки таблицы с тяжёлым полем text
+        ids = self.queryset.order_by().values_list('id', flat=True)
+        if before is not None:
+            ids = ids.filter(id__gt=before).order_by('id')
+        else:
+            if after is not None:
+                ids = ids.filter(id__lt=after)
+            ids = ids.order_by('-id')
+        window = list(ids[:self.per_page + 1])
+        has_more = len(window) > self.per_page
+        window = window[:self.per_page]
+        if before is not None:
+            window.reverse()
+        if not window:
+            return KeysetPage(self.queryset.none())
+
+        object_list = self.queryset.filter(
+            id__lte=window[0], id__gte=window[-1]).order_by('-id')
+        if before is not None:
+            next_cursor = window[-1]
+            previous_cursor = window[0] if has_more else None
+        else:
+            next_cursor = window[-1] if has_more else None
+            previous_cursor = window[0] if after is not None else None
+        return KeysetPage(object_list, next_cursor, previous_cursor)
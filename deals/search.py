@@ -0,0 +1,89 @@
+"""Полнотекстовый поиск задач по индексу SQLite FTS5."""
+import re
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+
+FTS_TABLE = 'deals_task_fts'
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def build_match(query):
+    """Превращает пользовательский ввод в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы символы синтаксиса FTS5
+    не ломали запрос. Поиск по префиксу не используется: для частых
+    префиксов он сливает списки документов многих слов и медленнее
+    поиска по слову на порядок.
+    Возвращает None, если в запросе нет ни одного слова.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"' for token in tokens)
+
+
+def search_ids(query, limit, offset=0):
+    """Возвращает id задач, упорядоченные по релевантности (bm25).
+
+    Ранжируются все совпадения: FTS5 сортирует по rank сам, держа
+    в памяти только LIMIT + OFFSET лучших строк.
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    with connections[router.db_for_read(Task)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class MatchIds(RawSQL):
+    """Подзапрос к индексу без своих скобок.
+
+    Скобки добавляет lookup __in, а SQLite читает IN ((SELECT ...))
+    как сравнение с первой строкой подзапроса.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def matching_ids(query):
+    """Подзапрос с id всех задач, подходящих под запрос, для pk__in.
+
+    Возвращает None, если в запросе нет ни одного слова.
+    """
+    match = build_match(query)
+    if match is None:
+        return None
+    return MatchIds(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match])
+
+
+def search_tasks(query, limit, offset=0, fields=('id', 'title', 'slug')):
+    """Возвращает задачи в порядке релевантности."""
+    ids = search_ids(query, limit, offset)
+    tasks = Task.objects.only(*fields).in_bulk(ids)
+    return [tasks[pk] for pk in ids if pk in tasks]
+
+
+def rebuild_index():
+    """Перестраивает индекс по содержимому таблицы задач."""
+    with connections[router.db_for_write(Task)].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def optimize_index():
+    """Сливает сегменты индекса в один для ускорения поиска."""
+    with connections[router.db_for_write(Task)].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, images, media
+from .models import Task
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_detail(sender, instance, **kwargs):
+    """Сбрасывает кеш страницы задачи при изменении или удалении задачи."""
+    cache.invalidate(instance.slug)
+    # Если slug изменили, страница по старому адресу тоже устарела
+    loaded_slug = getattr(instance, '_loaded_slug', None)
+    if loaded_slug and loaded_slug != instance.slug:
+        cache.invalidate(loaded_slug)
+    instance._loaded_slug = instance.slug
+
+
+def _image_changed(instance):
+    if not hasattr(instance, '_loaded_image'):
+        return instance._state.adding
+    return (instance._loaded_image or '') != (instance.image.name or '')
+
+
+@receiver(pre_save, sender=Task)
+def reset_image_variants(sender, instance, **kwargs):
+    """Сбрасывает копии заменённой картинки."""
+    instance._image_changed = _image_changed(instance)
+    instance._replaced_files = []
+    if instance._image_changed:
+        if getattr(instance, '_loaded_image', None):
+            instance._replaced_files.append(instance._loaded_image)
+        for name in images.VARIANTS:
+            if getattr(instance, name):
+                instance._replaced_files.append(getattr(instance, name).name)
+            setattr(instance, name, '')
+
+
+@receiver(post_save, sender=Task)
+def schedule_image_variants(sender, instance, **kwargs):
+    """После фиксации транзакции строит копии новой картинки в фоне."""
+    if instance._image_changed and instance.image:
+        task_id = instance.pk
+        transaction.on_commit(lambda: images.schedule(task_id))
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=Task)
+def delete_replaced_files(sender, instance, **kwargs):
+    """После фиксации транзакции удаляет файлы заменённой картинки."""
+    names = instance._replaced_files
+    if names:
+        transaction.on_commit(lambda: media.delete_files(names))
+
+
+@receiver(post_delete, sender=Task)
+def delete_task_files(sender, instance, **kwargs):
+    """После фиксации транзакции удаляет картинку удалённой задачи."""
+    names = media.task_file_names(instance)
+    if names:
+        transaction.on_commit(lambda: media.delete_files(names))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Выполняет PRAGMA из settings.SQLITE_PRAGMAS для новых соединений."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            # Реплика открыта только для чтения, режим журнала не меняем
+            if (name == 'journal_mode'
+                    and connection.alias in settings.DATABASE_REPLICAS):
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
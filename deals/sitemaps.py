@@ -0,0 +1,129 @@
+"""Карта сайта со страницами задач.
+
+Задачи делятся на части по SITEMAP_CHUNK_SIZE id (см. SitemapChunk), а
+индекс карты перечисляет части. Часть строится одним проходом iterator()
+по адресам и датам изменения задач из её диапазона id, включая архивные:
+в памяти держится текст одной части, а не все задачи сразу.
+
+Готовая часть хранится в кеше под версией из SitemapChunk. Версию меняют
+триггеры миграции 0008, поэтому изменение задачи сбрасывает только ту
+часть, в диапазон которой попадает её id.
+
+По умолчанию доступ такой же, как к страницам задач: только после входа,
+потому что адреса задач составлены из их заголовков. Поисковикам карта
+доступна, только если владелец сайта включил SITEMAP_PUBLIC.
+"""
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.core.cache import caches
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.views.generic import View
+
+from todo.routers import ReplicaReadMixin
+
+from .models import ArchivedTask, SitemapChunk, Task
+
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+
+def get_cache():
+    return caches[settings.SITEMAP_CACHE_ALIAS]
+
+
+def site_url(request):
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def w3c_datetime(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _chunk_key(base, chunk):
+    # Адреса в карте абсолютные, поэтому в ключе схема и хост. Дата
+    # изменения отличает одинаковые версии части в разных базах
+    return (f'deals:sitemap:{base}:{chunk.number}:{chunk.version}:'
+            f'{chunk.changed.timestamp()}')
+
+
+def task_rows(chunk):
+    """Адреса и даты изменения задач части, сначала действующих,
+    потом архивных."""
+    start, end = chunk.id_range
+    for model in (Task, ArchivedTask):
+        yield from (
+            model._default_manager.filter(id__gte=start, id__lt=end)
+            .order_by('id').values_list('slug', 'modified')
+            .iterator(chunk_size=2000)
+        )
+
+
+def render_chunk(chunk, base):
+    # reverse() для каждой из 50 тысяч задач занял бы заметное время,
+    # поэтому адрес собирается из готовых начала и конца. slug состоит
+    # только из латиницы, цифр, дефисов и подчёркиваний, экранировать
+    # его не нужно
+    path = reverse('deals:task_detail', kwargs={'slug': 'slug'})
+    prefix, suffix = (escape(part) for part in path.rsplit('slug', 1))
+    prefix = escape(base) + prefix
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+             f'<urlset xmlns="{XMLNS}">\n']
+    for slug, modified in task_rows(chunk):
+        parts.append(f'<url><loc>{prefix}{slug}{suffix}</loc>'
+                     f'<lastmod>{w3c_datetime(modified)}</lastmod></url>\n')
+    parts.append('</urlset>\n')
+    return ''.join(parts).encode()
+
+
+def render_index(chunks, base):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+             f'<sitemapindex xmlns="{XMLNS}">\n']
+    for chunk in chunks:
+        loc = base + reverse('deals:sitemap_chunk',
+                             kwargs={'number': chunk.number})
+        parts.append(f'<sitemap><loc>{escape(loc)}</loc>'
+                     f'<lastmod>{w3c_datetime(chunk.changed)}</lastmod>'
+                     f'</sitemap>\n')
+    parts.append('</sitemapindex>\n')
+    return ''.join(parts).encode()
+
+
+class SitemapAccessMixin(AccessMixin):
+    """Пускает анонимов, только если включён SITEMAP_PUBLIC."""
+    login_url = '/admin/login/'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not (settings.SITEMAP_PUBLIC or request.user.is_authenticated):
+            return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class SitemapIndex(ReplicaReadMixin, SitemapAccessMixin, View):
+    """Индекс карты сайта: по строке на часть, без чтения задач."""
+
+    def get(self, request, *args, **kwargs):
+        chunks = SitemapChunk.objects.order_by('number')
+        return HttpResponse(render_index(chunks, site_url(request)),
+                            content_type=CONTENT_TYPE)
+
+
+class SitemapChunkView(ReplicaReadMixin, SitemapAccessMixin, View):
+    """Часть карты сайта, не больше SITEMAP_CHUNK_SIZE адресов."""
+
+    def get(self, request, number, *args, **kwargs):
+        # Версию берём до чтения задач: если задачу изменят во время
+        # построения, часть сохранится под уже устаревшей версией
+        chunk = SitemapChunk.objects.filter(number=number).first()
+        if chunk is None:
+            raise Http404('Нет такой части карты сайта')
+        base = site_url(request)
+        cache = get_cache()
+        key = _chunk_key(base, chunk)
+        content = cache.get(key)
+        if content is None:
+            content = render_chunk(chunk, base)
+            cache.set(key, content, settings.SITEMAP_CACHE_TIMEOUT)
+        return HttpResponse(content, content_type=CONTENT_TYPE)
@@ -0,0 +1,63 @@
+"""Построение адресов (slug) для задач."""
+from django.db.models import Q
+# pip3 install pytils не забыть установить!
+from pytils.translit import slugify
+
+SLUG_MAX_LENGTH = 100
+# Сколько символов оставляем под суффикс вида "-123456"
+SUFFIX_LENGTH = 7
+# Сколько условий taken_slugs_q() объединять в одном запросе:
+# у SQLite ограничена глубина выражения в WHERE
+PREFIX_QUERY_SIZE = 100
+
+
+def slug_from_title(title):
+    """Транслитерирует title в латиницу и обрезает до ста знаков."""
+    return slugify(title)[:SLUG_MAX_LENGTH]
+
+
+def _prefix(slug):
+    return slug[:SLUG_MAX_LENGTH - SUFFIX_LENGTH] + '-'
+
+
+def taken_slugs_q(slug):
+    """Условие на сам slug и все его варианты с числовым суффиксом.
+
+    Вместо LIKE 'prefix%' используется диапазон строк: так SQLite
+    ищет по уникальному индексу поля slug, а не перебирает таблицу.
+    """
+    prefix = _prefix(slug)
+    # '.' следует за '-' в таблице ASCII
+    return Q(slug=slug) | Q(slug__gte=prefix, slug__lt=prefix[:-1] + '.')
+
+
+class SlugAllocator:
+    """Выдаёт свободные адреса: slug или его вариант с суффиксом -2, -3 ...
+
+    Занятые адреса нужно предварительно выбрать по taken_slugs_q(),
+    иначе суффикс может совпасть с уже существующим.
+    """
+    def __init__(self, taken=()):
+        self.taken = set()
+        # Наибольший занятый суффикс для каждого префикса
+        self.last_numbers = {}
+        for slug in taken:
+            self.add(slug)
+
+    def __contains__(self, slug):
+        return slug in self.taken
+
+    def add(self, slug):
+        self.taken.add(slug)
+        stem, _, number = slug.rpartition('-')
+        if stem and number.isdigit():
+            prefix = stem + '-'
+            self.last_numbers[prefix] = max(
+                self.last_numbers.get(prefix, 1), int(number))
+
+    def allocate(self, slug):
+        if slug in self.taken:
+            prefix = _prefix(slug)
+            slug = f'{prefix}{self.last_numbers.get(prefix, 1) + 1}'
+        self.add(slug)
+        return slug
@@ -0,0 +1,53 @@
+"""Статистика задач из таблиц счётчиков.
+
+Счётчики обновляют триггеры (миграция 0006), поэтому чтение статистики
+не зависит от числа задач: одна строка TaskStats и по строке на день.
+"""
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import TaskDailyStats, TaskStats
+
+# Дни считаются по UTC: так же дату берут триггеры SQLite
+REBUILD_SQL = [
+    'DELETE FROM deals_taskstats',
+    """
+    INSERT INTO deals_taskstats (id, total, with_image)
+    SELECT 1, COUNT(*), COALESCE(SUM(COALESCE(image, '') != ''), 0)
+    FROM deals_task
+    """,
+    'DELETE FROM deals_taskdailystats',
+    """
+    INSERT INTO deals_taskdailystats (day, created)
+    SELECT date(created), COUNT(*) FROM deals_task GROUP BY date(created)
+    """,
+]
+
+
+def get_stats(days=30):
+    """Всего задач, задач с картинкой и созданных за последние days дней."""
+    totals = TaskStats.objects.filter(pk=1).values(
+        'total', 'with_image').first() or {'total': 0, 'with_image': 0}
+    per_day = []
+    if days > 0:
+        # Дней без новых задач в таблице нет, поэтому выбираем диапазон
+        # дат, а не последние days строк. timezone.now() — время в UTC
+        since = timezone.now().date() - timedelta(days=days - 1)
+        per_day = list(TaskDailyStats.objects.filter(day__gte=since)
+                       .order_by('-day').values('day', 'created'))
+    return dict(totals, per_day=per_day)
+
+
+def rebuild():
+    """Пересчитывает счётчики по таблице задач.
+
+    Нужна, только если счётчики разошлись с таблицей, например после
+    правки БД в обход триггеров. Выполняется в одной транзакции, чтобы
+    параллельные вставки не потерялись между подсчётом и записью.
+    """
+    using = router.db_for_write(TaskStats)
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        for sql in REBUILD_SQL:
+            cursor.execute(sql)
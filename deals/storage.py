@@ -0,0 +1,128 @@
+"""Хранилище картинок по содержимому.
+
+Файл сохраняется под именем из sha256 своего содержимого:
+tasks/ab/ab12…ef.jpg. Одинаковые картинки лежат на диске одним файлом,
+а повторная загрузка уже известной картинки ничего не записывает.
+ImageUploadHandler считает хеш, пока принимает файл, поэтому загрузку
+второй раз не читаем.
+
+Сколько полей задач и архивных задач ссылается на файл, считают
+триггеры SQLite (миграция 0009) в MediaBlob. delete() удаляет только
+файл без ссылок. Чтобы не удалить файл, который как раз переиспользует
+новая загрузка, задача которой ещё не сохранена, переиспользование
+отмечается в MediaBlob.reused, и такой файл TASK_MEDIA_REUSE_GRACE
+секунд не удаляется. Его потом уберёт gc_task_media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import MediaBlob
+
+BLOB_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}\.[^/.]+$')
+
+
+def new_hash():
+    return hashlib.sha256()
+
+
+def is_content_addressed(name):
+    return bool(BLOB_NAME_RE.search(name))
+
+
+def blob_name(name, digest):
+    """Имя файла с содержимым digest в том же каталоге, что и name."""
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(posixpath.dirname(name), digest[:2],
+                          digest + extension)
+
+
+def content_hash(content):
+    digest = new_hash()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        digest = (getattr(content, 'content_hash', None)
+                  or content_hash(content))
+        name = blob_name(name, digest)
+        if self._reuse(name):
+            return name
+        self._write(name, content)
+        return name
+
+    def _reuse(self, name):
+        """Отмечает переиспользование файла, если он уже записан.
+
+        Отметка ставится до проверки файла: delete() проверяет отметку
+        и удаляет файл под блокировкой записи в БД, поэтому файл не
+        исчезнет между проверкой и сохранением задачи.
+        """
+        blobs = MediaBlob.objects
+        now = timezone.now()
+        marked = blobs.filter(name=name).update(reused=now)
+        if not self.exists(name):
+            return False
+        if not marked:
+            blobs.bulk_create([MediaBlob(name=name, reused=now)],
+                              ignore_conflicts=True)
+        # Свежая дата изменения защищает файл и от gc_task_media
+        os.utime(self.path(name))
+        return True
+
+    def _write(self, name, content):
+        """Записывает файл через временный и переименование.
+
+        Параллельная загрузка той же картинки не увидит недописанный
+        файл, а если обе запишут его, содержимое всё равно одинаковое.
+        """
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        if self.directory_permissions_mode is not None:
+            os.makedirs(directory, self.directory_permissions_mode,
+                        exist_ok=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                file_move_safe(content.temporary_file_path(), tmp_path)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in content.chunks():
+                        f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, name):
+        """Удаляет файл, если на него не ссылается ни одна задача."""
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.TASK_MEDIA_REUSE_GRACE)
+        using = router.db_for_write(MediaBlob)
+        blobs = MediaBlob.objects.using(using)
+        with transaction.atomic(using):
+            # DELETE берёт блокировку записи, даже если не нашёл строк:
+            # до конца транзакции _reuse() в других процессах ждёт
+            blobs.filter(name=name, refs__lte=0).exclude(
+                reused__gte=cutoff).delete()
+            if blobs.filter(name=name).exists():
+                return
+            super().delete(name)
@@ -0,0 +1,54 @@
+"""Генератор синтетических задач для замеров производительности."""
+import random
+from itertools import accumulate, islice
+
+from django.db.models import Max
+
+from .models import Task
+
+SYLLABLES = (
+    'ба ва га да ка ла ма на па ра са та ро ло но мо ко ду ру ми ни ли '
+    'ки ти зе ве ре ше же че'
+).split()
+
+
+class TaskGenerator:
+    """Задачи из случайных слов; частоты слов подчиняются закону Ципфа.
+
+    При одинаковом seed генерируются одинаковые задачи, поэтому замеры
+    разных прогонов можно сравнивать между собой.
+    """
+    def __init__(self, seed=0, vocabulary_size=20000):
+        self.rng = random.Random(seed)
+        words = sorted({
+            ''.join(self.rng.choices(SYLLABLES, k=self.rng.randint(2, 4)))
+            for _ in range(vocabulary_size)
+        })
+        self.rng.shuffle(words)
+        self.words = words
+        self.cum_weights = list(accumulate(
+            1 / rank for rank in range(1, len(words) + 1)))
+
+    def phrase(self, length):
+        return ' '.join(self.rng.choices(
+            self.words, cum_weights=self.cum_weights, k=length))
+
+    def tasks(self, count, slug_prefix='bench'):
+        # Номера в slug продолжают последний id, чтобы не пересечься
+        # с задачами прошлых прогонов
+        start = Task.objects.aggregate(last=Max('id'))['last'] or 0
+        for number in range(start + 1, start + count + 1):
+            yield Task(
+                title=self.phrase(3),
+                text=self.phrase(60),
+                slug=f'{slug_prefix}-{number}',
+            )
+
+    def seed(self, count, batch_size=5000):
+        """Добавляет count задач пачками через bulk_create."""
+        tasks = self.tasks(count)
+        while True:
+            batch = list(islice(tasks, batch_size))
+            if not batch:
+                return
+            Task.objects.bulk_create(batch)
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from deals.admin import TaskAdmin
+from deals.models import Task
+
+User = get_user_model()
+
+
+class TaskAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('admin:deals_task_changelist')
+        Task.objects.bulk_create(
+            Task(title=f'Позвонить клиенту {i}', text='Текст задачи',
+                 slug=f'task-{i}')
+            for i in range(5)
+        )
+        Task.objects.create(title='Написать отчёт', text='Квартальный',
+                            slug='report')
+
+    def task_queries(self, *args, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(*args, **kwargs)
+        return response, [q['sql'] for q in context.captured_queries
+                          if 'deals_task' in q['sql']]
+
+    def test_changelist_without_count_and_text(self):
+        """Список задач не считает строки таблицы и не читает текст."""
+        response, queries = self.task_queries(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 6)
+        for sql in queries:
+            self.assertNotIn('COUNT', sql)
+            self.assertNotIn('"text"', sql)
+
+    def test_search_uses_fulltext_index(self):
+        response, queries = self.task_queries(self.url, {'q': 'отчёт'})
+        self.assertEqual(
+            [task.slug for task in response.context['cl'].result_list],
+            ['report'])
+        self.assertTrue(any('deals_task_fts' in sql for sql in queries))
+        self.assertFalse(any('LIKE' in sql for sql in queries))
+
+    def test_search_not_capped(self):
+        """Поиск в админке находит все совпадения."""
+        Task.objects.bulk_create(
+            Task(title='Позвонить', text='Текст', slug=f'call-{i}')
+            for i in range(1100)
+        )
+        response = self.client.get(self.url, {'q': 'позвонить', 'p': '11'})
+        self.assertEqual(response.context['cl'].result_count, 1105)
+        # На последней странице самые старые задачи из setUp
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+
+    def test_delete_in_chunks(self):
+        """Удаление просит подтверждения и удаляет задачи пачками."""
+        data = {'action': 'delete_in_chunks', 'select_across': '1',
+                'index': '0', '_selected_action': ['1']}
+        response = self.client.post(self.url + '?q=клиенту', data)
+        self.assertContains(response, 'Будет удалено задач: 5')
+        self.assertEqual(Task.objects.count(), 6)
+        with mock.patch.object(TaskAdmin, 'action_chunk_size', 2):
+            self.client.post(self.url + '?q=клиенту', dict(data, post='yes'))
+        self.assertEqual(
+            list(Task.objects.values_list('slug', flat=True)), ['report'])
+        # Каждое удаление видно в истории админки
+        entries = LogEntry.objects.filter(action_flag=DELETION)
+        self.assertEqual(entries.count(), 5)
+        self.assertEqual(
+            sorted(entries.values_list('object_repr', flat=True)),
+            [f'Позвонить клиенту {i}' for i in range(5)])
+        self.assertEqual(entries.first().user, self.user)
+
+    def test_delete_confirmation_count_capped(self):
+        """Подтверждение не считает все выбранные задачи."""
+        data = {'action': 'delete_in_chunks', 'select_across': '1',
+                'index': '0', '_selected_action': ['1']}
+        with mock.patch('deals.admin.TaskPaginator.max_count', 3):
+            response, queries = self.task_queries(
+                self.url + '?q=клиенту', data, method='post')
+        self.assertContains(response, 'Будет удалено задач: не меньше 3')
+        self.assertTrue(any('LIMIT 3' in sql for sql in queries))
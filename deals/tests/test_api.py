@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from deals.models import Task
+
+User = get_user_model()
+
+
+class TaskApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for i in range(3):
+            Task.objects.create(
+                title=f'Задача {i}', text='Текст', slug=f'task-{i}')
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.list_url = reverse('deals:api_task_list')
+        self.detail_url = reverse(
+            'deals:api_task_detail', kwargs={'slug': 'task-1'})
+
+    def task_queries(self, url, **headers):
+        """Выполняет запрос и возвращает запросы к таблице задач."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url, **headers)
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'deals_task' in query['sql']
+        ]
+
+    def test_task_list(self):
+        """Список отдаётся в JSON с ETag и Last-Modified."""
+        response = self.authorized_client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        data = response.json()
+        self.assertEqual([task['slug'] for task in data['results']],
+                         ['task-2', 'task-1', 'task-0'])
+        self.assertIsNone(data['next'])
+
+    def test_task_detail(self):
+        """Задача отдаётся в JSON вместе с текстом."""
+        response = self.authorized_client.get(self.detail_url)
+        data = response.json()
+        self.assertEqual(data['title'], 'Задача 1')
+        self.assertEqual(data['text'], 'Текст')
+        self.assertIsNone(data['image'])
+
+    def test_unchanged_list_poll_is_one_light_query(self):
+        """Повторный опрос без изменений — 304 и один лёгкий запрос."""
+        response = self.authorized_client.get(self.list_url)
+        for _ in range(3):
+            repeated, queries = self.task_queries(
+                self.list_url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repeated.status_code, 304)
+            self.assertEqual(len(queries), 1)
+            # Число задач читается из счётчика, а не COUNT(*)
+            self.assertNotIn('COUNT', queries[0])
+            self.assertNotIn('"text"', queries[0])
+
+    def test_unchanged_detail_poll_is_one_light_query(self):
+        """Повторный опрос задачи без изменений не читает её текст."""
+        response = self.authorized_client.get(self.detail_url)
+        repeated, queries = self.task_queries(
+            self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeated.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"text"', queries[0])
+
+    def test_etag_changes_on_update_and_delete(self):
+        """ETag списка меняется при изменении и удалении задачи."""
+        etag = self.authorized_client.get(self.list_url)['ETag']
+        Task.objects.get(slug='task-0').delete()
+        response = self.authorized_client.get(
+            self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        task = Task.objects.get(slug='task-1')
+        task.title = 'Новый заголовок'
+        task.save()
+        response = self.authorized_client.get(
+            self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_task_returns_404(self):
+        """Несуществующая задача отдаёт 404."""
+        response = self.authorized_client.get(
+            reverse('deals:api_task_detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_redirects_anonymous(self):
+        """API доступен только авторизованному пользователю."""
+        response = Client().get(self.list_url)
+        self.assertEqual(response.status_code, 302)
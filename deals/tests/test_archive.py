@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from deals import archive, stats
+from deals.forms import TaskCreateForm
+from deals.media import referenced_names
+from deals.models import ArchivedTask, Task
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def run_on_commit(func):
+    # В TestCase транзакция не фиксируется, вызываем сразу
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('deals.signals.transaction.on_commit', run_on_commit)
+@mock.patch('deals.signals.images.schedule', mock.Mock())
+class ArchiveTasksTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        old = timezone.now() - timedelta(days=400)
+        self.old = Task(title='Старая задача', text='Текст', slug='old')
+        self.old.image.save('old.png', ContentFile(b'image'))
+        Task.objects.create(title='Ещё старая', text='Текст', slug='older')
+        Task.objects.filter(slug__in=['old', 'older']).update(modified=old)
+        Task.objects.create(title='Новая задача', text='Текст', slug='new')
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_tasks', stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_cold_tasks(self):
+        """В архив уходят только давно не менявшиеся задачи."""
+        output = self.archive(batch_size=1)
+        self.assertIn('Перенесено в архив задач: 2', output)
+        self.assertEqual(
+            list(Task.objects.values_list('slug', flat=True)), ['new'])
+        archived = ArchivedTask.objects.get(slug='old')
+        self.assertEqual(archived.id, self.old.id)
+        self.assertEqual(archived.title, 'Старая задача')
+        self.assertEqual(archived.image.name, self.old.image.name)
+        # Картинка архивной задачи остаётся на диске и нужна ей
+        self.assertTrue(os.path.exists(self.old.image.path))
+        self.assertEqual(referenced_names([self.old.image.name]),
+                         {self.old.image.name})
+        # Счётчики считают только горячую таблицу
+        self.assertEqual(stats.get_stats(days=0)['total'], 1)
+
+    def test_task_changed_after_selection_kept(self):
+        """Задача, изменённая после выборки id, в архив не уходит."""
+        cutoff = timezone.now() - timedelta(days=365)
+        ids = archive.cold_ids(cutoff, 10)
+        Task.objects.filter(slug='older').update(modified=timezone.now())
+        self.assertEqual(archive.archive(ids, cutoff), 1)
+        self.assertEqual(
+            list(ArchivedTask.objects.values_list('slug', flat=True)),
+            ['old'])
+        self.assertTrue(Task.objects.filter(slug='older').exists())
+
+    def test_resumable(self):
+        """Повторный запуск продолжает перенос с того же места."""
+        self.assertIn('задач: 1', self.archive(limit=1))
+        self.assertEqual(ArchivedTask.objects.count(), 1)
+        self.assertIn('задач: 1', self.archive())
+        self.assertIn('задач: 0', self.archive())
+        self.assertEqual(ArchivedTask.objects.count(), 2)
+
+    def test_detail_falls_back_to_archive(self):
+        self.archive()
+        client = self.client
+        client.force_login(User.objects.create_user(username='user'))
+        response = client.get(reverse('deals:task_detail', args=['old']))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Старая задача')
+        response = client.get(reverse('deals:task_detail', args=['gone']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_archived_slug_stays_taken(self):
+        """Новая задача не получает адрес архивной."""
+        self.archive()
+        task = Task.objects.create(title='Old', text='Текст')
+        self.assertEqual(task.slug, 'old-2')
+        form = TaskCreateForm(
+            data={'title': 'Задача', 'text': 'Текст', 'slug': 'older'})
+        self.assertIn('slug', form.errors)
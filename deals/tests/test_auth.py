@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from todo.auth import CachedModelBackend, UserCache, user_cache
+
+User = get_user_model()
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            username='StasBasov', password='old-password')
+        self.backend = CachedModelBackend()
+
+    def test_user_read_once(self):
+        """Повторно пользователь берётся из кеша без запроса к БД."""
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+        self.assertEqual(user.username, 'StasBasov')
+
+    def test_password_change_invalidates(self):
+        """После смены пароля старые сессии перестают действовать."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('deals:task_list')
+        self.assertEqual(client.get(url).status_code, 200)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertEqual(client.get(url).status_code, 302)
+
+    def test_logout_invalidates(self):
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('deals:task_list'))
+        self.assertIsNotNone(user_cache.get(self.user.pk))
+        client.logout()
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_session_of_model_backend_kept(self):
+        """Сессии, открытые через ModelBackend, не сбрасываются."""
+        client = Client()
+        client.force_login(
+            self.user, 'django.contrib.auth.backends.ModelBackend')
+        response = client.get(reverse('deals:task_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_lru_eviction_and_timeout(self):
+        users = UserCache(size=2, timeout=60)
+        for user_id in (1, 2, 3):
+            users.set(user_id, User(pk=user_id))
+        self.assertIsNone(users.get(1))
+        self.assertEqual(users.get(3).pk, 3)
+        expired = UserCache(size=2, timeout=-1)
+        expired.set(1, User(pk=1))
+        self.assertIsNone(expired.get(1))
+
+
+class ClearExpiredSessionsTests(TestCase):
+    def test_deletes_only_expired(self):
+        """Истёкшие сессии удаляются порциями, действующие остаются."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='',
+                    expire_date=now - timedelta(days=1))
+            for i in range(5)
+        )
+        Session.objects.create(session_key='active', session_data='',
+                               expire_date=now + timedelta(days=1))
+        out = StringIO()
+        call_command('clear_expired_sessions', batch_size=2, stdout=out)
+        self.assertIn('Удалено сессий: 5', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['active'])
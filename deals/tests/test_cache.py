@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as default_cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from deals import cache
+from deals.models import Task
+
+User = get_user_model()
+
+
+class TaskDetailCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.task = Task.objects.create(
+            title='Заголовок',
+            text='Текст',
+            slug='test-slug',
+        )
+
+    def setUp(self):
+        default_cache.clear()
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('deals:task_detail', kwargs={'slug': 'test-slug'})
+
+    def test_second_request_served_from_cache(self):
+        """Повторный запрос отдаётся из кеша без обращения к задаче."""
+        first = self.authorized_client.get(self.url)
+        # Сессия и пользователь тоже берутся из кеша
+        with self.assertNumQueries(0):
+            second = self.authorized_client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_save_invalidates_cache(self):
+        """Изменение задачи сбрасывает кеш её страницы."""
+        self.authorized_client.get(self.url)
+        task = Task.objects.get(slug='test-slug')
+        task.title = 'Новый заголовок'
+        task.save()
+        response = self.authorized_client.get(self.url)
+        self.assertContains(response, 'Новый заголовок')
+
+    def test_slug_change_invalidates_old_address(self):
+        """После смены slug старый адрес больше не отдаётся из кеша."""
+        self.authorized_client.get(self.url)
+        task = Task.objects.get(slug='test-slug')
+        task.slug = 'new-slug'
+        task.save()
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_invalidates_cache(self):
+        """Удаление задачи сбрасывает кеш её страницы."""
+        self.authorized_client.get(self.url)
+        Task.objects.get(slug='test-slug').delete()
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous_is_not_served_from_cache(self):
+        """Закешированная страница не отдаётся анонимному пользователю."""
+        self.authorized_client.get(self.url)
+        response = Client().get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from deals.management.commands.benchmark import Command as BenchmarkCommand
+from deals.management.commands.startup_report import parse_importtime
+from deals.models import Task
+from todo.warmup import warm_up
+
+
+class ImportTasksCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        Task.objects.create(
+            title='Заголовок',
+            text='Текст',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv(self):
+        """Задачи из CSV получают slug по тем же правилам, что и save()."""
+        path = self.write(
+            'tasks.csv',
+            'title,text,slug\n'
+            'Первая задача,Текст,\n'
+            'Вторая задача,Текст,vtoraya\n'
+        )
+        call_command('import_tasks', path, stdout=StringIO())
+        self.assertTrue(Task.objects.filter(slug='pervaya-zadacha').exists())
+        self.assertTrue(Task.objects.filter(slug='vtoraya').exists())
+
+    def test_import_jsonl_resolves_duplicate_slugs(self):
+        """Повторяющиеся адреса получают суффиксы -2, -3."""
+        rows = [{'title': 'Заголовок', 'text': f'Текст {i}'} for i in range(2)]
+        path = self.write(
+            'tasks.jsonl',
+            '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows)
+        )
+        call_command('import_tasks', path, stdout=StringIO())
+        self.assertEqual(
+            sorted(Task.objects.filter(slug__startswith='zagolovok')
+                   .values_list('slug', flat=True)),
+            ['zagolovok', 'zagolovok-2', 'zagolovok-3']
+        )
+
+    def test_taken_explicit_slug_is_skipped(self):
+        """Строка с уже занятым явным адресом пропускается."""
+        path = self.write(
+            'taken.jsonl',
+            json.dumps({'title': 'Другая', 'text': 'Текст',
+                        'slug': 'zagolovok'})
+        )
+        out = StringIO()
+        call_command('import_tasks', path, stdout=out)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertIn('пропущено: 1', out.getvalue())
+
+    def test_invalid_explicit_slug_is_skipped(self):
+        """Явный адрес проверяется так же, как в форме."""
+        rows = [
+            {'title': 'Пробелы', 'text': 'Текст', 'slug': 'два слова'},
+            {'title': 'Длинный', 'text': 'Текст', 'slug': 'a' * 101},
+            {'title': 'Верный', 'text': 'Текст', 'slug': 'vernyi'},
+        ]
+        path = self.write(
+            'invalid.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        out = StringIO()
+        call_command('import_tasks', path, stdout=out)
+        self.assertIn('пропущено: 2', out.getvalue())
+        self.assertEqual(
+            list(Task.objects.exclude(slug='zagolovok')
+                 .values_list('slug', flat=True)),
+            ['vernyi'])
+
+    def test_broken_jsonl_line(self):
+        """Ошибка разбора JSONL называет номер строки."""
+        for content, message in (
+            ('{"title": "Задача", "text": "Текст"}\n{"title": ', 'Строка 2'),
+            ('\n[1, 2]\n', 'Строка 2: ожидается объект JSON'),
+        ):
+            path = self.write('broken.jsonl', content)
+            with self.subTest(content=content):
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command('import_tasks', path, stdout=StringIO())
+
+    def test_one_query_per_batch(self):
+        """На пачку без совпадений — запрос адресов и вставка."""
+        path = self.write(
+            'batch.jsonl',
+            '\n'.join(
+                json.dumps({'title': f'Задача {i}', 'text': 'Текст'})
+                for i in range(10)
+            )
+        )
+        # Для каждой из двух пачек: выборка slug, SAVEPOINT, INSERT, RELEASE
+        with self.assertNumQueries(8):
+            call_command('import_tasks', path, batch_size=5,
+                         stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 11)
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    baseline = {'views': {
+        'task_list': {'p95_ms': 10.0, 'queries': 4},
+        'about': {'p95_ms': 2.0, 'queries': 0},
+    }}
+
+    def test_too_few_requests(self):
+        """Перцентили по одному замеру не считаются."""
+        with self.assertRaisesMessage(CommandError, '--requests'):
+            call_command('benchmark', requests=1, stdout=StringIO())
+
+    def test_no_regressions_within_threshold(self):
+        """Рост p95 в пределах порога регрессией не считается."""
+        results = {'views': {
+            'task_list': {'p95_ms': 11.5, 'queries': 4},
+            'about': {'p95_ms': 1.0, 'queries': 0},
+            'home_get': {'p95_ms': 100.0, 'queries': 9},
+        }}
+        self.assertEqual(
+            BenchmarkCommand.compare(self.baseline, results, 0.2), [])
+
+    def test_slower_view_and_extra_queries_are_regressions(self):
+        """Медленная страница и лишние запросы считаются регрессиями."""
+        results = {'views': {
+            'task_list': {'p95_ms': 12.5, 'queries': 5},
+            'about': {'p95_ms': 2.0, 'queries': 0},
+        }}
+        regressions = BenchmarkCommand.compare(self.baseline, results, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(r.startswith('task_list') for r in regressions))
+
+
+class StartupTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        """Из вывода -X importtime берутся только строки модулей."""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   pytils.utils\n'
+            'import time:        80 |        200 | pytils\n'
+        )
+        self.assertEqual(parse_importtime(output), [
+            ('pytils.utils', 120, 120),
+            ('pytils', 80, 200),
+        ])
+
+    def test_warm_up(self):
+        """Прогрев выполняет все шаги и не падает на шаблонах проекта."""
+        with self.assertLogs('todo.warmup', 'INFO'):
+            timings = warm_up()
+        self.assertEqual(set(timings), {'modules', 'templates', 'urls'})
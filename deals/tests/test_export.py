@@ -0,0 +1,76 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from deals import export
+from deals.models import Task
+
+User = get_user_model()
+
+
+class TaskExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}', text=f'Текст, "{i}"', slug=f'task-{i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('deals:task_export')
+
+    def read(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        """NDJSON содержит по строке на задачу в порядке id."""
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['slug'] for row in rows],
+                         ['task-0', 'task-1', 'task-2'])
+        self.assertEqual(rows[0]['text'], 'Текст, "0"')
+
+    def test_csv_export(self):
+        """CSV начинается с заголовка и корректно экранирует текст."""
+        response = self.authorized_client.get(self.url, {'format': 'csv'})
+        rows = list(csv.reader(StringIO(self.read(response))))
+        self.assertEqual(rows[0], list(export.FIELDS))
+        self.assertEqual(rows[1][2], 'Текст, "0"')
+        self.assertEqual(len(rows), 4)
+
+    def test_incremental_export(self):
+        """С ?after= выгружаются только задачи с большим id."""
+        response = self.authorized_client.get(
+            self.url, {'after': self.tasks[0].id})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.tasks[1].id, self.tasks[2].id])
+
+    def test_rows_are_read_in_chunks(self):
+        """Задачи читаются пачками, а не одним запросом на всю таблицу."""
+        with self.assertNumQueries(3):
+            chunks = list(export.iter_rows(chunk_size=2))
+        self.assertEqual([len(rows) for rows in chunks], [2, 1])
+
+    def test_unknown_format_returns_404(self):
+        """Неизвестный формат приводит к ошибке 404."""
+        response = self.authorized_client.get(self.url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_redirects_anonymous(self):
+        """Выгрузка доступна только авторизованному пользователю."""
+        response = Client().get(self.url)
+        self.assertEqual(response.status_code, 302)
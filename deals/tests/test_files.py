@@ -0,0 +1,139 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase
+
+from todo import files
+
+CONTENT = bytes(range(256)) * 40
+
+
+class FilesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'tasks'))
+        with open(os.path.join(self.root, 'tasks', 'cat.png'), 'wb') as f:
+            f.write(CONTENT)
+        self.factory = RequestFactory()
+
+    def get(self, view, path, **headers):
+        with self.settings(MEDIA_ROOT=self.root, STATIC_ROOT=self.root):
+            return view(self.factory.get('/', **headers), path)
+
+
+class MediaTests(FilesTestCase):
+    def test_full_file(self):
+        """Файл отдаётся целиком с валидаторами и заголовком кеширования."""
+        response = self.get(files.serve_media, 'tasks/cat.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_content_addressed_file_is_immutable(self):
+        """Файл с хешем содержимого в имени кешируется навсегда."""
+        name = 'tasks/ab/' + 'ab' * 32 + '.png'
+        os.makedirs(os.path.join(self.root, 'tasks', 'ab'))
+        os.rename(os.path.join(self.root, 'tasks', 'cat.png'),
+                  os.path.join(self.root, name))
+        response = self.get(files.serve_media, name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range(self):
+        """Запрос с Range получает только нужный кусок файла."""
+        response = self.get(files.serve_media, 'tasks/cat.png',
+                            HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         CONTENT[100:200])
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 100-199/{len(CONTENT)}')
+        response = self.get(files.serve_media, 'tasks/cat.png',
+                            HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-10:])
+
+    def test_range_not_satisfiable(self):
+        response = self.get(files.serve_media, 'tasks/cat.png',
+                            HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_returns_full_file(self):
+        """Если файл изменился, If-Range отменяет Range."""
+        response = self.get(files.serve_media, 'tasks/cat.png',
+                            HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.get(files.serve_media, 'tasks/cat.png')['ETag']
+        response = self.get(files.serve_media, 'tasks/cat.png',
+                            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_accel_redirect(self):
+        """С X-Accel-Redirect файл отдаёт nginx, а не Python."""
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.get(files.serve_media, 'tasks/cat.png')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/tasks/cat.png')
+        self.assertEqual(response.content, b'')
+
+    def test_outside_root(self):
+        with self.assertRaises(Http404):
+            self.get(files.serve_media, '../etc/passwd')
+        with self.assertRaises(Http404):
+            self.get(files.serve_media, 'tasks')
+
+
+class StaticTests(FilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.css = b'body { color: red; }\n' * 100
+        for name in ('app.css', 'app.0123456789ab.css'):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(self.css)
+            with open(os.path.join(self.root, name + '.gz'), 'wb') as f:
+                f.write(gzip.compress(self.css))
+
+    def test_gzip_copy(self):
+        """Браузеру с поддержкой gzip отдаётся заранее сжатая копия."""
+        response = self.get(files.serve_static, 'app.css',
+                            HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), self.css)
+        response = self.get(files.serve_static, 'app.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_hashed_name_cached_forever(self):
+        response = self.get(files.serve_static, 'app.0123456789ab.css')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.get(files.serve_static, 'app.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_collectstatic_writes_gzip_copies(self):
+        """collectstatic кладёт рядом с хешированными файлами .gz-копии."""
+        static_root = os.path.join(self.root, 'static')
+        with self.settings(
+                STATIC_ROOT=static_root,
+                STATICFILES_STORAGE=(
+                    'todo.storage.CompressedManifestStaticFilesStorage')):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(static_root, 'staticfiles.json')) as f:
+            manifest = json.load(f)['paths']
+        compressed = 0
+        for name in manifest.values():
+            path = os.path.join(static_root, name)
+            if name.endswith('.css') and os.path.getsize(path) > 1024:
+                self.assertTrue(os.path.exists(path + '.gz'), name)
+                compressed += 1
+        self.assertGreater(compressed, 0)
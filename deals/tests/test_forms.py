@@ -1,11 +1,15 @@
+import hashlib
 import shutil
 import tempfile
+from unittest import mock
 
 from deals.forms import TaskCreateForm
 from deals.models import Task
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 # Создаем временную папку для медиа-файлов;
@@ -73,12 +77,14 @@ class TaskCreateFormTests(TestCase):
         self.assertRedirects(response, reverse('deals:task_added'))
         # Проверяем, увеличилось ли число постов
         self.assertEqual(Task.objects.count(), tasks_count+1)
-        # Проверяем, что создалась запись с нашим слагом
+        # Проверяем, что создалась запись с нашим слагом. Картинка
+        # хранится под хешем содержимого
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(
             Task.objects.filter(
                 slug='testovyij-zagolovok',
                 text='Тестовый текст',
-                image='tasks/small.gif'
+                image=f'tasks/{digest[:2]}/{digest}.gif'
                 ).exists()
         )
 
@@ -120,3 +126,72 @@ class TaskCreateFormTests(TestCase):
     def test_title_help_text(self):
         title_help_text = TaskCreateFormTests.form.fields['title'].help_text
         self.assertEqual(title_help_text, 'Дайте короткое название задаче')
+
+
+class TaskSlugRaceTests(TestCase):
+    """Одновременная отправка форм с одинаковым адресом."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Task.objects.create(
+            title='Тестовый заголовок',
+            text='Тестовый текст',
+            slug='first'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_concurrent_forms_get_suffixed_slugs(self):
+        """Формы, прошедшие проверку одновременно, сохраняются без ошибок."""
+        form_data = {'title': 'Одинаковый заголовок', 'text': 'Текст'}
+        forms = [TaskCreateForm(data=form_data) for _ in range(3)]
+        # Все формы проходят валидацию раньше, чем любая из них сохранится
+        for form in forms:
+            self.assertTrue(form.is_valid())
+        slugs = [form.save().slug for form in forms]
+        self.assertEqual(slugs, [
+            'odinakovyij-zagolovok',
+            'odinakovyij-zagolovok-2',
+            'odinakovyij-zagolovok-3',
+        ])
+
+    def test_taken_explicit_slug_after_validation_is_form_error(self):
+        """Занятый после проверки адрес даёт ошибку формы, а не 500."""
+        form_data = {
+            'title': 'Заголовок из формы',
+            'text': 'Текст из формы',
+            'slug': 'first',
+        }
+        # Имитируем гонку: проверка в форме не заметила занятый адрес
+        with mock.patch.object(
+                TaskCreateForm, 'clean_slug',
+                lambda form: form.cleaned_data['slug']):
+            response = self.guest_client.post(
+                reverse('deals:home'), data=form_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response,
+            'form',
+            'slug',
+            'Адрес "first" уже существует, придумайте уникальное значение'
+        )
+        self.assertEqual(Task.objects.filter(slug='first').count(), 1)
+
+    def test_create_without_slug_makes_single_insert(self):
+        """Создание задачи без slug не проверяет адрес отдельным запросом."""
+        form_data = {'title': 'Новая задача', 'text': 'Текст'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.post(
+                reverse('deals:home'), data=form_data)
+        # Точки сохранения транзакций не считаем: вне тестов внешняя
+        # транзакция не создаёт SAVEPOINT. Раньше здесь было три запроса:
+        # два exists() по slug и INSERT
+        statements = [
+            query['sql'] for query in queries.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+        self.assertRedirects(response, reverse('deals:task_added'))
+        self.assertTrue(Task.objects.filter(slug='novaya-zadacha').exists())
@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from deals.images import make_variants
+from deals.models import Task
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(width, height, image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, image_format)
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TaskImageVariantsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.task = Task(title='Заголовок', text='Текст', slug='test-slug')
+        self.task.image.save('big.png', make_image(2000, 1000), save=False)
+        self.task.save()
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_make_variants(self):
+        """Копии картинки строятся нужной ширины и формата."""
+        self.assertTrue(make_variants(self.task.pk))
+        task = Task.objects.get(pk=self.task.pk)
+        expected = {
+            'image_thumbnail': ((320, 160), 'JPEG'),
+            'image_medium': ((1024, 512), 'JPEG'),
+            'image_webp': ((1024, 512), 'WEBP'),
+        }
+        for name, (size, image_format) in expected.items():
+            with self.subTest(name=name):
+                with Image.open(getattr(task, name).path) as image:
+                    self.assertEqual(image.size, size)
+                    self.assertEqual(image.format, image_format)
+        # Готовые копии повторно не строятся
+        self.assertFalse(make_variants(self.task.pk))
+
+    def test_detail_page_uses_variants(self):
+        """Страница задачи выводит srcset с копиями и ленивую загрузку."""
+        url = reverse('deals:task_detail', kwargs={'slug': 'test-slug'})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, self.task.image.url)
+        make_variants(self.task.pk)
+        task = Task.objects.get(pk=self.task.pk)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'{task.image_thumbnail.url} 320w')
+        self.assertContains(response, task.image_webp.url)
+
+    def test_new_image_resets_variants(self):
+        """При замене картинки старые копии отвязываются от задачи."""
+        make_variants(self.task.pk)
+        task = Task.objects.get(pk=self.task.pk)
+        task.image.save('other.png', make_image(100, 100), save=False)
+        task.save()
+        task.refresh_from_db()
+        self.assertFalse(task.image_medium)
+        self.assertFalse(task.image_thumbnail)
+        self.assertFalse(task.image_webp)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from deals import ingest
+from deals.models import Task
+
+
+class IngestQueueTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(TASK_INGEST_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Фоновый поток в тестах не запускаем, очередь пишем вручную
+        patcher = mock.patch('deals.ingest.start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_form_is_queued(self):
+        """Форма ставит задачу в очередь, а не пишет её в БД сразу."""
+        response = self.client.post(reverse('deals:home'), {
+            'title': 'Задача из очереди', 'text': 'Текст'})
+        self.assertRedirects(response, reverse('deals:task_added'))
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(ingest.pending(), 1)
+
+        self.assertEqual(ingest.flush(), 1)
+        task = Task.objects.get()
+        self.assertEqual(task.title, 'Задача из очереди')
+        self.assertEqual(task.slug, 'zadacha-iz-ocheredi')
+        self.assertEqual(ingest.pending(), 0)
+
+    def test_batches_and_slug_conflicts(self):
+        """Пачка пишется целиком, занятые адреса получают суффиксы."""
+        Task.objects.create(title='Задача', text='Текст', slug='zadacha')
+        for _ in range(3):
+            ingest.enqueue({'title': 'Задача', 'text': 'Текст', 'slug': ''})
+        with self.assertNumQueries(3 * 8):
+            # На каждую пачку: SAVEPOINT, блокировка, старые ключи, ключи
+            # пачки, адреса, INSERT задач и ключей, RELEASE
+            self.assertEqual(ingest.flush(limit=1), 3)
+        self.assertEqual(
+            sorted(Task.objects.values_list('slug', flat=True)),
+            ['zadacha', 'zadacha-2', 'zadacha-3', 'zadacha-4'])
+
+    def test_taken_explicit_slug_rejected(self):
+        """Указанный вручную адрес, занятый в очереди, не меняется:
+        задача не записывается, а в журнал пишется предупреждение."""
+        for title in ('Первая', 'Вторая'):
+            ingest.enqueue({'title': title, 'text': 'Текст',
+                            'slug': 'moi-adres'})
+        with self.assertLogs('deals.ingest', 'WARNING') as logs:
+            self.assertEqual(ingest.flush(), 1)
+        self.assertIn('moi-adres', logs.output[0])
+        self.assertEqual(Task.objects.get().title, 'Первая')
+        self.assertEqual(ingest.pending(), 0)
+
+    def test_full_batch(self):
+        """Полная пачка с разными адресами записывается одной
+        транзакцией, не упираясь в глубину выражения SQLite."""
+        size = settings.TASK_INGEST_BATCH_SIZE
+        for number in range(size):
+            ingest.enqueue({'title': f'Задача {number}', 'text': 'Текст',
+                            'slug': ''})
+        self.assertEqual(ingest.flush(), size)
+        self.assertEqual(Task.objects.count(), size)
+        self.assertEqual(ingest.pending(), 0)
+
+    def test_failed_batch_returns_to_queue(self):
+        ingest.enqueue({'title': 'Задача', 'text': 'Текст', 'slug': ''})
+        with mock.patch('deals.ingest.build_tasks',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                ingest.flush()
+        self.assertEqual(ingest.pending(), 1)
+
+    def test_crash_after_commit_not_duplicated(self):
+        """Пачка, сохранённая до падения, повторно не записывается."""
+        for number in range(2):
+            ingest.enqueue({'title': f'Задача {number}', 'text': 'Текст',
+                            'slug': ''})
+        # Процесс «упал» после фиксации, но до удаления файлов
+        with mock.patch('deals.ingest.os.remove', side_effect=OSError):
+            with self.assertRaises(OSError):
+                ingest.flush()
+        claimed = ingest._claimed_dir()
+        for name in os.listdir(claimed):
+            os.replace(os.path.join(claimed, name),
+                       ingest._path('queue', name))
+        ingest.enqueue({'title': 'Новая', 'text': 'Текст', 'slug': ''})
+        self.assertEqual(ingest.flush(), 1)
+        self.assertEqual(
+            sorted(Task.objects.values_list('slug', flat=True)),
+            ['novaya', 'zadacha-0', 'zadacha-1'])
+        self.assertEqual(ingest.pending(), 0)
+
+    def test_recover_dead_worker(self):
+        """Файлы, взятые умершим процессом, возвращаются в очередь."""
+        ingest.enqueue({'title': 'Задача', 'text': 'Текст', 'slug': ''})
+        dead = ingest._claimed_dir(pid=2 ** 22 + 1)
+        os.makedirs(dead)
+        for name in os.listdir(ingest._path('queue')):
+            os.replace(ingest._path('queue', name),
+                       os.path.join(dead, name))
+        self.assertEqual(ingest.pending(), 0)
+        out = StringIO()
+        call_command('process_task_queue', stdout=out)
+        self.assertIn('Возвращено в очередь: 1, записано задач: 1',
+                      out.getvalue())
+        self.assertFalse(os.path.exists(dead))
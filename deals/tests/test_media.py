@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from deals.media import iter_media_files, referenced_names
+from deals.models import Task
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def run_on_commit(func):
+    # В TestCase транзакция не фиксируется, вызываем сразу
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('deals.signals.transaction.on_commit', run_on_commit)
+@mock.patch('deals.signals.images.schedule', mock.Mock())
+class TaskMediaCleanupTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_task(self, slug):
+        task = Task(title='Заголовок', text='Текст', slug=slug)
+        task.image.save('cat.png', ContentFile(b'image'))
+        # Копии записываются в обход save(), как в images.make_variants()
+        task.image_thumbnail.save('cat-320.jpg', ContentFile(b'thumb'),
+                                  save=False)
+        Task.objects.filter(pk=task.pk).update(
+            image_thumbnail=task.image_thumbnail.name)
+        return Task.objects.get(pk=task.pk)
+
+    def test_delete_removes_files(self):
+        """Удаление задачи удаляет картинку и её копии."""
+        task = self.create_task('first')
+        paths = [task.image.path, task.image_thumbnail.path]
+        Task.objects.filter(pk=task.pk).delete()
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_replace_removes_old_files(self):
+        """Замена картинки удаляет старый файл и старые копии."""
+        task = self.create_task('second')
+        old_paths = [task.image.path, task.image_thumbnail.path]
+        task.image.save('dog.png', ContentFile(b'new image'))
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(task.image.path))
+
+    def test_unchanged_image_kept(self):
+        task = self.create_task('third')
+        task.title = 'Новый заголовок'
+        task.save()
+        self.assertTrue(os.path.exists(task.image.path))
+        self.assertTrue(os.path.exists(task.image_thumbnail.path))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GcTaskMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.root = os.path.join(TEMP_MEDIA_ROOT, 'tasks')
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'variants'))
+        for name in ('kept.png', 'orphan.png', 'variants/kept-320.jpg',
+                     'variants/orphan-320.jpg'):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(b'x' * 10)
+        task = Task.objects.create(
+            title='Заголовок', text='Текст', slug='kept',
+            image='tasks/kept.png')
+        Task.objects.filter(pk=task.pk).update(
+            image_thumbnail='tasks/variants/kept-320.jpg')
+
+    def existing(self):
+        return sorted(iter_media_files(self.root))
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command('gc_task_media', dry_run=True, min_age=0, stdout=out)
+        self.assertIn('tasks/orphan.png', out.getvalue())
+        self.assertIn('можно удалить 2', out.getvalue())
+        self.assertEqual(len(self.existing()), 4)
+
+    def test_deletes_orphans_in_batches(self):
+        """Лишние файлы удаляются, файлы задач остаются."""
+        call_command('gc_task_media', batch_size=1, min_age=0,
+                     stdout=StringIO())
+        self.assertEqual(self.existing(),
+                         ['kept.png', 'variants/kept-320.jpg'])
+
+    def test_names_checked_without_task_tables(self):
+        """Имена сверяются со счётчиками ссылок, а не с таблицами задач."""
+        names = ['tasks/kept.png', 'tasks/variants/kept-320.jpg',
+                 'tasks/orphan.png']
+        with CaptureQueriesContext(connection) as context:
+            referenced = referenced_names(names)
+        self.assertEqual(referenced, set(names[:2]))
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('deals_task', context.captured_queries[0]['sql'])
+
+    def test_young_files_skipped(self):
+        call_command('gc_task_media', stdout=StringIO())
+        self.assertEqual(len(self.existing()), 4)
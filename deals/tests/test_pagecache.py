@@ -0,0 +1,71 @@
+import re
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from deals.models import Task
+
+TOKEN_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_about_served_from_cache(self):
+        """Повторный запрос отдаётся из кеша без рендеринга шаблона."""
+        url = reverse('static_pages:about')
+        first = self.client.get(url)
+        self.assertTemplateUsed(first, 'static_pages/about.html')
+        response = self.client.get(url)
+        self.assertTemplateNotUsed(response, 'static_pages/about.html')
+        self.assertEqual(response.content, first.content)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(f'max-age={settings.PAGE_CACHE_MAX_AGE}',
+                      response['Cache-Control'])
+
+    def test_home_gets_own_csrf_token(self):
+        """В закешированную форму подставляется токен каждого клиента."""
+        url = reverse('deals:home')
+        self.client.get(url)
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(url)
+        self.assertTemplateNotUsed(response, 'deals/home.html')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        token = TOKEN_RE.search(response.content).group(1).decode()
+        response = client.post(url, {
+            'title': 'Задача', 'text': 'Текст',
+            'csrfmiddlewaretoken': token,
+        })
+        self.assertRedirects(response, reverse('deals:task_added'))
+        self.assertTrue(Task.objects.filter(title='Задача').exists())
+
+    def test_page_rendered_by_another_process(self):
+        """Страница из общего кеша, отрендеренная другим процессом со
+        своей меткой, получает токен клиента."""
+        url = reverse('deals:home')
+        self.client.get(url)
+        with mock.patch('todo.pagecache.CSRF_PLACEHOLDER',
+                        'csrf-placeholder-other-process'):
+            response = Client().get(url)
+        self.assertTemplateNotUsed(response, 'deals/home.html')
+        self.assertNotIn(b'csrf-placeholder', response.content)
+        self.assertIsNotNone(TOKEN_RE.search(response.content))
+
+    def test_session_cookie_bypasses_cache(self):
+        url = reverse('deals:task_added')
+        self.client.get(url)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'session'
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'deals/added.html')
+
+    def test_deploy_version_invalidates(self):
+        url = reverse('static_pages:about')
+        self.client.get(url)
+        with override_settings(PAGE_CACHE_VERSION='next'):
+            response = self.client.get(url)
+        self.assertTemplateUsed(response, 'static_pages/about.html')
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from deals.models import Task
+from todo.routers import PIN_COOKIE, ReplicaRouter, _state, replica_reads
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS={'replica1': 'replica.sqlite3'})
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.addCleanup(setattr, _state, 'pinned', False)
+
+    def test_reads_inside_replica_views_only(self):
+        """На реплику идут только чтения задач в отмеченных представлениях."""
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Task), 'replica1')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+
+    def test_pinned_client_reads_primary(self):
+        _state.pinned = True
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_no_replicas(self):
+        with self.settings(DATABASE_REPLICAS={}), replica_reads():
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_migrations_skip_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'deals'))
+        self.assertTrue(self.router.allow_migrate('default', 'deals'))
+
+    def test_write_pins_client_to_primary(self):
+        """Создавший задачу клиент получает cookie чтения из основной базы."""
+        cache.clear()
+        user = User.objects.create_user(username='StasBasov')
+        client = Client()
+        client.force_login(user)
+        response = client.post(reverse('deals:home'), {
+            'title': 'Новая задача', 'text': 'Текст', 'slug': 'new-task'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # Пока cookie действует, чтение идёт в основную базу и видит запись
+        response = client.get(reverse('deals:task_list'))
+        self.assertContains(response, 'Новая задача')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class SyncSqliteReplicaTests(TransactionTestCase):
+    # Копия снимается вне транзакции, как при запуске команды вручную;
+    # после теста восстанавливаем строку счётчиков из миграции
+    serialized_rollback = True
+
+    def test_copies_primary(self):
+        Task.objects.create(title='Заголовок', text='Текст', slug='copied')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_sqlite_replica', path, stdout=StringIO())
+            replica = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            try:
+                rows = replica.execute(
+                    'SELECT slug FROM deals_task').fetchall()
+            finally:
+                replica.close()
+        self.assertEqual(rows, [('copied',)])
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from deals.models import Task
+from deals.search import build_match, search_ids, search_tasks
+
+User = get_user_model()
+
+
+class TaskSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.milk = Task.objects.create(
+            title='Купить молоко',
+            text='Зайти в магазин после работы',
+            slug='milk',
+        )
+        cls.report = Task.objects.create(
+            title='Отчёт',
+            text='Подготовить отчёт для клиента, не забыть про молоко',
+            slug='report',
+        )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_build_match_quotes_tokens(self):
+        """Синтаксис FTS5 из запроса экранируется."""
+        self.assertEqual(build_match('молоко OR "хлеб'), '"молоко" "OR" "хлеб"')
+        self.assertIsNone(build_match('  ?! '))
+
+    def test_old_relevant_tasks_ranked(self):
+        """Ранжируются все совпадения, а не только самые новые."""
+        Task.objects.bulk_create(
+            Task(title=f'Купить хлеб {i}', text='Магазин', slug=f'bread-{i}')
+            for i in range(1100)
+        )
+        # Самая старая из подходящих задач — самая релевантная
+        self.assertEqual(search_ids('молоко', 1), [self.milk.id])
+        self.assertEqual(len(search_ids('хлеб', 2000)), 1100)
+
+    def test_search_by_title_and_text(self):
+        """Находятся задачи со словом и в заголовке, и в тексте."""
+        self.assertEqual(
+            {task.slug for task in search_tasks('молоко', 10)},
+            {'milk', 'report'}
+        )
+        self.assertEqual(
+            [task.slug for task in search_tasks('клиента', 10)],
+            ['report']
+        )
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении задачи."""
+        task = Task.objects.get(slug='milk')
+        task.title = 'Купить хлеб'
+        task.text = 'Зайти в булочную'
+        task.save()
+        self.assertEqual(search_tasks('хлеб', 10), [task])
+        self.assertNotIn(task, search_tasks('молоко', 10))
+        task.delete()
+        self.assertEqual(search_tasks('хлеб', 10), [])
+
+    def test_bulk_created_tasks_are_indexed(self):
+        """Задачи из bulk_create тоже попадают в индекс."""
+        Task.objects.bulk_create([
+            Task(title='Позвонить', text='Позвонить маме', slug='call'),
+        ])
+        self.assertEqual(
+            [task.slug for task in search_tasks('маме', 10)], ['call'])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс по таблице задач."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO deals_task_fts(deals_task_fts) "
+                "VALUES ('delete-all')")
+        self.assertEqual(search_tasks('молоко', 10), [])
+        call_command('rebuild_task_index', stdout=StringIO())
+        self.assertEqual(len(search_tasks('молоко', 10)), 2)
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные задачи постранично."""
+        url = reverse('deals:task_search')
+        response = self.authorized_client.get(url, {'q': 'отчёт'})
+        self.assertTemplateUsed(response, 'deals/task_search.html')
+        self.assertEqual(list(response.context['object_list']), [self.report])
+        self.assertFalse(response.context['has_next'])
+
+    def test_search_page_redirects_anonymous(self):
+        """Поиск доступен только авторизованному пользователю."""
+        response = Client().get(reverse('deals:task_search'), {'q': 'отчёт'})
+        self.assertEqual(response.status_code, 302)
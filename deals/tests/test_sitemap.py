@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from deals import archive
+from deals.models import SITEMAP_CHUNK_SIZE, SitemapChunk, Task
+
+User = get_user_model()
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='user'))
+        self.first = Task.objects.create(title='Первая', text='Текст',
+                                         slug='first')
+        self.second = Task.objects.create(
+            id=SITEMAP_CHUNK_SIZE + 1, title='Вторая', text='Текст',
+            slug='second')
+
+    def chunk_url(self, number):
+        return reverse('deals:sitemap_chunk', kwargs={'number': number})
+
+    def test_index_lists_chunks(self):
+        """Индекс перечисляет части по диапазонам id."""
+        response = self.client.get(reverse('deals:sitemap'))
+        self.assertEqual(response['Content-Type'],
+                         'application/xml; charset=utf-8')
+        self.assertContains(response, '<sitemap>', count=2)
+        self.assertContains(
+            response, f'<loc>http://testserver{self.chunk_url(1)}</loc>')
+
+    def test_chunk_lists_tasks_of_its_range(self):
+        """Часть содержит только задачи из своего диапазона id."""
+        response = self.client.get(self.chunk_url(0))
+        detail = reverse('deals:task_detail', kwargs={'slug': 'first'})
+        self.assertContains(response, f'<loc>http://testserver{detail}</loc>')
+        self.assertNotContains(response, 'second')
+
+    def test_chunk_includes_archived_tasks(self):
+        """Страницы архивных задач остаются в карте сайта."""
+        archive.archive([self.first.id])
+        response = self.client.get(self.chunk_url(0))
+        self.assertContains(response, '/task/first/')
+
+    def test_anonymous_redirected_to_login(self):
+        """Карта сайта закрыта для анонимов, как и страницы задач."""
+        self.client.logout()
+        for url in (reverse('deals:sitemap'), self.chunk_url(0)):
+            response = self.client.get(url)
+            self.assertRedirects(response, f'/admin/login/?next={url}',
+                                 fetch_redirect_response=False)
+
+    @override_settings(SITEMAP_PUBLIC=True)
+    def test_public_sitemap(self):
+        """С SITEMAP_PUBLIC карта сайта доступна поисковикам."""
+        self.client.logout()
+        for url in (reverse('deals:sitemap'), self.chunk_url(0)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_unknown_chunk(self):
+        response = self.client.get(self.chunk_url(5))
+        self.assertEqual(response.status_code, 404)
+
+    def test_chunk_served_from_cache(self):
+        """Повторный запрос части не читает задачи."""
+        first = self.client.get(self.chunk_url(0))
+        with self.assertNumQueries(1):
+            second = self.client.get(self.chunk_url(0))
+        self.assertEqual(first.content, second.content)
+
+    def test_change_invalidates_only_its_chunk(self):
+        """Изменение задачи сбрасывает кеш только её части."""
+        self.client.get(self.chunk_url(0))
+        self.client.get(self.chunk_url(1))
+        self.second.slug = 'renamed'
+        self.second.save()
+        with self.assertNumQueries(1):
+            self.client.get(self.chunk_url(0))
+        response = self.client.get(self.chunk_url(1))
+        self.assertContains(response, '/task/renamed/')
+
+    def test_bulk_create_and_delete_invalidate_chunk(self):
+        """Версию части меняют и операции без сигналов."""
+        self.client.get(self.chunk_url(1))
+        # Новая задача получает id после второй, то есть попадает в часть 1
+        Task.objects.bulk_create([
+            Task(title='Пакетная', text='Текст', slug='bulk')])
+        self.assertContains(self.client.get(self.chunk_url(1)), '/task/bulk/')
+        Task.objects.filter(slug='bulk').delete()
+        self.assertNotContains(self.client.get(self.chunk_url(1)), 'bulk')
+
+    def test_new_chunk_created_by_trigger(self):
+        Task.objects.create(id=3 * SITEMAP_CHUNK_SIZE, title='Третья',
+                            text='Текст', slug='third')
+        chunk = SitemapChunk.objects.get(number=3)
+        self.assertEqual(chunk.id_range,
+                         (3 * SITEMAP_CHUNK_SIZE, 4 * SITEMAP_CHUNK_SIZE))
+        self.assertLessEqual(chunk.changed, timezone.now())
+
+
+class TaskFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='user'))
+        Task.objects.create(title='Старая', text='Текст', slug='old')
+        Task.objects.create(title='Новая', text='Текст задачи', slug='new')
+
+    def test_feed_lists_recent_tasks(self):
+        response = self.client.get(reverse('deals:task_feed'))
+        self.assertEqual(response['Content-Type'],
+                         'application/atom+xml; charset=utf-8')
+        self.assertContains(response, '<entry>', count=2)
+        self.assertContains(response, '<title>Новая</title>')
+        self.assertContains(response, 'http://testserver/task/new/')
+
+    def test_anonymous_redirected_to_login(self):
+        """Заголовки и тексты задач анонимам не показываются."""
+        self.client.logout()
+        url = reverse('deals:task_feed')
+        response = self.client.get(url)
+        self.assertRedirects(response, f'/admin/login/?next={url}',
+                             fetch_redirect_response=False)
+
+    @override_settings(SITEMAP_PUBLIC=True)
+    def test_public_feed(self):
+        self.client.logout()
+        response = self.client.get(reverse('deals:task_feed'))
+        self.assertContains(response, '<entry>', count=2)
+
+    def test_feed_size(self):
+        with self.settings(TASK_FEED_SIZE=1):
+            response = self.client.get(reverse('deals:task_feed'))
+        self.assertContains(response, '<entry>', count=1)
+        self.assertNotContains(response, 'Старая')
+
+    def test_feed_cached_until_task_changes(self):
+        """Лента берётся из кеша, пока её задачи не изменились."""
+        self.client.get(reverse('deals:task_feed'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('deals:task_feed'))
+        Task.objects.filter(slug='new').update(title='Изменённая')
+        response = self.client.get(reverse('deals:task_feed'))
+        self.assertContains(response, '<title>Изменённая</title>')
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from deals.models import Task
+from todo.slowlog import normalize
+
+User = get_user_model()
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_values_removed(self):
+        """Запросы, различающиеся только значениями, совпадают."""
+        self.assertEqual(
+            normalize('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)\n'
+                      "  AND \"slug\" = 'it''s' LIMIT 21"),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND "slug" = ? LIMIT ?')
+        self.assertEqual(normalize('SELECT 1 WHERE "a" IN (%s)'),
+                         normalize('SELECT 2 WHERE "a" IN (%s, %s)'))
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        Task.objects.create(title='Задача', text='Текст', slug='task')
+        self.client = Client()
+        self.client.force_login(User.objects.create_user(username='user'))
+
+    def records(self):
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_slow_query_logged_with_plan(self):
+        with override_settings(SLOW_QUERY_LOG=self.path,
+                               SLOW_QUERY_THRESHOLD_MS=0,
+                               SLOW_QUERY_SAMPLE_RATE=1):
+            with self.assertLogs('todo.performance', 'WARNING'):
+                self.client.get(reverse('deals:task_detail', args=['task']))
+        slow = [record for record in self.records()
+                if record['type'] == 'slow' and 'deals_task' in record['sql']
+                and record.get('plan')]
+        self.assertTrue(slow)
+        record = slow[0]
+        self.assertEqual(record['view'], 'deals:task_detail')
+        self.assertTrue(record['location'].startswith('deals' + os.sep))
+        self.assertIn('"deals_task"."slug" = ?', record['sql'])
+        self.assertIn('SEARCH', ' '.join(record['plan']))
+        self.assertTrue(any(record['type'] == 'sample'
+                            for record in self.records()))
+
+        out = StringIO()
+        call_command('slow_query_report', self.path, plans=True, stdout=out)
+        self.assertIn(record['fingerprint'], out.getvalue())
+        self.assertIn('представление: deals:task_detail', out.getvalue())
+
+    def test_fast_queries_not_logged(self):
+        with override_settings(SLOW_QUERY_LOG=self.path,
+                               SLOW_QUERY_THRESHOLD_MS=10000,
+                               SLOW_QUERY_SAMPLE_RATE=0):
+            self.client.get(reverse('deals:task_detail', args=['task']))
+        self.assertEqual(self.records(), [])
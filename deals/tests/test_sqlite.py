@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+
+class SqlitePragmasTests(SimpleTestCase):
+    databases = {'default'}
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234,
+                                       'busy_timeout': 4321})
+    def test_pragmas_applied_to_new_connection(self):
+        """PRAGMA из настроек выполняются при открытии соединения."""
+        new_connection = connection.copy()
+        try:
+            self.assertEqual(self.pragma(new_connection, 'cache_size'), -1234)
+            self.assertEqual(
+                self.pragma(new_connection, 'busy_timeout'), 4321)
+        finally:
+            new_connection.close()
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_default_mode_keeps_sqlite_defaults(self):
+        """Без производственного режима PRAGMA не меняются."""
+        new_connection = connection.copy()
+        try:
+            self.assertNotEqual(
+                self.pragma(new_connection, 'cache_size'), -1234)
+        finally:
+            new_connection.close()
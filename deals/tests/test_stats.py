@@ -0,0 +1,77 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from deals import stats
+from deals.models import Task, TaskDailyStats, TaskStats
+
+User = get_user_model()
+
+
+class TaskStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='StasBasov')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_counters_follow_task_changes(self):
+        """Счётчики учитывают bulk_create, изменение картинки и удаление."""
+        Task.objects.bulk_create(
+            Task(title=f'Задача {i}', text='Текст', slug=f'task-{i}',
+                 image='tasks/cat.png' if i % 2 else '')
+            for i in range(4)
+        )
+        task = Task.objects.create(title='Ещё', text='Текст')
+        data = stats.get_stats()
+        self.assertEqual((data['total'], data['with_image']), (5, 2))
+        self.assertEqual(data['per_day'], [
+            {'day': timezone.now().date(), 'created': 5}])
+
+        Task.objects.filter(pk=task.pk).update(image='tasks/dog.png')
+        Task.objects.filter(slug__in=['task-0', 'task-1']).delete()
+        data = stats.get_stats()
+        self.assertEqual((data['total'], data['with_image']), (3, 2))
+        self.assertEqual(data['per_day'][0]['created'], 3)
+
+    def test_per_day_skips_old_rows(self):
+        """Дни без задач не сдвигают окно: старые дни не попадают
+        в последние days дней."""
+        today = timezone.now().date()
+        TaskDailyStats.objects.bulk_create(
+            TaskDailyStats(day=today - timedelta(days=ago), created=ago)
+            for ago in (1, 6, 7, 90)
+        )
+        self.assertEqual(
+            [row['created'] for row in stats.get_stats(days=7)['per_day']],
+            [1, 6])
+        self.assertEqual(stats.get_stats(days=0)['per_day'], [])
+
+    def test_read_in_one_query_per_table(self):
+        Task.objects.create(title='Задача', text='Текст')
+        with self.assertNumQueries(2):
+            stats.get_stats()
+
+    def test_rebuild_repairs_drift(self):
+        """Команда rebuild_task_stats исправляет разошедшиеся счётчики."""
+        Task.objects.create(title='Задача', text='Текст')
+        TaskStats.objects.update(total=100, with_image=7)
+        call_command('rebuild_task_stats', stdout=StringIO())
+        data = stats.get_stats()
+        self.assertEqual((data['total'], data['with_image']), (1, 0))
+
+    def test_pages(self):
+        Task.objects.create(title='Задача', text='Текст')
+        response = self.client.get(reverse('deals:task_stats'))
+        self.assertEqual(response.context['stats']['total'], 1)
+        response = self.client.get(reverse('deals:api_task_stats'))
+        data = response.json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['per_day'][0]['day'],
+                         timezone.now().date().isoformat())
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from deals import archive
+from deals.models import MediaBlob, Task
+from deals.storage import ContentAddressedStorage, is_content_addressed
+
+
+def run_on_commit(func):
+    # В TestCase транзакция не фиксируется, вызываем сразу
+    func()
+
+
+class StorageTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = Task._meta.get_field('image').storage
+
+    def create_task(self, slug, content=b'image'):
+        task = Task(title='Заголовок', text='Текст', slug=slug)
+        task.image.save('cat.png', ContentFile(content))
+        return task
+
+
+@mock.patch('deals.signals.transaction.on_commit', run_on_commit)
+@mock.patch('deals.signals.images.schedule', mock.Mock())
+class ContentAddressedStorageTests(StorageTestCase):
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        first = self.create_task('first')
+        with mock.patch.object(ContentAddressedStorage, '_write') as write:
+            second = self.create_task('second')
+        write.assert_not_called()
+        digest = hashlib.sha256(b'image').hexdigest()
+        self.assertEqual(first.image.name, f'tasks/{digest[:2]}/{digest}.png')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refs, 2)
+
+    def test_known_hash_not_recomputed(self):
+        """Хеш, посчитанный при загрузке, повторно не считается."""
+        content = ContentFile(b'image')
+        content.content_hash = hashlib.sha256(b'image').hexdigest()
+        with mock.patch('deals.storage.content_hash') as content_hash:
+            name = self.storage.save('tasks/cat.png', content)
+        content_hash.assert_not_called()
+        self.assertTrue(is_content_addressed(name))
+
+    def test_delete_keeps_referenced_file(self):
+        """Файл удаляется вместе с последней ссылающейся задачей."""
+        first = self.create_task('first')
+        self.create_task('second')
+        path = first.image.path
+        # Повторная загрузка отмечена, сбрасываем отметку
+        MediaBlob.objects.update(reused=None)
+        Task.objects.filter(slug='first').delete()
+        self.assertTrue(os.path.exists(path))
+        Task.objects.filter(slug='second').delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_reused_file_not_deleted(self):
+        """Недавно переиспользованный файл ждёт сохранения новой задачи."""
+        task = self.create_task('first')
+        MediaBlob.objects.update(refs=0, reused=timezone.now())
+        self.storage.delete(task.image.name)
+        self.assertTrue(os.path.exists(task.image.path))
+        with self.settings(TASK_MEDIA_REUSE_GRACE=0):
+            self.storage.delete(task.image.name)
+        self.assertFalse(os.path.exists(task.image.path))
+
+    def test_archive_keeps_references(self):
+        task = self.create_task('first')
+        archive.archive([task.id])
+        self.assertEqual(MediaBlob.objects.get(name=task.image.name).refs, 1)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+@mock.patch('deals.signals.images.schedule', mock.Mock())
+class DedupeTaskMediaTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.root, 'tasks', 'variants'))
+        files = {
+            'first.png': b'image',
+            'second.png': b'image',
+            'variants/first-320.jpg': b'thumb',
+            'orphan.png': b'image',
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.root, 'tasks', name), 'wb') as f:
+                f.write(content)
+        # Задачи со старыми именами файлов, как до хранилища по содержимому
+        Task.objects.create(title='Первая', text='Текст', slug='first')
+        Task.objects.create(title='Вторая', text='Текст', slug='second')
+        Task.objects.filter(slug='first').update(
+            image='tasks/first.png',
+            image_thumbnail='tasks/variants/first-320.jpg')
+        Task.objects.filter(slug='second').update(image='tasks/second.png')
+
+    def dedupe(self, *args):
+        out = StringIO()
+        call_command('dedupe_task_media', '--min-age=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dedupe(self):
+        output = self.dedupe()
+        first = Task.objects.get(slug='first')
+        second = Task.objects.get(slug='second')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+        self.assertTrue(first.image_thumbnail.name.startswith(
+            'tasks/variants/'))
+        self.assertEqual(first.image.read(), b'image')
+        for name in ('first.png', 'second.png', 'variants/first-320.jpg'):
+            self.assertFalse(
+                os.path.exists(os.path.join(self.root, 'tasks', name)))
+        # Файлы без ссылок оставлены для gc_task_media
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, 'tasks', 'orphan.png')))
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refs, 2)
+        self.assertIn('перенесено 3, из них дубликатов 1', output)
+        # Повторный запуск ничего не переносит
+        self.assertIn('перенесено 0', self.dedupe())
+
+    def test_process_local_cache_refused(self):
+        """Без общего кеша воркеры не узнают о переименовании файлов."""
+        with self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.assertRaisesMessage(CommandError, 'TODO_CACHE_DIR'):
+                self.dedupe()
+            self.assertIn('можно перенести 3', self.dedupe('--dry-run'))
+        self.assertEqual(Task.objects.get(slug='first').image.name,
+                         'tasks/first.png')
+
+    def test_dry_run(self):
+        output = self.dedupe('--dry-run')
+        self.assertIn('можно перенести 3, из них дубликатов 1', output)
+        self.assertEqual(Task.objects.get(slug='first').image.name,
+                         'tasks/first.png')
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, 'tasks', 'first.png')))
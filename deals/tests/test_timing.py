@@ -0,0 +1,66 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from deals.models import Task
+from todo.middleware import RequestMetrics
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='StasBasov')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing со всеми метриками."""
+        with self.assertLogs('todo.performance', 'INFO') as logs:
+            response = self.client.get(reverse('deals:task_list'))
+        header = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'mw;dur=', 'total;dur='):
+            self.assertIn(metric, header)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('deals:task_list'))
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_count'], 0)
+        self.assertNotIn('n_plus_one', record)
+
+    def test_template_rendered_in_view(self):
+        """Учитывается и шаблон, отрендеренный внутри представления."""
+        Task.objects.create(title='Заголовок', text='Текст', slug='task')
+        url = reverse('deals:task_detail', kwargs={'slug': 'task'})
+        with self.assertLogs('todo.performance', 'INFO') as logs:
+            self.client.get(url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['template_ms'], 0)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        """Выключенный middleware не добавляет заголовок."""
+        response = Client().get(reverse('static_pages:about'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RequestMetricsTests(TestCase):
+    def test_repeated_queries_reported(self):
+        """Повторы одинакового SQL попадают в подозрения на N+1."""
+        Task.objects.create(title='Заголовок', text='Текст')
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            for _ in range(3):
+                list(Task.objects.filter(title='Заголовок'))
+            Task.objects.count()
+        self.assertEqual(metrics.sql_count, 4)
+        suspicious = metrics.suspicious(threshold=10)
+        self.assertEqual(len(suspicious), 1)
+        self.assertEqual(list(suspicious.values()), [3])
+        self.assertEqual(metrics.suspicious(threshold=3),
+                         metrics.suspicious(threshold=10))
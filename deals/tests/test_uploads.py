@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from deals.models import Task
+
+
+def image_file(size=(40, 30), image_format='PNG', name='picture.png'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        self.upload_dir = upload_dir
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, FILE_UPLOAD_TEMP_DIR=upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def post(self, image):
+        return self.client.post(reverse('deals:home'), {
+            'title': 'Задача', 'text': 'Текст', 'image': image})
+
+    def test_valid_image_is_not_decoded(self):
+        """Картинка проверяется по заголовку, без декодирования."""
+        with mock.patch.object(ImageFile.ImageFile, 'load',
+                               side_effect=AssertionError):
+            response = self.post(image_file())
+        self.assertRedirects(response, reverse('deals:task_added'))
+        task = Task.objects.get()
+        self.assertRegex(task.image.name,
+                         r'^tasks/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        # Временный файл перенесён в MEDIA_ROOT
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_not_an_image(self):
+        response = self.post(
+            SimpleUploadedFile('picture.png', b'not an image' * 100))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите правильное изображение. Файл, который вы загрузили, '
+            'поврежден или не является изображением.')
+        self.assertFalse(Task.objects.exists())
+
+    def test_corrupt_body_rejected(self):
+        """Правильный заголовок с испорченным телом не принимается."""
+        content = image_file().read()
+        # Портим данные в середине: заголовок и размеры остаются верными
+        middle = len(content) // 2
+        corrupt = content[:middle] + b'\0' * 16 + content[middle + 16:]
+        response = self.post(SimpleUploadedFile('picture.png', corrupt))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите правильное изображение. Файл, который вы загрузили, '
+            'поврежден или не является изображением.')
+        truncated = content[:middle]
+        response = self.post(SimpleUploadedFile('picture.png', truncated))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Task.objects.exists())
+
+    def test_unsupported_format(self):
+        response = self.post(image_file(image_format='BMP', name='x.bmp'))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите правильное изображение. Файл, который вы загрузили, '
+            'поврежден или не является изображением.')
+
+    @override_settings(TASK_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels(self):
+        response = self.post(image_file(size=(200, 100)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка 200×100 слишком большая, допустимо не больше '
+            '10000 пикселей')
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    @override_settings(TASK_IMAGE_MAX_SIZE=1024)
+    def test_too_large_file(self):
+        image = image_file()
+        image.file.write(b'\0' * 2048)
+        image.file.seek(0)
+        response = self.post(image)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Файл слишком большой, допустимо не больше 1,0\xa0КБ')
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    @override_settings(TASK_IMAGE_MAX_SIZE=1024,
+                       DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_too_large_request(self):
+        """Заведомо большой запрос отклоняется до чтения тела."""
+        image = SimpleUploadedFile('x.png', b'\0' * 4096)
+        self.assertEqual(self.post(image).status_code, 400)
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from deals.models import Task
@@ -19,6 +20,8 @@ class TaskURLTests(TestCase):
         )
 
     def setUp(self):
+        # Страницы задач кешируются, каждый тест начинаем с пустого кеша
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент
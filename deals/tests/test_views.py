@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
 
 from deals.models import Task
+from deals.views import TaskList
 
 User = get_user_model()
 
@@ -19,6 +21,8 @@ class TaskPagesTests(TestCase):
         )
 
     def setUp(self):
+        # Страницы задач кешируются, каждый тест начинаем с пустого кеша
+        cache.clear()
         # Создаём неавторизованный клиент
         self.guest_client = Client()
         # Создаём авторизованный клиент
@@ -106,3 +110,69 @@ class TaskPagesTests(TestCase):
         response = self.guest_client.get(reverse('deals:home'))
         title_inital = response.context['form'].fields['title'].initial
         self.assertEqual(title_inital, 'Значение по-умолчанию')
+
+
+class TaskListPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Создаём задач на две с половиной страницы
+        cls.page_size = TaskList.paginate_by
+        Task.objects.bulk_create(
+            Task(title=f'Задача {i}', text='Текст', slug=f'task-{i}')
+            for i in range(cls.page_size * 2 + 5)
+        )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_first_page_contains_newest_tasks(self):
+        """На первой странице самые новые задачи и ссылка вперёд."""
+        response = self.authorized_client.get(reverse('deals:task_list'))
+        page = response.context['page_obj']
+        object_list = list(response.context['object_list'])
+        self.assertEqual(len(object_list), self.page_size)
+        self.assertEqual(object_list[0], Task.objects.latest('id'))
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertContains(response, f'?after={page.next_cursor}')
+
+    def test_cursors_walk_through_all_tasks(self):
+        """По курсорам вперёд и назад обходятся все задачи без повторов."""
+        url = reverse('deals:task_list')
+        seen = []
+        response = self.authorized_client.get(url)
+        pages = [list(response.context['object_list'])]
+        while response.context['page_obj'].has_next():
+            cursor = response.context['page_obj'].next_cursor
+            response = self.authorized_client.get(url, {'after': cursor})
+            pages.append(list(response.context['object_list']))
+        for page in pages:
+            seen.extend(page)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(
+            [task.id for task in seen],
+            list(Task.objects.order_by('-id').values_list('id', flat=True))
+        )
+        cursor = response.context['page_obj'].previous_cursor
+        response = self.authorized_client.get(url, {'before': cursor})
+        self.assertEqual(list(response.context['object_list']), pages[1])
+
+    def test_page_does_not_load_text(self):
+        """Список не читает поле text и не зависит от номера страницы."""
+        url = reverse('deals:task_list')
+        response = self.authorized_client.get(url)
+        task = response.context['object_list'][0]
+        self.assertIn('text', task.get_deferred_fields())
+        cursor = response.context['page_obj'].next_cursor
+        # Окно id и сами записи; сессия и пользователь берутся из кеша
+        with self.assertNumQueries(2):
+            self.authorized_client.get(url, {'after': cursor})
+
+    def test_invalid_cursor_returns_404(self):
+        """Некорректный курсор приводит к ошибке 404."""
+        response = self.authorized_client.get(
+            reverse('deals:task_list'), {'after': 'abc'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,136 @@
+"""Потоковая загрузка картинок задач.
+
+ImageUploadHandler пишет файл на диск кусками по chunk_size и держит в
+памяти только начало файла (не больше TASK_UPLOAD_HEADER_BYTES): по нему
+Pillow определяет формат и размеры, не декодируя картинку. Поэтому один
+запрос занимает в памяти воркера не больше chunk_size плюс
+TASK_UPLOAD_HEADER_BYTES, сколько бы весил файл. Заодно считается хеш
+содержимого для хранилища по содержимому (см. storage.py).
+
+Файл больше TASK_IMAGE_MAX_SIZE, неизвестного формата или больше
+TASK_IMAGE_MAX_PIXELS пикселей дальше не записывается: оставшиеся куски
+читаются и отбрасываются, а в форму вместо файла попадает RejectedUpload
+с текстом ошибки. Запрос, который заведомо больше допустимого, отклоняется
+по заголовку Content-Length, до чтения тела.
+"""
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile,
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .storage import new_hash
+
+
+def check_image(image_format, size):
+    """Возвращает текст ошибки, если картинку принимать нельзя."""
+    if image_format not in settings.TASK_IMAGE_FORMATS:
+        return 'Загрузите картинку в формате JPEG, PNG, GIF или WEBP'
+    width, height = size
+    if width * height > settings.TASK_IMAGE_MAX_PIXELS:
+        return (f'Картинка {width}×{height} слишком большая, допустимо '
+                f'не больше {settings.TASK_IMAGE_MAX_PIXELS} пикселей')
+    return None
+
+
+def read_header(data):
+    """Возвращает формат и размеры картинки по началу файла.
+
+    Image.open() читает только заголовок. Если данных для него пока
+    мало или это не картинка, возвращает None. Для картинок больше
+    2 * Image.MAX_IMAGE_PIXELS Pillow сам бросает DecompressionBombError.
+    """
+    try:
+        with Image.open(BytesIO(data),
+                        formats=settings.TASK_IMAGE_FORMATS) as image:
+            return image.format, image.size
+    except OSError:
+        return None
+
+
+class RejectedUpload(UploadedFile):
+    """Отклонённый файл: содержимого нет, есть только текст ошибки."""
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.upload_error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    chunk_size = 64 * 1024
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if limit is not None and content_length and (
+                content_length > settings.TASK_IMAGE_MAX_SIZE + limit):
+            # Запрос больше картинки и всех полей формы вместе взятых
+            raise RequestDataTooBig('Слишком большой запрос')
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra)
+        self.header = b''
+        self.image_format = None
+        self.error = None
+        self.hash = new_hash()
+
+    def reject(self, error):
+        self.error = error
+        self.header = b''
+        # Закрытие удаляет временный файл
+        self.file.close()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        if start + len(raw_data) > settings.TASK_IMAGE_MAX_SIZE:
+            max_size = filesizeformat(settings.TASK_IMAGE_MAX_SIZE)
+            self.reject(f'Файл слишком большой, допустимо не больше '
+                        f'{max_size}')
+            return None
+        self.file.write(raw_data)
+        self.hash.update(raw_data)
+        if self.image_format is None:
+            self.check_header(raw_data, final=False)
+        return None
+
+    def check_header(self, raw_data, final):
+        self.header += raw_data[:settings.TASK_UPLOAD_HEADER_BYTES
+                                - len(self.header)]
+        try:
+            header = read_header(self.header)
+        except Image.DecompressionBombError:
+            self.reject(f'Картинка слишком большая, допустимо не больше '
+                        f'{settings.TASK_IMAGE_MAX_PIXELS} пикселей')
+            return
+        if header is None:
+            if final or len(self.header) >= settings.TASK_UPLOAD_HEADER_BYTES:
+                self.reject(
+                    forms.ImageField.default_error_messages['invalid_image'])
+            return
+        error = check_image(*header)
+        if error:
+            self.reject(error)
+            return
+        self.image_format, self.image_size = header
+        self.header = b''
+
+    def file_complete(self, file_size):
+        if self.image_format is None and not self.error:
+            self.check_header(b'', final=True)
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.image_format = self.image_format
+        self.file.image_size = self.image_size
+        self.file.content_hash = self.hash.hexdigest()
+        return self.file
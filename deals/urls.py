@@ -1,12 +1,27 @@
 from django.urls import path
 
-from .views import Home, TaskAddSuccess, TaskDetail, TaskList
+from .api import TaskDetailApi, TaskListApi, TaskStatsApi
+from .feeds import TaskFeed
+from .sitemaps import SitemapChunkView, SitemapIndex
+from .views import (Home, TaskAddSuccess, TaskDetail, TaskExport, TaskList,
+                    TaskSearch, TaskStatsView)
 
 app_name = 'deals'
 
 urlpatterns = [
     path('', Home.as_view(), name='home'),
     path('task/', TaskList.as_view(), name='task_list'),
+    path('search/', TaskSearch.as_view(), name='task_search'),
+    path('export/', TaskExport.as_view(), name='task_export'),
+    path('stats/', TaskStatsView.as_view(), name='task_stats'),
     path('task/<slug:slug>/', TaskDetail.as_view(), name='task_detail'),
     path('added/', TaskAddSuccess.as_view(), name='task_added'),
+    path('api/tasks/', TaskListApi.as_view(), name='api_task_list'),
+    path('api/tasks/<slug:slug>/', TaskDetailApi.as_view(),
+         name='api_task_detail'),
+    path('api/stats/', TaskStatsApi.as_view(), name='api_task_stats'),
+    path('sitemap.xml', SitemapIndex.as_view(), name='sitemap'),
+    path('sitemap-<int:number>.xml', SitemapChunkView.as_view(),
+         name='sitemap_chunk'),
+    path('feed/', TaskFeed(), name='task_feed'),
 ]
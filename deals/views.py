@@ -1,34 +1,195 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, router
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
-from django.views.generic import DetailView, ListView, TemplateView
+from django.views.generic import DetailView, ListView, TemplateView, View
 from django.views.generic.edit import CreateView
 
+from todo.pagecache import AnonymousPageCacheMixin
+from todo.routers import ReplicaReadMixin
+
+from . import cache, export, ingest, stats
 from .forms import TaskCreateForm
-from .models import Task
+from .models import ArchivedTask, Task, conflict_savepoint
+from .paginators import KeysetPaginator
+from .search import search_tasks
 
 
-class Home(CreateView):
+class Home(AnonymousPageCacheMixin, CreateView):
     """Форма добавления задания."""
+    page_cache_csrf = True
     template_name = 'deals/home.html'
     form_class = TaskCreateForm
     success_url = reverse_lazy('deals:task_added')
 
+    def form_valid(self, form):
+        if ingest.enabled():
+            return self.enqueue(form)
+        # Указанный вручную адрес могли занять между проверкой в форме
+        # и сохранением: вместо ошибки 500 показываем ошибку формы
+        try:
+            with conflict_savepoint(router.db_for_write(Task)):
+                self.object = form.save()
+        except IntegrityError:
+            form.add_error('slug', form.slug_taken_error(form.instance.slug))
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def enqueue(self, form):
+        """Ставит задачу в очередь на запись вместо сохранения в БД."""
+        task = form.instance
+        if task.image and not task.image._committed:
+            # Файл сохраняем сразу, в очередь попадает только его имя
+            task.image.save(task.image.name, task.image.file, save=False)
+        ingest.enqueue({
+            'title': task.title,
+            'text': task.text,
+            'slug': task.slug,
+            'image': task.image.name or '',
+        })
+        # get_success_url() подставляет поля self.object, а его ещё нет
+        return HttpResponseRedirect(self.success_url)
+
 
-class TaskList(LoginRequiredMixin, ListView):
+class TaskList(ReplicaReadMixin, LoginRequiredMixin, ListView):
     """Список всех доступных заданий."""
     login_url = '/admin/login/'
     model = Task
     template_name = 'deals/task_list.html'
+    paginate_by = 50
+    paginator_class = KeysetPaginator
+
+    def get_queryset(self):
+        # Шаблону нужны только title и slug, тяжёлое поле text не читаем
+        return Task.objects.only('id', 'title', 'slug')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return self.paginator_class(queryset, per_page)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Выбирает страницу по курсорам ?after=<id> и ?before=<id>."""
+        paginator = self.get_paginator(queryset, page_size)
+        cursors = {}
+        for name in ('after', 'before'):
+            value = self.request.GET.get(name)
+            if value is None:
+                continue
+            try:
+                cursors[name] = int(value)
+            except ValueError:
+                raise Http404(f'Некорректный курсор: {value}')
+        try:
+            page = paginator.page(**cursors)
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class TaskExport(ReplicaReadMixin, LoginRequiredMixin, View):
+    """Выгрузка всех заданий в NDJSON или CSV.
+
+    ?format=ndjson|csv, ?after=<id> — выгрузить только задания с большим id.
+    """
+    login_url = '/admin/login/'
 
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', 'ndjson')
+        if file_format not in export.FORMATS:
+            raise Http404(f'Неизвестный формат: {file_format}')
+        try:
+            after = int(request.GET.get('after', 0))
+        except ValueError:
+            raise Http404('Некорректный курсор')
+        stream, content_type = export.FORMATS[file_format]
+        # Поток читается уже после выхода из dispatch(), поэтому базу
+        # выбираем сейчас
+        using = router.db_for_read(Task)
+        response = StreamingHttpResponse(
+            stream(after, using), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="tasks.{file_format}"')
+        return response
 
 
-class TaskDetail(LoginRequiredMixin, DetailView):
+class TaskSearch(ReplicaReadMixin, LoginRequiredMixin, TemplateView):
+    """Полнотекстовый поиск по заголовкам и текстам заданий."""
+    login_url = '/admin/login/'
+    template_name = 'deals/task_search.html'
+    paginate_by = 20
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        try:
+            page_number = int(self.request.GET.get('page', 1))
+        except ValueError:
+            raise Http404('Некорректный номер страницы')
+        if page_number < 1:
+            raise Http404('Некорректный номер страницы')
+        # Берём на одну запись больше, чтобы узнать, есть ли следующая
+        # страница, не считая все совпадения
+        results = search_tasks(
+            query,
+            self.paginate_by + 1,
+            (page_number - 1) * self.paginate_by,
+        )
+        context.update({
+            'query': query,
+            'object_list': results[:self.paginate_by],
+            'page_number': page_number,
+            'has_next': len(results) > self.paginate_by,
+        })
+        return context
+
+
+class TaskDetail(ReplicaReadMixin, LoginRequiredMixin, DetailView):
     """Задание подробно."""
     login_url = '/admin/login/'
     model = Task
     template_name = 'deals/task_detail.html'
+    # Архивная задача выводится тем же шаблоном
+    context_object_name = 'task'
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # Старые задачи перенесены в архив командой archive_tasks
+            return get_object_or_404(
+                ArchivedTask, slug=self.kwargs[self.slug_url_kwarg])
+
+    def get(self, request, *args, **kwargs):
+        """Отдаёт страницу из кеша, при промахе рендерит и кеширует её."""
+        slug = kwargs[self.slug_url_kwarg]
+        version = cache.get_version(slug)
+        content = cache.get_detail(slug, version)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        # Реплика могла отстать от основной базы: такая страница
+        # хранится в кеше недолго
+        timeout = (None if self.object._state.db == DEFAULT_DB_ALIAS
+                   else settings.REPLICA_PIN_SECONDS)
+        cache.set_detail(slug, version, response.content, timeout)
+        return response
+
+
+class TaskStatsView(ReplicaReadMixin, LoginRequiredMixin, TemplateView):
+    """Статистика заданий."""
+    login_url = '/admin/login/'
+    template_name = 'deals/task_stats.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['stats'] = stats.get_stats()
+        return context
 
 
-class TaskAddSuccess(TemplateView):
+class TaskAddSuccess(AnonymousPageCacheMixin, TemplateView):
     """Задание успешно добавлено."""
     template_name = 'deals/added.html'
@@ -1,8 +1,11 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 
 class StaticURLTests(TestCase):
     def setUp(self):
+        # Страница кешируется, каждый тест начинаем с пустого кеша
+        cache.clear()
         self.guest_client = Client()
 
     def test_about_url_exists_at_desired_location(self):
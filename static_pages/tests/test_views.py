@@ -1,9 +1,12 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
 
 class StaticViewsTests(TestCase):
     def setUp(self):
+        # Страница кешируется, каждый тест начинаем с пустого кеша
+        cache.clear()
         self.guest_client = Client()
 
     def test_about_page_accessible_by_name(self):
@@ -1,5 +1,7 @@
 from django.views.generic.base import TemplateView
 
+from todo.pagecache import AnonymousPageCacheMixin
 
-class About(TemplateView):
+
+class About(AnonymousPageCacheMixin, TemplateView):
     template_name = 'static_pages/about.html'
@@ -0,0 +1,82 @@
+"""Кеш пользователей для проверки входа на каждом запросе.
+
+AuthenticationMiddleware на каждом запросе читает пользователя из
+auth_user. ModelBackend с кешем в памяти процесса избавляет от этого
+запроса. Запись сбрасывается при сохранении и удалении пользователя
+(в том числе при смене пароля) и при выходе. Другие процессы узнают
+об изменениях не позже чем через USER_CACHE_TIMEOUT секунд.
+"""
+import copy
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+class UserCache:
+    """LRU-кеш пользователей по id с ограниченным временем жизни."""
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._users = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        # Каждый запрос получает свою копию: объект могут менять
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._users[user_id] = (copy.copy(user),
+                                    monotonic() + self.timeout)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TIMEOUT)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.set(user_id, user)
+        return user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user(sender, instance, **kwargs):
+    user_cache.delete(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        user_cache.delete(user.pk)
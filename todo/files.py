@@ -0,0 +1,190 @@
+"""Отдача статики и загруженных картинок без DEBUG.
+
+Картинки задач можно передать веб-серверу через X-Sendfile или
+X-Accel-Redirect (настройка MEDIA_SENDFILE), тогда Python файл не читает.
+Иначе файл отдаётся потоком с поддержкой Range и условных запросов.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from deals.storage import is_content_addressed
+
+CHUNK_SIZE = 64 * 1024
+# ManifestStaticFilesStorage добавляет к имени 12 знаков md5
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _stat(root, path):
+    try:
+        fullpath = safe_join(root, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+    return fullpath, stat
+
+
+def parse_range(header, size):
+    """Возвращает (начало, конец) из заголовка Range или None.
+
+    Поддерживается только один диапазон: за несколькими сразу браузеры
+    к картинкам не обращаются, и такой запрос получает файл целиком.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # bytes=-500: последние 500 байт
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _iter_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _range_allowed(request, etag, last_modified):
+    """If-Range: диапазон отдаётся, только если файл не изменился."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def file_response(request, fullpath, stat, cache_control, sendfile=None,
+                  accel_path=None, encoding=None):
+    """Ответ с файлом с учётом условных запросов и Range."""
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    # Для name.css.gz это тип исходного файла, а gzip — его кодировка
+    content_type = mimetypes.guess_type(fullpath)[0]
+    content_type = content_type or 'application/octet-stream'
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        response = not_modified
+    elif sendfile == 'x-sendfile':
+        # Range и содержимое обрабатывает веб-сервер
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+    elif sendfile == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(accel_path)
+    else:
+        range_allowed = _range_allowed(request, etag, last_modified)
+        response = _stream(request, fullpath, stat.st_size, content_type,
+                           encoding, range_allowed)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _stream(request, fullpath, size, content_type, encoding, range_allowed):
+    header = request.META.get('HTTP_RANGE')
+    byte_range = None
+    # Диапазоны сжатой копии не совпадают с диапазонами исходного файла
+    if header and range_allowed and encoding is None:
+        try:
+            byte_range = parse_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'),
+                                content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(fullpath, start, end),
+            status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    if encoding:
+        response['Content-Encoding'] = encoding
+    else:
+        response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Картинки задач и их уменьшенные копии из MEDIA_ROOT."""
+    fullpath, stat = _stat(settings.MEDIA_ROOT, path)
+    if is_content_addressed(path):
+        # Имя задаёт содержимое: по этому адресу файл не изменится
+        cache_control = (f'public, max-age={settings.STATIC_CACHE_MAX_AGE}, '
+                         'immutable')
+    else:
+        cache_control = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return file_response(
+        request, fullpath, stat,
+        cache_control=cache_control,
+        sendfile=settings.MEDIA_SENDFILE,
+        accel_path=settings.MEDIA_ACCEL_PREFIX + path,
+    )
+
+
+@require_safe
+def serve_static(request, path):
+    """Собранная collectstatic статика из STATIC_ROOT.
+
+    Файлы с хешем в имени кешируются на год, для текстовых файлов
+    отдаётся заранее сжатая копия name.gz.
+    """
+    fullpath, stat = _stat(settings.STATIC_ROOT, path)
+    if HASHED_NAME_RE.search(path):
+        cache_control = (f'public, max-age={settings.STATIC_CACHE_MAX_AGE}, '
+                         'immutable')
+    else:
+        cache_control = 'public, no-cache'
+    encoding = None
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        try:
+            compressed = os.stat(fullpath + '.gz')
+        except OSError:
+            pass
+        else:
+            encoding = 'gzip'
+    if encoding:
+        response = file_response(request, fullpath + '.gz', compressed,
+                                 cache_control, encoding=encoding)
+    else:
+        response = file_response(request, fullpath, stat, cache_control)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
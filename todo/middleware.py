@@ -0,0 +1,148 @@
+"""Замер времени обработки запросов.
+
+Включается настройкой REQUEST_TIMING. Выключенный middleware Django
+убирает из цепочки при старте (MiddlewareNotUsed), поэтому накладных
+расходов на запрос нет.
+
+Время шаблонов считает бэкенд TimedDjangoTemplates, подключённый
+в TEMPLATES: шаблон может рендериться и внутри представления
+(TaskDetail, кеш страниц), а не только в TemplateResponse.
+"""
+import json
+import logging
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('todo.performance')
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    """Время SQL-запросов, рендеринга шаблонов и запросы для поиска N+1."""
+    def __init__(self):
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        # Шаблон, отрендеренный внутри другого, уже учтён во внешнем
+        self.rendering = False
+        self.statements = Counter()
+        self.duplicates = Counter()
+
+    @property
+    def sql_count(self):
+        return sum(self.statements.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка для connection.execute_wrapper()
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - started
+            self.statements[sql] += 1
+            self.duplicates[(sql, repr(params))] += 1
+
+    def suspicious(self, threshold):
+        """Запросы, похожие на N+1: одинаковый SQL повторяется часто
+        или один и тот же запрос выполняется повторно с теми же
+        параметрами."""
+        similar = {sql: count for sql, count in self.statements.items()
+                   if count >= threshold}
+        for (sql, _), count in self.duplicates.items():
+            if count > 1:
+                similar.setdefault(sql, self.statements[sql])
+        return similar
+
+
+class TimedTemplate(Template):
+    """Шаблон, время рендеринга которого идёт в замер текущего запроса.
+
+    {% include %} рендерит шаблон движка напрямую, поэтому вложенные
+    шаблоны учитываются во времени внешнего.
+    """
+    def render(self, context=None, request=None):
+        metrics = getattr(_state, 'metrics', None)
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.rendering = False
+            metrics.template_time += perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, отдающий TimedTemplate. Вне запроса с замером
+    шаблоны рендерятся как обычно."""
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template,
+                             self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
+
+
+class RequestTimingMiddleware:
+    """Добавляет к ответу заголовок Server-Timing и пишет строку в журнал.
+
+    Подключается первым в MIDDLEWARE, чтобы общее время включало
+    остальные middleware.
+    """
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        metrics = _state.metrics = RequestMetrics()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = perf_counter() - started
+        view_started = getattr(request, '_timing_view_started', started)
+        middleware = view_started - started
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={metrics.sql_time * 1000:.1f};'
+            f'desc="{metrics.sql_count} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'mw;dur={middleware * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        suspicious = metrics.suspicious(
+            settings.REQUEST_TIMING_NPLUSONE_THRESHOLD)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'middleware_ms': round(middleware * 1000, 2),
+            'sql_ms': round(metrics.sql_time * 1000, 2),
+            'sql_count': metrics.sql_count,
+            'template_ms': round(metrics.template_time * 1000, 2),
+        }
+        if suspicious:
+            record['n_plus_one'] = suspicious
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Всё, что было до этого момента, — middleware на пути запроса
+        request._timing_view_started = perf_counter()
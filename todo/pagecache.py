@@ -0,0 +1,95 @@
+"""Кеш целых страниц для анонимных посетителей.
+
+Страницы, одинаковые для всех анонимных посетителей, хранятся в кеше
+готовыми байтами и отдаются без рендеринга шаблона. Клиенты с cookie
+сессии и запросы с параметрами обходят кеш.
+
+CSRF-токен у каждого посетителя свой, поэтому страница с формой
+рендерится с меткой на месте токена, а метка заменяется токеном клиента
+при каждой отдаче. Метка у каждого процесса своя и хранится в кеше
+вместе со страницей: общий кеш читают и процессы, не знающие чужой
+метки. Такая страница помечается private, её нельзя класть в общие
+кеши прокси.
+
+Ключи включают версию выкладки PAGE_CACHE_VERSION (TODO_DEPLOY_VERSION):
+после выкладки старые страницы перестают читаться.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+
+# Подставляется в шаблон вместо CSRF-токена при рендеринге для кеша
+CSRF_PLACEHOLDER = 'csrf-placeholder-' + uuid.uuid4().hex
+# Без заданной версии выкладки кеш страниц сбрасывается при каждом
+# запуске процесса
+_startup_version = uuid.uuid4().hex
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def get_version():
+    return settings.PAGE_CACHE_VERSION or _startup_version
+
+
+def cacheable(request):
+    """Запрос анонимного посетителя без параметров."""
+    return (request.method in ('GET', 'HEAD')
+            and not request.GET
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def _key(request):
+    return f'pagecache:{request.path}'
+
+
+class AnonymousPageCacheMixin:
+    """Отдаёт анонимным посетителям страницу из кеша.
+
+    Если шаблон выводит {% csrf_token %}, задайте page_cache_csrf = True.
+    """
+    page_cache_csrf = False
+    _page_cache_render = False
+
+    def dispatch(self, request, *args, **kwargs):
+        if not cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_cache()
+        key = _key(request)
+        entry = cache.get(key, version=get_version())
+        if entry is None:
+            self._page_cache_render = True
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.render()
+            entry = (CSRF_PLACEHOLDER, response.content)
+            cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT,
+                      version=get_version())
+        placeholder, content = entry
+        return self.cached_response(request, content, placeholder)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self._page_cache_render and self.page_cache_csrf:
+            # Переменная контекста перекрывает context processor csrf
+            context['csrf_token'] = CSRF_PLACEHOLDER
+        return context
+
+    def cached_response(self, request, content, placeholder):
+        if not self.page_cache_csrf:
+            response = HttpResponse(content)
+            patch_cache_control(
+                response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+            return response
+        # get_token() выставляет клиенту cookie с секретом, а
+        # CsrfViewMiddleware добавит к ответу Vary: Cookie
+        response = HttpResponse(content.replace(
+            placeholder.encode(), get_token(request).encode()))
+        patch_cache_control(response, private=True, max_age=0)
+        return response
@@ -0,0 +1,90 @@
+"""Чтение задач с реплик базы данных.
+
+С реплик читают только представления, явно включившие это через
+ReplicaReadMixin, и только модели приложения deals: сессии,
+пользователи и админка всегда работают с основной базой.
+
+Реплика отстаёт от основной базы, поэтому клиент, только что что-то
+записавший, REPLICA_PIN_SECONDS читает из основной базы (cookie
+выставляет ReplicaPinMiddleware) и сразу видит свою запись.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'read_primary'
+REPLICA_APPS = {'deals'}
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads():
+    """Внутри блока чтения моделей deals идут на реплики."""
+    previous = getattr(_state, 'replica', False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def pinned():
+    return getattr(_state, 'pinned', False)
+
+
+class ReplicaReadMixin:
+    """Представление читает задачи с реплики, если клиент не закреплён
+    за основной базой."""
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (settings.DATABASE_REPLICAS and getattr(_state, 'replica', False)
+                and not pinned()
+                and model._meta.app_label in REPLICA_APPS):
+            return random.choice(list(settings.DATABASE_REPLICAS))
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'sessions':
+            # Сохранение сессии — не запись данных, которые клиент
+            # захочет сразу прочитать
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет за основной базой клиента, который только что писал."""
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax')
+            return response
+        finally:
+            _state.pinned = _state.wrote = False
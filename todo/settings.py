@@ -32,10 +32,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'static_pages',
-    'deals',
+    'deals.apps.DealsConfig',
 ]
 
 MIDDLEWARE = [
+    # Должен быть первым: меряет время всей цепочки (см. REQUEST_TIMING)
+    'todo.middleware.RequestTimingMiddleware',
+    'todo.slowlog.SlowQueryMiddleware',
+    'todo.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,14 +49,38 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Заголовок Server-Timing и журнал todo.performance с временем SQL,
+# шаблонов и middleware для каждого запроса: TODO_REQUEST_TIMING=1
+REQUEST_TIMING = os.environ.get('TODO_REQUEST_TIMING') == '1'
+# С какого числа повторов одинакового SQL запрос считается N+1
+REQUEST_TIMING_NPLUSONE_THRESHOLD = 5
+
+# Журнал медленных SQL-запросов с планами выполнения (см. todo/slowlog.py):
+# TODO_SLOW_QUERY_LOG=/var/log/todo/slow-queries.jsonl, сводка —
+# manage.py slow_query_report
+SLOW_QUERY_LOG = os.environ.get('TODO_SLOW_QUERY_LOG') or None
+SLOW_QUERY_THRESHOLD_MS = 100
+# Доля всех запросов, по которой оценивается их суммарное время
+SLOW_QUERY_SAMPLE_RATE = 0.01
+
 ROOT_URLCONF = 'todo.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, время которого учитывает RequestTimingMiddleware
+        'BACKEND': 'todo.middleware.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates'), ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # В отладке шаблоны перечитываются с диска при каждом запросе,
+            # в бою компилируются один раз (см. todo/warmup.py)
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -64,15 +92,129 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'todo.wsgi.application'
+# Прогрев процесса перед приёмом запросов: TODO_WSGI_WARMUP=0 отключает
+WSGI_WARMUP = os.environ.get('TODO_WSGI_WARMUP', '1') == '1'
+# Тяжёлые модули, которые иначе импортируются при первом запросе
+WARMUP_MODULES = [
+    'pytils.translit',
+    'PIL.Image',
+    'deals.images',
+    'deals.search',
+    'deals.export',
+    'deals.api',
+]
 
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'TODO_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
     }
 }
 
+# Производственный режим SQLite включается переменной окружения
+# TODO_SQLITE_PRODUCTION=1: соединения переиспользуются между запросами,
+# а при открытии соединения выполняются PRAGMA из SQLITE_PRAGMAS
+# (см. deals/signals.py). WAL позволяет читать во время записи,
+# а busy_timeout заставляет писателей ждать вместо "database is locked"
+SQLITE_PRODUCTION = os.environ.get('TODO_SQLITE_PRODUCTION') == '1'
+if SQLITE_PRODUCTION:
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    SQLITE_PRAGMAS = {
+        # Первым, чтобы и остальные PRAGMA ждали освобождения базы
+        'busy_timeout': 20000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # Отрицательное значение — размер в КиБ
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+else:
+    SQLITE_PRAGMAS = {}
+
+# Реплики только для чтения: TODO_REPLICA_DB_PATHS=/a.sqlite3,/b.sqlite3.
+# Для проверки локально копию основной базы делает команда
+# sync_sqlite_replica. С реплик читают список, страница, поиск, выгрузка
+# и API задач (см. todo/routers.py)
+DATABASE_REPLICAS = {}
+for number, path in enumerate(
+        filter(None, os.environ.get('TODO_REPLICA_DB_PATHS', '').split(',')),
+        start=1):
+    DATABASE_REPLICAS[f'replica{number}'] = path
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Реплика открывается только для чтения
+        'NAME': f'file:{path}?mode=ro',
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['todo.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает только из основной базы
+REPLICA_PIN_SECONDS = 10
+
+# Cache
+# По умолчанию кеш хранится в памяти процесса; чтобы воркеры делили
+# общий кеш, укажите каталог в переменной окружения TODO_CACHE_DIR
+if os.environ.get('TODO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['TODO_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'todo',
+        }
+    }
+
+# Кеш отрендеренных страниц задач. Версию страницы сбрасывает процесс,
+# изменивший задачу; кеш в памяти другие воркеры, команды и админка не
+# видят, поэтому без TODO_CACHE_DIR страница хранится всего минуту
+TASK_DETAIL_CACHE_ALIAS = 'default'
+if os.environ.get('TODO_CACHE_DIR'):
+    TASK_DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+else:
+    TASK_DETAIL_CACHE_TIMEOUT = 60
+
+# Кеш страниц для анонимных посетителей (см. todo/pagecache.py).
+# TODO_DEPLOY_VERSION задаётся при выкладке, например хешем коммита:
+# новая версия делает недействительными все страницы прежней
+PAGE_CACHE_ALIAS = 'default'
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Сколько браузеры и прокси могут хранить страницы без CSRF-токена
+PAGE_CACHE_MAX_AGE = 10 * 60
+PAGE_CACHE_VERSION = os.environ.get('TODO_DEPLOY_VERSION', '')
+
+# Открыть карту сайта и Atom-ленту задач без входа, для поисковиков и
+# читалок лент: TODO_SITEMAP_PUBLIC=1. По умолчанию они закрыты, как и
+# страницы задач, ведь в ленте заголовки и тексты задач
+SITEMAP_PUBLIC = os.environ.get('TODO_SITEMAP_PUBLIC') == '1'
+# Кеш частей карты сайта и Atom-ленты задач (см. deals/sitemaps.py)
+SITEMAP_CACHE_ALIAS = 'default'
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько последних задач выводит лента
+TASK_FEED_SIZE = 50
+
+# Сессии читаются из кеша, в БД — только при промахе. Подписанные
+# cookie (TODO_SESSION_ENGINE=signed_cookies) не обращаются ни к кешу,
+# ни к БД, но видны клиенту и не отзываются на сервере
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'TODO_SESSION_ENGINE', 'cached_db')
+# Пользователь для request.user берётся из кеша в памяти процесса.
+# ModelBackend остаётся для сессий, открытых до подключения кеша:
+# в сессии записан путь бэкенда, и без него они бы сбросились
+AUTHENTICATION_BACKENDS = [
+    'todo.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_SIZE = 1024
+USER_CACHE_TIMEOUT = 60
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,5 +247,54 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATIC_URL = '/static/'
 
 
+# Без DEBUG статика собирается collectstatic с хешем содержимого в именах
+# файлов и gzip-копиями; такие файлы кешируются браузером на год
+if not DEBUG:
+    STATICFILES_STORAGE = 'todo.storage.CompressedManifestStaticFilesStorage'
+STATIC_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+MEDIA_CACHE_MAX_AGE = 24 * 60 * 60
+# Картинки хранятся по хешу содержимого, одинаковые файлы — один раз
+# (см. deals/storage.py). Существующие файлы переносит dedupe_task_media
+DEFAULT_FILE_STORAGE = 'deals.storage.ContentAddressedStorage'
+# Сколько секунд не удалять файл, повторно загруженный для задачи,
+# которая, возможно, ещё не сохранена
+TASK_MEDIA_REUSE_GRACE = 60 * 60
+
+# Загрузки пишутся на диск кусками, картинка проверяется по заголовку
+# до полного чтения (см. deals/uploads.py). Все загрузки в проекте —
+# картинки задач, поэтому обработчик подключён для всего сайта
+FILE_UPLOAD_HANDLERS = ['deals.uploads.ImageUploadHandler']
+TASK_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+TASK_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+TASK_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Сколько байт начала файла держать в памяти для чтения заголовка:
+# у JPEG перед размерами может идти EXIF с миниатюрой до 64 КиБ
+TASK_UPLOAD_HEADER_BYTES = 256 * 1024
+# Как отдавать картинки без DEBUG: пусто — потоком из Django,
+# x-sendfile — через Apache/lighttpd, x-accel-redirect — через nginx
+MEDIA_SENDFILE = os.environ.get('TODO_MEDIA_SENDFILE') or None
+# internal location в nginx, который смотрит в MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Отложенная пакетная запись задач из формы (см. deals/ingest.py):
+# каталог очереди на диске, TODO_INGEST_DIR=/var/lib/todo/ingest
+TASK_INGEST_DIR = os.environ.get('TODO_INGEST_DIR') or None
+# Очередь быстрее прямой записи только с журналом отката, где каждая
+# фиксация делает fsync (benchmark_ingest --compare, 4 процесса по 200
+# задач: 164 задачи/с напрямую, 218 через очередь). В режиме WAL
+# прямая запись не медленнее (206-257 против 242-254 задач/с), поэтому
+# вместе с TODO_SQLITE_PRODUCTION очередь не запускается (deals/apps.py)
+TASK_INGEST_BATCH_SIZE = 500
+TASK_INGEST_INTERVAL = 0.5
+# fsync каждого файла очереди: без него очередь переживает падение
+# процесса, но не отключение питания — как база с synchronous=NORMAL
+TASK_INGEST_FSYNC = os.environ.get('TODO_INGEST_FSYNC') == '1'
+# Сколько секунд помнить ключи записанных задач: брошенный упавшим
+# воркером файл должен вернуться в очередь раньше
+TASK_INGEST_KEY_TTL = 7 * 24 * 3600
+
+# Сколько потоков строят уменьшенные копии картинок задач
+TASK_IMAGE_WORKERS = 2
@@ -0,0 +1,219 @@
+"""Журнал медленных SQL-запросов.
+
+Включается настройкой SLOW_QUERY_LOG — путём к файлу журнала.
+SlowQueryMiddleware на время запроса ставит обёртку
+connection.execute_wrapper() на все соединения. Запрос дольше
+SLOW_QUERY_THRESHOLD_MS пишется в журнал вместе с нормализованным SQL,
+представлением, местом в коде проекта и выводом EXPLAIN QUERY PLAN,
+а также в журнал todo.performance.
+
+Кроме того, доля SLOW_QUERY_SAMPLE_RATE всех запросов пишется в журнал
+выборкой: по ней команда slow_query_report оценивает, какие запросы
+в сумме занимают больше всего времени.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+from contextlib import ExitStack
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('todo.performance')
+
+# План одного и того же запроса повторно снимается не чаще, чем раз
+# в столько секунд на процесс
+EXPLAIN_INTERVAL = 300
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_explained = {}
+
+NORMALIZE_RULES = [
+    # Строки и числа в тексте запроса
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    # IN с любым числом параметров — один и тот же запрос
+    (re.compile(r'\bIN \((?:\?, )*\?\)'), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize(sql):
+    """SQL без значений: запросы, различающиеся только параметрами,
+    получают одинаковый текст."""
+    for pattern, replacement in NORMALIZE_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+def code_location():
+    """Ближайшее к запросу место в коде проекта, кроме этого модуля."""
+    frame = sys._getframe(1)
+    root = str(settings.BASE_DIR) + os.sep
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(root) and filename != __file__
+                and 'site-packages' not in filename):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql, params):
+    """Вывод EXPLAIN QUERY PLAN с отступами по вложенности.
+
+    Выполняется отдельным курсором в обход обёрток, чтобы не затереть
+    результат исходного запроса и не попасть в журнал самому.
+    """
+    if (connection.vendor != 'sqlite'
+            or not sql.lstrip().upper().startswith(EXPLAINABLE)):
+        return None
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in cursor.fetchall():
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node] + detail)
+        return lines
+    except Exception as e:
+        return [f'EXPLAIN не удался: {e}']
+    finally:
+        cursor.close()
+
+
+def write(lines):
+    # Одна запись в файл, открытый на дозапись: строки разных
+    # процессов не перемешиваются
+    with open(settings.SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+        f.write(''.join(lines))
+
+
+class SlowQueryLog:
+    """Обёртка для connection.execute_wrapper() на время одного запроса."""
+    def __init__(self, path):
+        self.path = path
+        self.view = None
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.sample_rate = settings.SLOW_QUERY_SAMPLE_RATE
+        self.lines = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        result = execute(sql, params, many, context)
+        duration = perf_counter() - started
+        if duration >= self.threshold:
+            self.slow(sql, params, many, context['connection'], duration)
+        # Медленные запросы тоже попадают в выборку, иначе оценка
+        # суммарного времени занижала бы именно их
+        if random.random() < self.sample_rate:
+            normalized = normalize(sql)
+            self.add({
+                'type': 'sample',
+                'fingerprint': fingerprint(normalized),
+                'sql': normalized,
+                'ms': round(duration * 1000, 3),
+                # Вес восстанавливает полное число запросов по выборке
+                'weight': 1 / self.sample_rate,
+            })
+        return result
+
+    def slow(self, sql, params, many, connection, duration):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        record = {
+            'type': 'slow',
+            'fingerprint': key,
+            'sql': normalized,
+            'ms': round(duration * 1000, 3),
+            'alias': connection.alias,
+            'path': self.path,
+            'view': self.view,
+            'location': code_location(),
+        }
+        last = _explained.get(key)
+        if not many and (last is None
+                         or monotonic() - last >= EXPLAIN_INTERVAL):
+            _explained[key] = monotonic()
+            record['plan'] = explain(connection, sql, params)
+        logger.warning(json.dumps(record, ensure_ascii=False))
+        self.add(record)
+
+    def add(self, record):
+        self.lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class SlowQueryMiddleware:
+    """Ставит SlowQueryLog на все соединения на время запроса."""
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = request._slow_query_log = SlowQueryLog(request.path)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        if log.lines:
+            write(log.lines)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request._slow_query_log.view = (
+            match.view_name if match else view_func.__qualname__)
+
+
+def read(path):
+    """Записи журнала по одной, без загрузки файла целиком."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Строка, недописанная при остановке процесса
+                continue
+
+
+def report(records):
+    """Сводка по отпечаткам запросов, по убыванию суммарного времени."""
+    summary = {}
+    for record in records:
+        item = summary.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': record['sql'],
+            'calls': 0.0,
+            'total_ms': 0.0,
+            'slow': 0,
+            'max_ms': 0.0,
+            'view': None,
+            'location': None,
+            'plan': None,
+        })
+        if record['type'] == 'sample':
+            item['calls'] += record['weight']
+            item['total_ms'] += record['ms'] * record['weight']
+        else:
+            item['slow'] += 1
+            item['max_ms'] = max(item['max_ms'], record['ms'])
+            item['view'] = record.get('view') or item['view']
+            item['location'] = record.get('location') or item['location']
+            item['plan'] = record.get('plan') or item['plan']
+    return sorted(summary.values(),
+                  key=lambda item: (item['total_ms'], item['max_ms']),
+                  reverse=True)
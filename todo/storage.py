@@ -0,0 +1,47 @@
+"""Хранилище статики для боевого режима."""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+# Уже сжатые форматы повторно не сжимаем
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map',
+    '.ttf', '.eot', '.otf', '.ico',
+}
+# Файлы меньше этого размера почти не сжимаются
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище с хешем содержимого в именах файлов и gzip-копиями.
+
+    Хеш в имени позволяет отдавать статику с кешированием на год:
+    при изменении файла меняется и его адрес. Рядом с каждым текстовым
+    файлом collectstatic кладёт сжатую копию name.gz, чтобы не сжимать
+    её при каждом запросе.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if not dry_run and not isinstance(processed, Exception):
+                for path in {name, hashed_name} - {None}:
+                    self.compress(path)
+            yield name, hashed_name, processed
+
+    def compress(self, name):
+        """Кладёт рядом с файлом gzip-копию, если она заметно меньше."""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return None
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return None
+        # mtime=0: одинаковые файлы дают одинаковые архивы при каждой сборке
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content) * 0.95:
+            return None
+        path = self.path(name) + '.gz'
+        with open(path, 'wb') as target:
+            target.write(compressed)
+        return path
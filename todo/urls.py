@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from todo import files
+
 urlpatterns = [
     path('', include('deals.urls', namespace='deals')),
     path('page/', include('static_pages.urls', namespace='static_pages')),
@@ -15,3 +17,10 @@ if settings.DEBUG:
                           document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
+else:
+    urlpatterns += [
+        path(settings.MEDIA_URL.lstrip('/') + '<path:path>',
+             files.serve_media, name='media'),
+        path(settings.STATIC_URL.lstrip('/') + '<path:path>',
+             files.serve_static, name='static'),
+    ]
@@ -0,0 +1,70 @@
+"""Прогрев процесса перед приёмом запросов.
+
+Без прогрева первые запросы после деплоя или перезапуска воркера
+дополнительно платят за построение URL-резолвера, компиляцию шаблонов
+и импорт тяжёлых модулей.
+"""
+import logging
+import os
+from importlib import import_module
+from time import perf_counter
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def import_modules():
+    for name in settings.WARMUP_MODULES:
+        import_module(name)
+    return len(settings.WARMUP_MODULES)
+
+
+def compile_templates():
+    """Компилирует все шаблоны из каталогов DIRS.
+
+    С кешируемым загрузчиком скомпилированные шаблоны остаются в памяти
+    и при запросах не читаются с диска.
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    name = os.path.relpath(
+                        os.path.join(root, filename), directory)
+                    try:
+                        engine.get_template(name.replace(os.sep, '/'))
+                    except TemplateSyntaxError:
+                        logger.exception('Ошибка в шаблоне %s', name)
+                    else:
+                        count += 1
+    return count
+
+
+def resolve_urls():
+    """Строит URL-резолвер со всеми вложенными шаблонами адресов."""
+    resolver = get_resolver()
+    # Заполняет словари для reverse() и компилирует регулярные выражения
+    return len(resolver.reverse_dict)
+
+
+STEPS = {
+    'modules': import_modules,
+    'templates': compile_templates,
+    'urls': resolve_urls,
+}
+
+
+def warm_up():
+    """Выполняет все шаги прогрева и возвращает время каждого в секундах."""
+    timings = {}
+    for name, step in STEPS.items():
+        started = perf_counter()
+        count = step()
+        timings[name] = perf_counter() - started
+        logger.info('Прогрев %s: %s за %.1f мс',
+                    name, count, timings[name] * 1000)
+    return timings
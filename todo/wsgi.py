@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo.settings')
 
 application = get_wsgi_application()
+
+# Воркер начинает принимать запросы только после прогрева
+if settings.WSGI_WARMUP:
+    from todo.warmup import warm_up
+    warm_up()